@@ -0,0 +1,27 @@
+"""movies title C collation index
+
+Revision ID: 3f9a1c7e5b2d
+Revises: 6261016eae7a
+Create Date: 2026-10-18 21:10:42.503117
+
+"""
+from typing import Sequence, Union
+
+from alembic import op
+import sqlalchemy as sa
+
+
+# revision identifiers, used by Alembic.
+revision: str = '3f9a1c7e5b2d'
+down_revision: Union[str, None] = '6261016eae7a'
+branch_labels: Union[str, Sequence[str], None] = None
+depends_on: Union[str, Sequence[str], None] = None
+
+
+def upgrade() -> None:
+    # ORDER BY title COLLATE "C", id — порядок in-process индекса и keyset-курсора
+    op.execute('CREATE INDEX IF NOT EXISTS ix_movies_title_c_id ON movies (title COLLATE "C", id)')
+
+
+def downgrade() -> None:
+    op.execute("DROP INDEX IF EXISTS ix_movies_title_c_id")
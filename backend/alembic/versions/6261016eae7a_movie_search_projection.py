@@ -0,0 +1,50 @@
+"""movie search projection
+
+Revision ID: 6261016eae7a
+Revises: 9c797a2d00de
+Create Date: 2026-10-18 15:02:37.118204
+
+"""
+from typing import Sequence, Union
+
+from alembic import op
+import sqlalchemy as sa
+from sqlalchemy.dialects import postgresql
+
+
+
+# revision identifiers, used by Alembic.
+revision: str = '6261016eae7a'
+down_revision: Union[str, None] = '9c797a2d00de'
+branch_labels: Union[str, Sequence[str], None] = None
+depends_on: Union[str, Sequence[str], None] = None
+
+IntList = sa.JSON().with_variant(postgresql.ARRAY(sa.Integer()), 'postgresql')
+
+
+def upgrade() -> None:
+    op.create_table('movie_search',
+    sa.Column('movie_id', sa.Integer(), nullable=False),
+    sa.Column('genre_ids', IntList, nullable=False),
+    sa.Column('country_ids', IntList, nullable=False),
+    sa.Column('person_ids', IntList, nullable=False),
+    sa.ForeignKeyConstraint(['movie_id'], ['movies.id'], ondelete='CASCADE'),
+    sa.PrimaryKeyConstraint('movie_id')
+    )
+    if op.get_bind().dialect.name == 'postgresql':
+        op.create_index('ix_movie_search_genre_ids', 'movie_search', ['genre_ids'], postgresql_using='gin')
+        op.create_index('ix_movie_search_country_ids', 'movie_search', ['country_ids'], postgresql_using='gin')
+        op.create_index('ix_movie_search_person_ids', 'movie_search', ['person_ids'], postgresql_using='gin')
+        # проекция заполняется сразу; в остальных СУБД — через /api/admin/movie-search:rebuild
+        op.execute("""
+            INSERT INTO movie_search (movie_id, genre_ids, country_ids, person_ids)
+            SELECT m.id,
+                   COALESCE((SELECT array_agg(DISTINCT genre_id ORDER BY genre_id) FROM movie_genre WHERE movie_id = m.id), '{}'),
+                   COALESCE((SELECT array_agg(DISTINCT country_id ORDER BY country_id) FROM movie_country WHERE movie_id = m.id), '{}'),
+                   COALESCE((SELECT array_agg(DISTINCT person_id ORDER BY person_id) FROM movie_person WHERE movie_id = m.id), '{}')
+            FROM movies m
+        """)
+
+
+def downgrade() -> None:
+    op.drop_table('movie_search')
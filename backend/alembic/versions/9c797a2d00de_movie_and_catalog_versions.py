@@ -0,0 +1,33 @@
+"""movie and catalog versions
+
+Revision ID: 9c797a2d00de
+Revises: c6dc766c9e98
+Create Date: 2026-10-18 12:41:09.703551
+
+"""
+from typing import Sequence, Union
+
+from alembic import op
+import sqlalchemy as sa
+
+
+# revision identifiers, used by Alembic.
+revision: str = '9c797a2d00de'
+down_revision: Union[str, None] = 'c6dc766c9e98'
+branch_labels: Union[str, Sequence[str], None] = None
+depends_on: Union[str, Sequence[str], None] = None
+
+
+def upgrade() -> None:
+    op.add_column('movies', sa.Column('version', sa.Integer(), server_default='1', nullable=False))
+    op.create_table('catalog_state',
+    sa.Column('id', sa.Integer(), nullable=False),
+    sa.Column('version', sa.BigInteger(), nullable=False),
+    sa.PrimaryKeyConstraint('id')
+    )
+    op.execute("INSERT INTO catalog_state (id, version) VALUES (1, 1)")
+
+
+def downgrade() -> None:
+    op.drop_table('catalog_state')
+    op.drop_column('movies', 'version')
@@ -0,0 +1,30 @@
+"""movies keyset indexes
+
+Revision ID: a1cf7a2eb43e
+Revises: 41bf4c2a899c
+Create Date: 2026-10-18 10:12:04.118203
+
+"""
+from typing import Sequence, Union
+
+from alembic import op
+import sqlalchemy as sa
+
+
+# revision identifiers, used by Alembic.
+revision: str = 'a1cf7a2eb43e'
+down_revision: Union[str, None] = '41bf4c2a899c'
+branch_labels: Union[str, Sequence[str], None] = None
+depends_on: Union[str, Sequence[str], None] = None
+
+
+def upgrade() -> None:
+    op.create_index('ix_movies_title_id', 'movies', ['title', 'id'], unique=False)
+    op.create_index('ix_movies_rating_id', 'movies', ['rating', 'id'], unique=False)
+    op.create_index('ix_movies_release_year_id', 'movies', ['release_year', 'id'], unique=False)
+
+
+def downgrade() -> None:
+    op.drop_index('ix_movies_release_year_id', table_name='movies')
+    op.drop_index('ix_movies_rating_id', table_name='movies')
+    op.drop_index('ix_movies_title_id', table_name='movies')
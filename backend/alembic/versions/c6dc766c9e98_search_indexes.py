@@ -0,0 +1,40 @@
+"""search indexes (pg_trgm, tsvector)
+
+Revision ID: c6dc766c9e98
+Revises: a1cf7a2eb43e
+Create Date: 2026-10-18 11:03:47.520913
+
+"""
+from typing import Sequence, Union
+
+from alembic import op
+import sqlalchemy as sa
+
+
+# revision identifiers, used by Alembic.
+revision: str = 'c6dc766c9e98'
+down_revision: Union[str, None] = 'a1cf7a2eb43e'
+branch_labels: Union[str, Sequence[str], None] = None
+depends_on: Union[str, Sequence[str], None] = None
+
+# должно совпадать с app.models.search.MOVIES_TSVECTOR_SQL
+MOVIES_TSVECTOR_SQL = (
+    "to_tsvector('simple', coalesce(movies.title, '') || ' ' || coalesce(movies.description, ''))"
+)
+
+
+def upgrade() -> None:
+    op.execute("CREATE EXTENSION IF NOT EXISTS pg_trgm")
+    op.execute("CREATE INDEX IF NOT EXISTS ix_movies_title_trgm ON movies USING gin (title gin_trgm_ops)")
+    op.execute("CREATE INDEX IF NOT EXISTS ix_genres_name_trgm ON genres USING gin (name gin_trgm_ops)")
+    op.execute("CREATE INDEX IF NOT EXISTS ix_countries_name_trgm ON countries USING gin (name gin_trgm_ops)")
+    op.execute("CREATE INDEX IF NOT EXISTS ix_persons_full_name_trgm ON persons USING gin (full_name gin_trgm_ops)")
+    op.execute(f"CREATE INDEX IF NOT EXISTS ix_movies_search_tsv ON movies USING gin (({MOVIES_TSVECTOR_SQL}))")
+
+
+def downgrade() -> None:
+    op.execute("DROP INDEX IF EXISTS ix_movies_search_tsv")
+    op.execute("DROP INDEX IF EXISTS ix_persons_full_name_trgm")
+    op.execute("DROP INDEX IF EXISTS ix_countries_name_trgm")
+    op.execute("DROP INDEX IF EXISTS ix_genres_name_trgm")
+    op.execute("DROP INDEX IF EXISTS ix_movies_title_trgm")
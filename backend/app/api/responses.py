@@ -0,0 +1,19 @@
+"""JSON-ответы, сериализованные в самом обработчике.
+
+FastAPI сериализует возвращённый объект по response_model уже после выхода из
+обработчика — вне фаз Server-Timing. json_response делает то же самое внутри
+phase("serialize"), чтобы у каждого эндпоинта время БД и время сериализации
+считались раздельно.
+"""
+
+from fastapi import Response
+from pydantic import BaseModel
+
+from app.core.metrics import phase
+
+
+def json_response(model: type[BaseModel], content, headers: dict[str, str] | None = None) -> Response:
+    """content (dict / ORM-объект) -> JSON по схеме model, как сделал бы response_model."""
+    with phase("serialize"):
+        body = model.model_validate(content, from_attributes=True).model_dump_json().encode()
+    return Response(content=body, media_type="application/json", headers=headers)
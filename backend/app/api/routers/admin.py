@@ -1,24 +1,64 @@
-from fastapi import APIRouter, Depends, HTTPException, status
-from sqlalchemy.orm import Session
+from typing import Literal
+
+from fastapi import APIRouter, Depends, HTTPException, Query, Request, Response, status
+from fastapi.responses import StreamingResponse
+from sqlalchemy.exc import DBAPIError
 
 from app.api.deps.admin import require_admin
-from app.core.db import get_db
-from app.crud.movies import create_movie, update_movie, delete_movie
-from app.schemas.movie import MovieDetails, MovieCreate, MovieUpdate
+from app.core.db import AnySession, get_read_session, get_session, run_db, stream_db
+from app.core.config import settings
+from app.core.replicas import mark_primary_write
+from app.core.slow_queries import slow_query_log
+from app.crud.batch import BATCH_MAX_OPERATIONS, apply_movie_batch
+from app.crud.bulk import MovieImporter
+from app.crud.export import iter_movie_export
+from app.crud.filter_index import filter_index
+from app.crud.movie_search import rebuild_movie_search
+from app.crud.movies import create_movie, update_movie, patch_movie, delete_movie
+from app.crud.reference_ids import invalidate_reference_ids
+from app.crud.references import invalidate_reference_cache
+from app.schemas.movie import (
+    BulkImportReport,
+    MovieCreate,
+    MovieDetails,
+    MovieMutationBatch,
+    MovieMutationReport,
+    MoviePatch,
+    MovieUpdate,
+)
+
+
+def _stick_reads_to_primary(request: Request, response: Response):
+    """После мутаций публичное чтение этого клиента какое-то время идёт с primary
+    (read-your-writes, cookie в ответе). Ставится до обработчика: заголовки
+    Response зависимости попадают в ответ, только пока он не собран."""
+    if request.method not in ("GET", "HEAD"):
+        mark_primary_write(response)
+
+
+def _database_error(e: DBAPIError) -> HTTPException:
+    """Ошибка БД при записи фильма -> 409.
+
+    Чаще всего это внешний ключ: id справочника прошёл проверку по карте в
+    памяти, а в другом процессе его уже удалили — карты сбрасываем.
+    """
+    invalidate_reference_ids()
+    return HTTPException(status_code=409, detail=f"Database error: {e.orig}")
 
 
 router = APIRouter(
     prefix="/admin",
     tags=["admin"],
-    dependencies=[Depends(require_admin)],
+    dependencies=[Depends(require_admin), Depends(_stick_reads_to_primary)],
 )
 
 
 @router.post("/movies", response_model=MovieDetails, status_code=status.HTTP_201_CREATED)
-def admin_create_movie(payload: MovieCreate, db: Session = Depends(get_db)):
+async def admin_create_movie(payload: MovieCreate, db: AnySession = Depends(get_session)):
     try:
-        movie = create_movie(
+        movie = await run_db(
             db,
+            create_movie,
             title=payload.title,
             description=payload.description,
             release_year=payload.release_year,
@@ -30,13 +70,16 @@ def admin_create_movie(payload: MovieCreate, db: Session = Depends(get_db)):
         return movie
     except ValueError as e:
         raise HTTPException(status_code=400, detail=str(e))
+    except DBAPIError as e:
+        raise _database_error(e)
 
 
 @router.put("/movies/{movie_id}", response_model=MovieDetails)
-def admin_update_movie(movie_id: int, payload: MovieUpdate, db: Session = Depends(get_db)):
+async def admin_update_movie(movie_id: int, payload: MovieUpdate, db: AnySession = Depends(get_session)):
     try:
-        movie = update_movie(
+        movie = await run_db(
             db,
+            update_movie,
             movie_id,
             title=payload.title,
             description=payload.description,
@@ -48,15 +91,150 @@ def admin_update_movie(movie_id: int, payload: MovieUpdate, db: Session = Depend
         )
     except ValueError as e:
         raise HTTPException(status_code=400, detail=str(e))
+    except DBAPIError as e:
+        raise _database_error(e)
+
+    if not movie:
+        raise HTTPException(status_code=404, detail="Movie not found")
+    return movie
+
+
+@router.patch("/movies/{movie_id}", response_model=MovieDetails)
+async def admin_patch_movie(movie_id: int, payload: MoviePatch, db: AnySession = Depends(get_session)):
+    """Частичное изменение: связи — {"add": [...], "remove": [...]} без полного списка id."""
+    try:
+        movie = await run_db(db, patch_movie, movie_id, **payload.changes())
+    except ValueError as e:
+        raise HTTPException(status_code=400, detail=str(e))
+    except DBAPIError as e:
+        raise _database_error(e)
 
     if not movie:
         raise HTTPException(status_code=404, detail="Movie not found")
     return movie
 
 
+@router.post("/movies:batch", response_model=MovieMutationReport)
+async def admin_batch_movies(
+    payload: MovieMutationBatch,
+    chunk_size: int | None = Query(default=None, ge=1, le=10000, description="Операций в одной транзакции"),
+    atomic: bool = Query(default=False, description="Весь пакет одной транзакцией: первая ошибка откатывает всё"),
+    db: AnySession = Depends(get_session),
+):
+    """Пакет create/update/patch/delete; результат — по каждой операции (id, версия, статус)."""
+    if len(payload.operations) > BATCH_MAX_OPERATIONS:
+        raise HTTPException(status_code=400, detail=f"Too many operations (max {BATCH_MAX_OPERATIONS})")
+    return await run_db(
+        db,
+        apply_movie_batch,
+        payload.operations,
+        chunk_size=chunk_size or settings.admin_batch_chunk_size,
+        atomic=atomic,
+    )
+
+
+async def _iter_lines(request: Request):
+    """Строки тела запроса по мере поступления (без чтения всего тела в память)."""
+    buffer = b""
+    async for part in request.stream():
+        buffer += part
+        *lines, buffer = buffer.split(b"\n")
+        for line in lines:
+            yield line
+    if buffer:
+        yield buffer
+
+
+@router.post("/movies:bulk", response_model=BulkImportReport)
+async def admin_bulk_import_movies(
+    request: Request,
+    chunk_size: int | None = Query(default=None, ge=1, le=10000, description="Фильмов в одной транзакции"),
+    db: AnySession = Depends(get_session),
+):
+    """Массовый импорт: тело — NDJSON, по одному MovieCreate на строку.
+
+    Ошибочные строки (невалидный JSON/поля, неизвестные id справочников)
+    попадают в отчёт с номером строки, остальные импортируются.
+    """
+    importer = MovieImporter(chunk_size=chunk_size or settings.bulk_import_chunk_size)
+    line_no = 0
+    async for line in _iter_lines(request):
+        line_no += 1
+        if not line.strip():
+            continue
+        if importer.add(line_no, line.decode("utf-8", errors="replace")):
+            await run_db(db, importer.flush)
+    await run_db(db, importer.flush)
+    return importer.report()
+
+
 @router.delete("/movies/{movie_id}", status_code=status.HTTP_204_NO_CONTENT)
-def admin_delete_movie(movie_id: int, db: Session = Depends(get_db)):
-    ok = delete_movie(db, movie_id)
+async def admin_delete_movie(movie_id: int, db: AnySession = Depends(get_session)):
+    ok = await run_db(db, delete_movie, movie_id)
     if not ok:
         raise HTTPException(status_code=404, detail="Movie not found")
     return None
+
+
+@router.delete("/cache/references")
+async def admin_invalidate_reference_cache(
+    entity: Literal["genres", "countries", "persons"] | None = Query(
+        default=None, description="Какой справочник сбросить (по умолчанию все)"
+    ),
+):
+    return {"invalidated": invalidate_reference_cache(entity)}
+
+
+@router.post("/movie-search:rebuild")
+async def admin_rebuild_movie_search(db: AnySession = Depends(get_session)):
+    """Пересборка денормализованной проекции movie_search (после включения или сбоя)."""
+    return {"rows": await run_db(db, rebuild_movie_search)}
+
+
+@router.get("/filter-index/check")
+async def admin_check_filter_index(db: AnySession = Depends(get_session)):
+    """Сверка in-process индекса фильтров этого процесса с БД."""
+    return await run_db(db, filter_index.check)
+
+
+@router.post("/filter-index:rebuild")
+async def admin_rebuild_filter_index(db: AnySession = Depends(get_session)):
+    return {"size": await run_db(db, filter_index.rebuild)}
+
+
+@router.get("/slow-queries")
+async def admin_slow_queries(
+    limit: int = Query(default=50, ge=1, le=500),
+    order_by: Literal["total_ms", "max_ms", "avg_ms", "count"] = Query(default="total_ms"),
+):
+    """Медленные SQL этого процесса, агрегированные по отпечатку нормализованного запроса."""
+    return {
+        "threshold_ms": settings.slow_query_ms,
+        "dropped": slow_query_log.dropped,
+        "items": slow_query_log.top(limit, order_by),
+    }
+
+
+@router.delete("/slow-queries")
+async def admin_clear_slow_queries():
+    return {"removed": slow_query_log.clear()}
+
+
+_EXPORT_MEDIA_TYPES = {"ndjson": "application/x-ndjson", "csv": "text/csv; charset=utf-8"}
+
+
+@router.get("/export")
+async def admin_export_movies(
+    format: Literal["ndjson", "csv"] = Query(default="ndjson"),
+    db: AnySession = Depends(get_read_session),
+):
+    """Выгрузка всего каталога потоком: фильмы + id жанров/стран/персон.
+
+    Сессию закрывает сам генератор выгрузки: зависимость завершается раньше,
+    чем отдаётся тело ответа.
+    """
+    return StreamingResponse(
+        stream_db(db, iter_movie_export, format, batch_size=settings.export_batch_size),
+        media_type=_EXPORT_MEDIA_TYPES[format],
+        headers={"Content-Disposition": f'attachment; filename="movies.{format}"'},
+    )
@@ -1,8 +1,33 @@
 from fastapi import APIRouter
 
+from app.core import db
+from app.core.cache import all_caches
+from app.core.pool import pool_status
+
 router = APIRouter(tags=["health"])
 
 
 @router.get("/health")
 def health():
     return {"status": "ok"}
+
+
+@router.get("/health/pool")
+def health_pool():
+    """Состояние пулов (primary и реплик): занято/свободно/overflow, время выдачи, здоровье реплик."""
+    pools = {"primary": pool_status(db.engine)}
+    healthy = set(db.read_replicas.healthy())
+    for i, replica in enumerate(db.read_replicas.engines):
+        pools[f"replica_{i}"] = {**pool_status(replica), "healthy": i in healthy}
+    if db.async_engine is not None:
+        pools["primary_async"] = pool_status(db.async_engine.sync_engine)
+        healthy = set(db.async_read_replicas.healthy())
+        for i, replica in enumerate(db.async_read_replicas.engines):
+            pools[f"replica_{i}_async"] = {**pool_status(replica.sync_engine), "healthy": i in healthy}
+    return pools
+
+
+@router.get("/health/cache")
+def health_cache():
+    """Статистика in-process кэшей: размер, попадания/промахи, вытеснения."""
+    return {name: cache.stats() for name, cache in all_caches().items()}
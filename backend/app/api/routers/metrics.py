@@ -0,0 +1,46 @@
+from fastapi import APIRouter
+from fastapi.responses import PlainTextResponse
+
+from app.core import db
+from app.core.cache import all_caches
+from app.core.metrics import (
+    cache_hits,
+    cache_misses,
+    cache_size,
+    pool_checked_out,
+    pool_checkout_wait,
+    render_metrics,
+)
+
+router = APIRouter(tags=["metrics"])
+
+
+def _engines() -> dict:
+    engines = {"primary": db.engine}
+    engines.update({f"replica_{i}": e for i, e in enumerate(db.read_replicas.engines)})
+    if db.async_engine is not None:
+        engines["primary_async"] = db.async_engine.sync_engine
+        engines.update({f"replica_{i}_async": e.sync_engine for i, e in enumerate(db.async_read_replicas.engines)})
+    return engines
+
+
+def _collect_gauges() -> None:
+    """Снимок кэшей и пулов на момент scrape."""
+    for name, cache in all_caches().items():
+        stats = cache.stats()
+        cache_hits.set(stats["hits"], cache=name)
+        cache_misses.set(stats["misses"], cache=name)
+        cache_size.set(stats["size"], cache=name)
+    for name, engine in _engines().items():
+        pool = engine.pool
+        if hasattr(pool, "checkedout"):
+            pool_checked_out.set(pool.checkedout(), pool=name)
+        if hasattr(pool, "stats"):
+            pool_checkout_wait.set(pool.stats.wait_total, pool=name)
+
+
+@router.get("/metrics", response_class=PlainTextResponse)
+def metrics():
+    """Метрики процесса в текстовом формате Prometheus."""
+    _collect_gauges()
+    return PlainTextResponse(render_metrics(), media_type="text/plain; version=0.0.4; charset=utf-8")
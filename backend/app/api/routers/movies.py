@@ -1,15 +1,68 @@
-from fastapi import APIRouter, Depends, Query, HTTPException
-from sqlalchemy.orm import Session
+from typing import Literal
 
-from app.core.db import get_db
-from app.crud.movies import list_movies, get_movie
-from app.schemas.movie import MovieListResponse, MovieDetails
+import orjson
+from fastapi import APIRouter, Depends, Header, Query, HTTPException, Response
+
+from app.api.responses import json_response
+from app.core.config import settings
+from app.core.db import AnySession, get_read_session, run_db
+from app.core.metrics import phase
+from app.core.http_cache import cache_headers, etag_matches, make_etag, not_modified
+from app.core.response_cache import params_digest, response_cache
+from app.crud.catalog import get_catalog_version, get_movie_version
+from app.crud.movies import EXPAND_RELATIONS, FACETS, list_movies, get_movie, get_movies_batch
+from app.schemas.movie import (
+    MovieBatchResponse,
+    MovieDetails,
+    MovieExpandedListResponse,
+    MovieListResponse,
+    MovieShort,
+)
 
 router = APIRouter(prefix="/movies", tags=["movies"])
 
+# максимум id в одном запросе /movies/batch
+BATCH_MAX_IDS = 100
+
+
+def _parse_id_list(values: list[str]) -> list[int]:
+    """ids=1,2,3 и/или ids=1&ids=2 -> [1, 2, 3]."""
+    try:
+        return [int(part) for value in values for part in value.split(",") if part.strip()]
+    except ValueError:
+        raise HTTPException(status_code=400, detail="ids must be integers")
+
+
+def _split_csv(value: str | None) -> tuple[str, ...] | None:
+    """"a, b,a" -> ("a", "b"): порядок не важен, чтобы ETag и ключ кэша совпадали."""
+    if not value:
+        return None
+    return tuple(sorted({part.strip() for part in value.split(",") if part.strip()})) or None
+
+
+def _list_body(payload: dict) -> bytes:
+    """Список из строк (list_movies(as_rows=True)) сразу в JSON через orjson.
+
+    Поля и их порядок — как у MovieListResponse.model_dump_json(), но без
+    валидации каждого элемента.
+    """
+    return orjson.dumps({field: payload[field] for field in MovieListResponse.model_fields})
+
+
+def _expanded_body(payload: dict, expand: tuple[str, ...]) -> bytes:
+    """Сериализация списка со связями: в items только запрошенные связи."""
+    payload["items"] = [
+        {
+            **{f: getattr(m, f) for f in MovieShort.model_fields},
+            **{rel: getattr(m, rel) for rel in expand},
+        }
+        for m in payload["items"]
+    ]
+    return MovieExpandedListResponse.model_validate(payload).model_dump_json(exclude_unset=True).encode()
+
 
 @router.get("", response_model=MovieListResponse)
-def movies_list(
+async def movies_list(
     q: str | None = Query(default=None, description="Поиск по названию"),
     genre_id: list[int] | None = Query(default=None, description="Фильтр по жанрам"),
     country_id: list[int] | None = Query(default=None, description="Фильтр по странам"),
@@ -18,13 +71,40 @@ def movies_list(
     year_to: int | None = Query(default=None, ge=1800),
     rating_from: float | None = Query(default=None, ge=0, le=10),
     rating_to: float | None = Query(default=None, ge=0, le=10),
-    sort: str = Query(default="title", description="title/-title/rating/-rating/year/-year"),
+    sort: str = Query(
+        default="title",
+        description="title/-title/rating/-rating/year/-year; relevance — при search_mode=fulltext",
+    ),
     page: int = Query(default=1, ge=1),
     size: int = Query(default=20, ge=1, le=100),
-    db: Session = Depends(get_db),
+    cursor: str | None = Query(
+        default=None,
+        description="Курсор из next_cursor предыдущего ответа (keyset-пагинация, page игнорируется)",
+    ),
+    total_mode: Literal["exact", "estimate", "none"] = Query(
+        default="exact",
+        description="exact — точный COUNT, estimate — оценка, none — без total (только has_next)",
+    ),
+    search_mode: Literal["substring", "fulltext"] = Query(
+        default="substring",
+        description="substring — подстрока в названии, fulltext — полнотекстовый поиск по названию и описанию",
+    ),
+    expand: str | None = Query(
+        default=None,
+        description="Связи для подгрузки в items через запятую: " + ",".join(EXPAND_RELATIONS),
+    ),
+    fields: str | None = Query(
+        default=None,
+        description="Поля items через запятую (id есть всегда): " + ",".join(MovieShort.model_fields),
+    ),
+    facets: str | None = Query(
+        default=None,
+        description="Счётчики по измерениям через запятую: " + ",".join(FACETS),
+    ),
+    if_none_match: str | None = Header(default=None),
+    db: AnySession = Depends(get_read_session),
 ):
-    items, total = list_movies(
-        db=db,
+    params = dict(
         q=q,
         genre_ids=genre_id,
         country_ids=country_id,
@@ -36,13 +116,81 @@ def movies_list(
         sort=sort,
         page=page,
         size=size,
+        cursor=cursor,
+        total_mode=total_mode,
+        search_mode=search_mode,
+        expand=_split_csv(expand),
+        facets=_split_csv(facets),
+        fields=_split_csv(fields),
+    )
+
+    # ETag = версия каталога + параметры запроса; 304 — без запросов к фильмам
+    version = await run_db(db, get_catalog_version)
+    etag = make_etag("movies", version, params_digest(params))
+    if etag_matches(if_none_match, etag):
+        return not_modified(etag)
+    headers = cache_headers(etag)
+
+    # общий кэш готовых JSON-ответов (если включён)
+    cache_key, cached = await response_cache.lookup_async("movies:list", params, version)
+    if cached is not None:
+        return Response(content=cached, media_type="application/json", headers=headers)
+
+    # sparse fields отдаются только этим путём: MovieShort их не опишет
+    fast = (settings.json_fast_path or bool(params["fields"])) and not params["expand"]
+    try:
+        result = await run_db(db, list_movies, **params, as_rows=fast)
+    except ValueError as e:
+        raise HTTPException(status_code=400, detail=str(e))
+    payload = {**result, "page": page, "size": size}
+
+    with phase("serialize"):
+        if params["expand"]:
+            body = _expanded_body(payload, params["expand"])
+        elif fast:
+            body = _list_body(payload)
+        else:
+            body = MovieListResponse.model_validate(payload).model_dump_json().encode()
+    await response_cache.set_async(cache_key, body)
+    return Response(content=body, media_type="application/json", headers=headers)
+
+
+@router.get("/batch", response_model=MovieBatchResponse)
+async def movies_batch(
+    ids: list[str] = Query(description=f"id фильмов через запятую или повтором параметра (до {BATCH_MAX_IDS})"),
+    db: AnySession = Depends(get_read_session),
+):
+    movie_ids = _parse_id_list(ids)
+    if len(movie_ids) > BATCH_MAX_IDS:
+        raise HTTPException(status_code=400, detail=f"Too many ids (max {BATCH_MAX_IDS})")
+    movies = await run_db(db, get_movies_batch, movie_ids)
+    found = {movie.id for movie in movies}
+    return json_response(
+        MovieBatchResponse,
+        {
+            "items": movies,
+            "missing_ids": [movie_id for movie_id in dict.fromkeys(movie_ids) if movie_id not in found],
+        },
     )
-    return {"items": items, "page": page, "size": size, "total": total}
 
 
 @router.get("/{movie_id}", response_model=MovieDetails)
-def movie_details(movie_id: int, db: Session = Depends(get_db)):
-    movie = get_movie(db, movie_id)
+async def movie_details(
+    movie_id: int,
+    if_none_match: str | None = Header(default=None),
+    db: AnySession = Depends(get_read_session),
+):
+    if if_none_match:
+        # проверяем только версию фильма, без загрузки карточки и связей
+        version = await run_db(db, get_movie_version, movie_id)
+        if version is not None and etag_matches(if_none_match, _movie_etag(movie_id, version)):
+            return not_modified(_movie_etag(movie_id, version))
+
+    movie = await run_db(db, get_movie, movie_id)
     if not movie:
         raise HTTPException(status_code=404, detail="Movie not found")
-    return movie
+    return json_response(MovieDetails, movie, headers=cache_headers(_movie_etag(movie.id, movie.version)))
+
+
+def _movie_etag(movie_id: int, version: int) -> str:
+    return make_etag("movie", movie_id, version)
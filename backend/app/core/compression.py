@@ -0,0 +1,172 @@
+"""Сжатие ответов (gzip / brotli) на уровне ASGI.
+
+Сжимаются только текстовые типы (JSON, NDJSON, CSV) от minimum_size байт.
+Потоковые ответы (выгрузка каталога) сжимаются по кускам с flush, чтобы
+клиент получал данные сразу. Ответы с ETag детерминированы, поэтому их сжатое
+тело кэшируется по (ETag, кодировка): повторные запросы горячих страниц не
+тратят CPU на сжатие.
+"""
+
+import zlib
+
+from starlette.datastructures import Headers, MutableHeaders
+from starlette.types import ASGIApp, Message, Receive, Scope, Send
+
+from app.core.cache import TTLCache
+
+ENCODINGS = ("br", "gzip")
+COMPRESSIBLE_TYPES = ("application/json", "application/x-ndjson", "text/")
+
+
+def _brotli():
+    try:
+        import brotli
+    except ImportError as e:  # pragma: no cover - зависит от окружения
+        raise RuntimeError("COMPRESSION_ENCODINGS=br requires the 'Brotli' package") from e
+    return brotli
+
+
+def accepted_encodings(header: str | None) -> set[str]:
+    """Кодировки из Accept-Encoding с q > 0 (без учёта весов)."""
+    accepted = set()
+    for part in (header or "").split(","):
+        name, _, params = part.strip().partition(";")
+        q = params.strip()
+        if q.startswith("q="):
+            try:
+                if float(q[2:]) <= 0:
+                    continue
+            except ValueError:
+                continue
+        if name:
+            accepted.add(name.strip().lower())
+    return accepted
+
+
+class Compressor:
+    """Потоковый компрессор с одинаковым интерфейсом для gzip и brotli."""
+
+    def __init__(self, encoding: str, gzip_level: int, brotli_quality: int):
+        self.encoding = encoding
+        if encoding == "gzip":
+            self._z = zlib.compressobj(gzip_level, zlib.DEFLATED, 16 + zlib.MAX_WBITS)
+        else:
+            self._br = _brotli().Compressor(quality=brotli_quality)
+
+    def chunk(self, data: bytes) -> bytes:
+        """Сжать кусок и вытолкнуть всё, что накопилось (для потоковых ответов)."""
+        if self.encoding == "gzip":
+            return self._z.compress(data) + self._z.flush(zlib.Z_SYNC_FLUSH)
+        return self._br.process(data) + self._br.flush()
+
+    def finish(self, data: bytes = b"") -> bytes:
+        if self.encoding == "gzip":
+            return self._z.compress(data) + self._z.flush()
+        return self._br.process(data) + self._br.finish()
+
+
+class CompressionMiddleware:
+    def __init__(
+        self,
+        app: ASGIApp,
+        *,
+        encodings: tuple[str, ...] = ENCODINGS,
+        minimum_size: int = 1024,
+        gzip_level: int = 6,
+        brotli_quality: int = 4,
+        cache: TTLCache | None = None,
+    ):
+        unknown = sorted(set(encodings) - set(ENCODINGS))
+        if unknown:
+            raise ValueError(f"Unknown compression encodings: {unknown}")
+        if "br" in encodings:
+            _brotli()
+        self.app = app
+        self.encodings = encodings
+        self.minimum_size = minimum_size
+        self.gzip_level = gzip_level
+        self.brotli_quality = brotli_quality
+        self.cache = cache
+
+    async def __call__(self, scope: Scope, receive: Receive, send: Send) -> None:
+        if scope["type"] != "http" or not self.encodings:
+            await self.app(scope, receive, send)
+            return
+        accepted = accepted_encodings(Headers(scope=scope).get("accept-encoding"))
+        encoding = next((e for e in self.encodings if e in accepted), None)
+        await self.app(scope, receive, _CompressingSend(self, encoding, send))
+
+    def compressor(self, encoding: str) -> Compressor:
+        return Compressor(encoding, self.gzip_level, self.brotli_quality)
+
+    def compress(self, body: bytes, encoding: str, etag: str | None) -> bytes:
+        if self.cache is None or etag is None:
+            return self.compressor(encoding).finish(body)
+        return self.cache.get_or_set((etag, encoding), lambda: self.compressor(encoding).finish(body))
+
+
+class _CompressingSend:
+    """Обёртка send одного ответа: решает, сжимать ли, по заголовкам и первому куску тела."""
+
+    def __init__(self, middleware: CompressionMiddleware, encoding: str | None, send: Send):
+        self.middleware = middleware
+        self.encoding = encoding
+        self.send = send
+        self.start: Message | None = None
+        self.passthrough = False
+        self.compressor: Compressor | None = None
+
+    async def __call__(self, message: Message) -> None:
+        if message["type"] == "http.response.start":
+            self.start = message
+            headers = Headers(raw=message["headers"])
+            compressible = message["status"] not in (204, 304) and headers.get(
+                "content-type", ""
+            ).startswith(COMPRESSIBLE_TYPES)
+            if compressible:
+                # представление зависит от Accept-Encoding — это должны знать кэши
+                MutableHeaders(raw=message["headers"]).add_vary_header("Accept-Encoding")
+            self.passthrough = not compressible or self.encoding is None or "content-encoding" in headers
+            return
+
+        if message["type"] != "http.response.body":
+            await self.send(message)
+            return
+
+        if self.start is not None:
+            await self._send_start(message)
+            return
+        if self.passthrough:
+            await self.send(message)
+            return
+
+        body = message.get("body", b"")
+        if message.get("more_body", False):
+            body = self.compressor.chunk(body)
+        else:
+            body = self.compressor.finish(body)
+        await self.send({**message, "body": body})
+
+    async def _send_start(self, message: Message) -> None:
+        """Первый кусок тела: отправляем заголовки (при сжатии — исправленные) и его."""
+        start, self.start = self.start, None
+        body = message.get("body", b"")
+        streaming = message.get("more_body", False)
+        if not self.passthrough and not streaming and len(body) < self.middleware.minimum_size:
+            self.passthrough = True
+        if self.passthrough:
+            await self.send(start)
+            await self.send(message)
+            return
+
+        headers = MutableHeaders(raw=start["headers"])
+        headers["Content-Encoding"] = self.encoding
+        if streaming:
+            del headers["Content-Length"]
+            self.compressor = self.middleware.compressor(self.encoding)
+            body = self.compressor.chunk(body)
+        else:
+            body = self.middleware.compress(body, self.encoding, headers.get("etag"))
+            headers["Content-Length"] = str(len(body))
+        await self.send(start)
+        await self.send({**message, "body": body})
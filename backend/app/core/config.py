@@ -1,3 +1,5 @@
+from typing import Literal
+
 from pydantic_settings import BaseSettings, SettingsConfigDict
 from pydantic import Field
 
@@ -8,6 +10,31 @@ class Settings(BaseSettings):
     # пример: postgresql+psycopg2://user:pass@db:5432/cinema
     database_url: str = Field(default="postgresql+psycopg2://cinema:cinema@db:5432/cinema")
 
+    # async-стек (asyncpg/aiosqlite) вместо sync-движка; URL по умолчанию
+    # выводится из database_url заменой драйвера
+    db_async: bool = False
+    async_database_url: str | None = None
+
+    # реплики для чтения (через запятую, формат как у database_url);
+    # пусто — всё читается с primary
+    database_replica_urls: str = Field(default="")
+    # на сколько секунд исключать реплику из ротации после обрыва/ошибки подключения
+    replica_eject_seconds: float = Field(default=30, ge=0)
+    # сколько секунд после админской мутации клиент читает с primary (read-your-writes, cookie)
+    replica_sticky_seconds: float = Field(default=5, ge=0)
+
+    # пул соединений (для SQLite не применяется)
+    db_pool_size: int = Field(default=10, ge=1)
+    db_max_overflow: int = Field(default=20, ge=0)
+    db_pool_timeout: float = Field(default=30, gt=0)
+    # пересоздавать соединения старше N секунд (-1 — никогда)
+    db_pool_recycle: int = Field(default=1800, ge=-1)
+    # SELECT 1 при каждой выдаче соединения: надёжнее после рестарта БД, но +1 round trip;
+    # при выключенном pre-ping от "протухших" соединений защищает db_pool_recycle
+    db_pool_pre_ping: bool = True
+    # серверный statement_timeout (Postgres), мс; 0 — без ограничения
+    db_statement_timeout_ms: int = Field(default=0, ge=0)
+
     # CORS для фронта (позже подправим под реальный домен/порт)
     cors_origins: str = Field(default="http://localhost:3000,http://localhost:5173")
 
@@ -19,5 +46,66 @@ class Settings(BaseSettings):
     # Значение задавайте через переменную окружения ADMIN_TOKEN.
     admin_token: str = Field(default="change-me")
 
+    # TTL (сек) кэша COUNT(*) для total_mode=estimate вне Postgres
+    count_cache_ttl: int = Field(default=60, ge=0)
+    # TTL кэша фасетов по всему каталогу (без фильтров); 0 — не кэшировать
+    facet_cache_ttl: int = Field(default=60, ge=0)
+
+    # in-process кэш списков справочников (жанры/страны/персоны); ttl=0 — выключен
+    reference_cache_ttl: float = Field(default=300, ge=0)
+    reference_cache_maxsize: int = Field(default=1024, ge=0)
+    # карта существующих id справочников для проверки genre_ids/country_ids/person_ids
+    # без запроса к БД (app.crud.reference_ids); 0 — проверка IN-запросом
+    reference_ids_ttl: float = Field(default=300, ge=0)
+
+    # общий кэш ответов GET /movies: none / memory (в процессе) / redis (общий для реплик)
+    response_cache_backend: Literal["none", "memory", "redis"] = "none"
+    response_cache_url: str = Field(default="redis://redis:6379/0")
+    response_cache_ttl: int = Field(default=60, ge=0)
+
+    # размер пачки (и транзакции) при массовом импорте фильмов
+    bulk_import_chunk_size: int = Field(default=1000, ge=1)
+    # операций пакета POST /admin/movies:batch в одной транзакции (если не atomic)
+    admin_batch_chunk_size: int = Field(default=500, ge=1)
+    # фильтры списка по денормализованной проекции movie_search (GIN по массивам id)
+    # вместо EXISTS по таблицам связей; после включения — пересобрать проекцию
+    movie_search_projection: bool = False
+
+    # in-process индекс фильтров (app.crud.filter_index): списки без q отвечаются
+    # из памяти, из БД грузится только страница; строится при старте процесса
+    filter_index: bool = False
+
+    # список фильмов без expand: колонки кортежами + orjson вместо ORM-объектов и
+    # валидации каждого элемента через MovieShort (вывод тот же)
+    json_fast_path: bool = True
+
+    # журнал медленных SQL (app.core.slow_queries): порог в мс (0 — выключен) и доля
+    # медленных SELECT, для которых снимается план (в Postgres — EXPLAIN ANALYZE,
+    # т.е. повторное выполнение запроса)
+    slow_query_ms: float = Field(default=500, ge=0)
+    slow_query_explain_rate: float = Field(default=0.0, ge=0, le=1)
+
+    # заголовок Server-Timing (db/pool/serialize/app) в ответах; в debug включён всегда
+    server_timing: bool = False
+
+    # сжатие ответов (app.core.compression): кодировки в порядке предпочтения,
+    # пусто — выключено. Для typical /api/movies?size=100 (~7.5 КБ JSON): gzip-6
+    # ~6.9x за ~85 мкс, br-4 ~7.5x за ~110 мкс; br-11 сжимает лучше, но в ~150 раз дольше
+    compression_encodings: str = "br,gzip"
+    compression_minimum_size: int = Field(default=1024, ge=0)
+    compression_gzip_level: int = Field(default=6, ge=1, le=9)
+    compression_brotli_quality: int = Field(default=4, ge=0, le=11)
+    # кэш сжатых тел ответов с ETag (ключ — ETag + кодировка); maxsize=0 — выключен
+    compression_cache_ttl: float = Field(default=300, ge=0)
+    compression_cache_maxsize: int = Field(default=1024, ge=0)
+
+    # фильмов в одной пачке серверного курсора при выгрузке каталога
+    export_batch_size: int = Field(default=1000, ge=1)
+
+    # max-age в Cache-Control публичных ответов каталога (0 — no-cache, только ревалидация по ETag).
+    # По умолчанию 0: ревалидация дешёвая (304 до загрузки фильмов), а с max-age браузер
+    # и nginx отдавали бы автору правки старую карточку мимо read-your-writes
+    http_cache_max_age: int = Field(default=0, ge=0)
+
 
 settings = Settings()
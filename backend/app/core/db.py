@@ -1,12 +1,61 @@
+from collections.abc import AsyncGenerator, AsyncIterator
+
 from sqlalchemy import create_engine
+from sqlalchemy.engine import make_url
+from sqlalchemy.ext.asyncio import AsyncSession, async_sessionmaker, create_async_engine
 from sqlalchemy.orm import sessionmaker, Session
+from starlette.concurrency import iterate_in_threadpool, run_in_threadpool
+from starlette.requests import Request
 
 from app.core.config import settings
+from app.core.metrics import install_query_hooks
+from app.core.pool import engine_options
+from app.core.replicas import ReplicaSet, reads_stick_to_primary
+from app.core.slow_queries import install_slow_query_log
+
+# учёт числа и времени SQL-запросов для /metrics и Server-Timing, журнал медленных запросов
+install_query_hooks()
+install_slow_query_log()
 
-engine = create_engine(settings.database_url, pool_pre_ping=True)
+engine = create_engine(settings.database_url, **engine_options(settings.database_url))
 
 SessionLocal = sessionmaker(bind=engine, autocommit=False, autoflush=False)
 
+replica_urls = [u.strip() for u in settings.database_replica_urls.split(",") if u.strip()]
+read_replicas = ReplicaSet([create_engine(url, **engine_options(url)) for url in replica_urls])
+
+# sync-драйвер -> async-драйвер того же диалекта
+_ASYNC_DRIVERS = {
+    "postgresql": "asyncpg",
+    "sqlite": "aiosqlite",
+}
+
+
+def async_database_url(url: str) -> str:
+    """URL для create_async_engine: postgresql+psycopg2 -> postgresql+asyncpg и т.п."""
+    parsed = make_url(url)
+    backend = parsed.get_backend_name()
+    if backend not in _ASYNC_DRIVERS:
+        raise ValueError(f"No async driver configured for {backend}")
+    return parsed.set(drivername=f"{backend}+{_ASYNC_DRIVERS[backend]}").render_as_string(hide_password=False)
+
+
+# async-движок создаём только при DB_ASYNC=true, чтобы sync-режиму
+# не требовались asyncpg/aiosqlite
+async_engine = None
+AsyncSessionLocal = None
+async_read_replicas = ReplicaSet([])
+if settings.db_async:
+    _async_url = settings.async_database_url or async_database_url(settings.database_url)
+    async_engine = create_async_engine(_async_url, **engine_options(_async_url, is_async=True))
+    AsyncSessionLocal = async_sessionmaker(bind=async_engine, autoflush=False)
+    async_read_replicas = ReplicaSet(
+        [
+            create_async_engine(async_database_url(url), **engine_options(async_database_url(url), is_async=True))
+            for url in replica_urls
+        ]
+    )
+
 
 def get_db() -> Session:
     db = SessionLocal()
@@ -14,3 +63,70 @@ def get_db() -> Session:
         yield db
     finally:
         db.close()
+
+
+def get_read_db(request: Request) -> Session:
+    """Сессия только для чтения: реплика (если есть и здорова) или primary."""
+    db = SessionLocal(bind=read_replicas.read_engine(engine, reads_stick_to_primary(request.cookies)))
+    try:
+        yield db
+    finally:
+        db.close()
+
+
+async def get_async_db() -> AsyncGenerator[AsyncSession, None]:
+    async with AsyncSessionLocal() as db:
+        yield db
+
+
+async def get_async_read_db(request: Request) -> AsyncGenerator[AsyncSession, None]:
+    bind = async_read_replicas.read_engine(async_engine, reads_stick_to_primary(request.cookies))
+    async with AsyncSessionLocal(bind=bind) as db:
+        yield db
+
+
+# сессия запроса в роутерах: Session или AsyncSession (см. run_db)
+AnySession = Session | AsyncSession
+
+# зависимости для роутеров: sync- или async-сессия в зависимости от DB_ASYNC;
+# get_read_session — для публичных GET (реплики), get_session — для админки (primary)
+get_session = get_async_db if settings.db_async else get_db
+get_read_session = get_async_read_db if settings.db_async else get_read_db
+
+
+async def run_db(db: AnySession, fn, /, *args, **kwargs):
+    """Вызов CRUD-функции из async-обработчика.
+
+    Функции CRUD написаны над sync Session. С AsyncSession они выполняются через
+    run_sync (greenlet поверх async-драйвера, без потоков), с обычной Session —
+    в threadpool, как раньше выполнялись sync-обработчики целиком.
+    Результат должен быть загружен полностью: ленивые загрузки после выхода
+    отсюда в async-режиме невозможны.
+    """
+    if isinstance(db, AsyncSession):
+        return await db.run_sync(fn, *args, **kwargs)
+    return await run_in_threadpool(fn, db, *args, **kwargs)
+
+
+async def stream_db(db: AnySession, fn, /, *args, **kwargs) -> AsyncIterator:
+    """Как run_db, но для CRUD-генераторов (потоковые ответы).
+
+    С AsyncSession каждый next() генератора выполняется отдельным run_sync,
+    серверный курсор живёт между вызовами; с Session генератор итерируется
+    в threadpool.
+    """
+    if not isinstance(db, AsyncSession):
+        async for item in iterate_in_threadpool(fn(db, *args, **kwargs)):
+            yield item
+        return
+
+    done = object()
+    gen = fn(db.sync_session, *args, **kwargs)
+    try:
+        while True:
+            item = await db.run_sync(lambda _: next(gen, done))
+            if item is done:
+                return
+            yield item
+    finally:
+        await db.run_sync(lambda _: gen.close())
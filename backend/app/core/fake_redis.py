@@ -0,0 +1,141 @@
+"""Минимальный Redis-совместимый сервер (RESP2) для локальной работы без Redis.
+
+Поддерживает только то, что нужно кэшу ответов: PING, GET, SET [EX|PX],
+INCR/INCRBY, DEL, EXISTS, EXPIRE, FLUSHDB/FLUSHALL, SELECT. Данные в памяти процесса.
+
+    python -m app.core.fake_redis --port 6379
+"""
+
+import argparse
+import socketserver
+import threading
+import time
+
+
+class _Store:
+    def __init__(self):
+        self.lock = threading.Lock()
+        self.data: dict[bytes, tuple[bytes, float | None]] = {}
+
+    def get(self, key: bytes) -> bytes | None:
+        entry = self.data.get(key)
+        if entry is None:
+            return None
+        value, expires_at = entry
+        if expires_at is not None and expires_at <= time.monotonic():
+            del self.data[key]
+            return None
+        return value
+
+
+def _encode(value) -> bytes:
+    if value is None:
+        return b"$-1\r\n"
+    if isinstance(value, bool):
+        return b":%d\r\n" % int(value)
+    if isinstance(value, int):
+        return b":%d\r\n" % value
+    if isinstance(value, Exception):
+        return b"-ERR %s\r\n" % str(value).encode()
+    if isinstance(value, str):
+        return b"+%s\r\n" % value.encode()
+    return b"$%d\r\n%s\r\n" % (len(value), value)
+
+
+class _Handler(socketserver.StreamRequestHandler):
+    def _read_command(self) -> list[bytes] | None:
+        line = self.rfile.readline()
+        if not line:
+            return None
+        if not line.startswith(b"*"):
+            # inline-команда (например, из telnet)
+            return line.strip().split()
+        args = []
+        for _ in range(int(line[1:])):
+            length = int(self.rfile.readline()[1:])
+            args.append(self.rfile.read(length + 2)[:-2])
+        return args
+
+    def handle(self):
+        store: _Store = self.server.store
+        while True:
+            args = self._read_command()
+            if args is None:
+                return
+            if not args:
+                continue
+            try:
+                with store.lock:
+                    reply = self._execute(store, args[0].upper(), args[1:])
+            except (ValueError, IndexError) as e:
+                reply = ValueError(f"invalid arguments: {e}")
+            self.wfile.write(_encode(reply))
+
+    @staticmethod
+    def _execute(store: _Store, cmd: bytes, args: list[bytes]):
+        if cmd == b"PING":
+            return args[0] if args else "PONG"
+        if cmd == b"SELECT":
+            return "OK"
+        if cmd == b"GET":
+            return store.get(args[0])
+        if cmd == b"SET":
+            expires_at = None
+            opts = [a.upper() for a in args[2:]]
+            if b"EX" in opts:
+                expires_at = time.monotonic() + int(args[2 + opts.index(b"EX") + 1])
+            elif b"PX" in opts:
+                expires_at = time.monotonic() + int(args[2 + opts.index(b"PX") + 1]) / 1000
+            store.data[args[0]] = (args[1], expires_at)
+            return "OK"
+        if cmd in (b"INCR", b"INCRBY"):
+            value = int(store.get(args[0]) or 0) + (int(args[1]) if cmd == b"INCRBY" else 1)
+            expires_at = store.data.get(args[0], (None, None))[1]
+            store.data[args[0]] = (str(value).encode(), expires_at)
+            return value
+        if cmd == b"DEL":
+            return sum(store.data.pop(k, None) is not None for k in args)
+        if cmd == b"EXISTS":
+            return sum(store.get(k) is not None for k in args)
+        if cmd == b"EXPIRE":
+            if store.get(args[0]) is None:
+                return 0
+            store.data[args[0]] = (store.data[args[0]][0], time.monotonic() + int(args[1]))
+            return 1
+        if cmd in (b"FLUSHDB", b"FLUSHALL"):
+            store.data.clear()
+            return "OK"
+        return ValueError(f"unknown command '{cmd.decode(errors='replace')}'")
+
+
+class FakeRedisServer(socketserver.ThreadingTCPServer):
+    daemon_threads = True
+    allow_reuse_address = True
+
+    def __init__(self, host: str = "127.0.0.1", port: int = 6379):
+        super().__init__((host, port), _Handler)
+        self.store = _Store()
+
+    @property
+    def url(self) -> str:
+        host, port = self.server_address[:2]
+        return f"redis://{host}:{port}/0"
+
+    def start_in_thread(self) -> threading.Thread:
+        thread = threading.Thread(target=self.serve_forever, daemon=True)
+        thread.start()
+        return thread
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Fake Redis server for local development")
+    parser.add_argument("--host", default="127.0.0.1")
+    parser.add_argument("--port", type=int, default=6379)
+    args = parser.parse_args()
+    with FakeRedisServer(args.host, args.port) as server:
+        print(f"Fake Redis listening on {server.url}")
+        server.serve_forever()
+
+
+if __name__ == "__main__":
+    main()
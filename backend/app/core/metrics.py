@@ -0,0 +1,297 @@
+"""Метрики запросов в формате Prometheus и Server-Timing.
+
+Для каждого HTTP-запроса в contextvar живёт RequestStats: число SQL-запросов,
+время в БД, ожидание соединения из пула и именованные фазы (например,
+сериализация). Его наполняют хуки SQLAlchemy (install_query_hooks) и пул
+(app.core.pool), а MetricsMiddleware по завершении запроса пишет гистограммы
+с метками method/route/status и, если включено, заголовок Server-Timing.
+Contextvar копируется в threadpool и в greenlet AsyncSession.run_sync, поэтому
+учитываются и запросы из run_db.
+
+Реестр свой, без prometheus_client: метрик немного, а текстовый формат простой.
+Значения — на процесс (при нескольких воркерах Prometheus опрашивает каждый).
+"""
+
+import threading
+import time
+from contextlib import contextmanager
+from contextvars import ContextVar
+from dataclasses import dataclass, field
+
+from sqlalchemy import event
+from sqlalchemy.engine import Engine
+from starlette.datastructures import MutableHeaders
+from starlette.types import ASGIApp, Message, Receive, Scope, Send
+
+LATENCY_BUCKETS = (0.001, 0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1.0, 2.5, 5.0, 10.0)
+QUERY_COUNT_BUCKETS = (0, 1, 2, 3, 5, 10, 20, 50, 100)
+
+
+def _escape(value) -> str:
+    return str(value).replace("\\", "\\\\").replace('"', '\\"').replace("\n", "\\n")
+
+
+def _labels(pairs: list[tuple[str, object]]) -> str:
+    if not pairs:
+        return ""
+    return "{" + ",".join(f'{name}="{_escape(value)}"' for name, value in pairs) + "}"
+
+
+def _number(value: float) -> str:
+    if value == float("inf"):
+        return "+Inf"
+    return str(int(value)) if float(value).is_integer() else repr(float(value))
+
+
+class _Metric:
+    type = ""
+
+    def __init__(self, name: str, documentation: str, labelnames: tuple[str, ...] = ()):
+        self.name = name
+        self.documentation = documentation
+        self.labelnames = labelnames
+        self._lock = threading.Lock()
+        self._values: dict[tuple, object] = {}
+
+    def _key(self, labels: dict) -> tuple:
+        return tuple(str(labels.get(name, "")) for name in self.labelnames)
+
+    def render(self) -> list[str]:
+        lines = [f"# HELP {self.name} {self.documentation}", f"# TYPE {self.name} {self.type}"]
+        with self._lock:
+            for key in sorted(self._values):
+                lines.extend(self._render_value(list(zip(self.labelnames, key)), self._values[key]))
+        return lines
+
+    def clear(self) -> None:
+        with self._lock:
+            self._values.clear()
+
+
+class Counter(_Metric):
+    type = "counter"
+
+    def inc(self, amount: float = 1, **labels) -> None:
+        key = self._key(labels)
+        with self._lock:
+            self._values[key] = self._values.get(key, 0) + amount
+
+    def _render_value(self, labels, value):
+        return [f"{self.name}_total{_labels(labels)} {_number(value)}"]
+
+
+class Histogram(_Metric):
+    type = "histogram"
+
+    def __init__(self, name, documentation, labelnames=(), buckets=LATENCY_BUCKETS):
+        super().__init__(name, documentation, labelnames)
+        self.buckets = tuple(sorted(buckets)) + (float("inf"),)
+
+    def observe(self, value: float, **labels) -> None:
+        key = self._key(labels)
+        with self._lock:
+            entry = self._values.get(key)
+            if entry is None:
+                # [попадания по бакетам (не накопительные), сумма, количество]
+                entry = self._values[key] = [[0] * len(self.buckets), 0.0, 0]
+            for i, bound in enumerate(self.buckets):
+                if value <= bound:
+                    entry[0][i] += 1
+                    break
+            entry[1] += value
+            entry[2] += 1
+
+    def _render_value(self, labels, value):
+        counts, total, count = value
+        lines, cumulative = [], 0
+        for bound, n in zip(self.buckets, counts):
+            cumulative += n
+            lines.append(f"{self.name}_bucket{_labels(labels + [('le', _number(bound))])} {cumulative}")
+        lines.append(f"{self.name}_sum{_labels(labels)} {_number(total)}")
+        lines.append(f"{self.name}_count{_labels(labels)} {count}")
+        return lines
+
+
+class Gauge(_Metric):
+    type = "gauge"
+
+    def set(self, value: float, **labels) -> None:
+        with self._lock:
+            self._values[self._key(labels)] = value
+
+    def _render_value(self, labels, value):
+        return [f"{self.name}{_labels(labels)} {_number(value)}"]
+
+
+_registry: dict[str, _Metric] = {}
+
+
+def _register(metric):
+    _registry[metric.name] = metric
+    return metric
+
+
+def render_metrics() -> str:
+    lines = []
+    for metric in _registry.values():
+        lines.extend(metric.render())
+    return "\n".join(lines) + "\n"
+
+
+def reset_metrics() -> None:
+    for metric in _registry.values():
+        metric.clear()
+
+
+_ROUTE_LABELS = ("method", "route", "status")
+
+http_requests = _register(Counter("http_requests", "HTTP requests", _ROUTE_LABELS))
+http_request_duration = _register(
+    Histogram("http_request_duration_seconds", "Time from request to the last byte of the response", _ROUTE_LABELS)
+)
+http_request_db_duration = _register(
+    Histogram("http_request_db_seconds", "Time spent in SQL per request", _ROUTE_LABELS)
+)
+http_request_db_queries = _register(
+    Histogram("http_request_db_queries", "SQL statements per request", _ROUTE_LABELS, QUERY_COUNT_BUCKETS)
+)
+http_request_pool_wait = _register(
+    Histogram("http_request_pool_wait_seconds", "Time waiting for a pooled connection per request", _ROUTE_LABELS)
+)
+http_request_phase_duration = _register(
+    Histogram(
+        "http_request_phase_seconds", "Time in named request phases (serialize, ...)", ("method", "route", "phase")
+    )
+)
+db_query_duration = _register(Histogram("db_query_duration_seconds", "Duration of single SQL statements"))
+cache_hits = _register(Gauge("cache_hits", "Hits of in-process caches", ("cache",)))
+cache_misses = _register(Gauge("cache_misses", "Misses of in-process caches", ("cache",)))
+cache_size = _register(Gauge("cache_size", "Entries in in-process caches", ("cache",)))
+pool_checked_out = _register(Gauge("db_pool_checked_out", "Connections in use", ("pool",)))
+pool_checkout_wait = _register(Gauge("db_pool_checkout_wait_seconds", "Total pool checkout time", ("pool",)))
+
+
+@dataclass
+class RequestStats:
+    # "GET /api/movies?genre_id=1" — для журнала медленных запросов
+    request: str = ""
+    queries: int = 0
+    db_time: float = 0.0
+    pool_wait: float = 0.0
+    phases: dict[str, float] = field(default_factory=dict)
+
+
+_current: ContextVar[RequestStats | None] = ContextVar("request_stats", default=None)
+
+
+def current_stats() -> RequestStats | None:
+    """Статистика текущего HTTP-запроса (None вне запроса: CLI, фоновые задачи)."""
+    return _current.get()
+
+
+@contextmanager
+def phase(name: str):
+    """Засечь фазу запроса: with phase("serialize"): ..."""
+    start = time.perf_counter()
+    try:
+        yield
+    finally:
+        stats = _current.get()
+        if stats is not None:
+            stats.phases[name] = stats.phases.get(name, 0.0) + time.perf_counter() - start
+
+
+def record_pool_wait(seconds: float) -> None:
+    stats = _current.get()
+    if stats is not None:
+        stats.pool_wait += seconds
+
+
+def _before_cursor_execute(conn, cursor, statement, parameters, context, executemany):
+    context._metrics_start = time.perf_counter()
+
+
+def _after_cursor_execute(conn, cursor, statement, parameters, context, executemany):
+    start = getattr(context, "_metrics_start", None)
+    if start is None:
+        return
+    elapsed = time.perf_counter() - start
+    db_query_duration.observe(elapsed)
+    stats = _current.get()
+    if stats is not None:
+        stats.queries += 1
+        stats.db_time += elapsed
+
+
+_hooks_installed = False
+
+
+def install_query_hooks() -> None:
+    """Учёт SQL для всех Engine процесса (primary, реплики, sync_engine асинхронных)."""
+    global _hooks_installed
+    if _hooks_installed:
+        return
+    event.listen(Engine, "before_cursor_execute", _before_cursor_execute)
+    event.listen(Engine, "after_cursor_execute", _after_cursor_execute)
+    _hooks_installed = True
+
+
+def server_timing(stats: RequestStats, total: float) -> str:
+    """Значение заголовка Server-Timing (длительности в мс)."""
+    parts = [
+        f'db;dur={stats.db_time * 1000:.2f};desc="{stats.queries} queries"',
+        f"pool;dur={stats.pool_wait * 1000:.2f}",
+    ]
+    parts.extend(f"{name};dur={seconds * 1000:.2f}" for name, seconds in stats.phases.items())
+    parts.append(f"app;dur={total * 1000:.2f}")
+    return ", ".join(parts)
+
+
+class MetricsMiddleware:
+    """Пишет метрики запроса после отправки последнего байта ответа.
+
+    route — шаблон пути ("/api/movies/{movie_id}"), а не сам путь, чтобы число
+    рядов не росло с числом id; для ненайденных маршрутов — "<unmatched>".
+    """
+
+    def __init__(self, app: ASGIApp, *, server_timing: bool = False):
+        self.app = app
+        self.server_timing = server_timing
+
+    async def __call__(self, scope: Scope, receive: Receive, send: Send) -> None:
+        if scope["type"] != "http":
+            await self.app(scope, receive, send)
+            return
+
+        query = scope.get("query_string", b"").decode("latin-1")
+        stats = RequestStats(request=f"{scope['method']} {scope['path']}" + (f"?{query}" if query else ""))
+        token = _current.set(stats)
+        start = time.perf_counter()
+        status = 500
+
+        async def send_wrapper(message: Message) -> None:
+            nonlocal status
+            if message["type"] == "http.response.start":
+                status = message["status"]
+                if self.server_timing:
+                    headers = MutableHeaders(raw=message["headers"])
+                    headers.append("Server-Timing", server_timing(stats, time.perf_counter() - start))
+            await send(message)
+
+        try:
+            await self.app(scope, receive, send_wrapper)
+        finally:
+            _current.reset(token)
+            route = scope.get("route")
+            labels = {
+                "method": scope["method"],
+                "route": getattr(route, "path", None) or "<unmatched>",
+                "status": status,
+            }
+            http_requests.inc(**labels)
+            http_request_duration.observe(time.perf_counter() - start, **labels)
+            http_request_db_duration.observe(stats.db_time, **labels)
+            http_request_db_queries.observe(stats.queries, **labels)
+            http_request_pool_wait.observe(stats.pool_wait, **labels)
+            for name, seconds in stats.phases.items():
+                http_request_phase_duration.observe(seconds, method=labels["method"], route=labels["route"], phase=name)
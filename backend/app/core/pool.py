@@ -0,0 +1,133 @@
+"""Настройки пула соединений и его статистика.
+
+Пул и таймаут запросов задаются через Settings (DB_POOL_*, DB_STATEMENT_TIMEOUT_MS).
+InstrumentedQueuePool дополнительно считает время выдачи соединения из пула
+(ожидание свободного соединения + создание нового + pre-ping), чтобы размер пула
+подбирать по данным.
+"""
+
+import threading
+import time
+
+from sqlalchemy import exc, text
+from sqlalchemy.engine import make_url
+from sqlalchemy.orm import Session
+from sqlalchemy.pool import AsyncAdaptedQueuePool, QueuePool
+
+from app.core.config import settings
+from app.core.metrics import record_pool_wait
+
+
+class PoolStats:
+    """Счётчики выдачи соединений одного пула."""
+
+    def __init__(self):
+        self._lock = threading.Lock()
+        self.checkouts = 0
+        self.timeouts = 0
+        self.wait_total = 0.0
+        self.wait_max = 0.0
+
+    def record(self, seconds: float, timed_out: bool = False) -> None:
+        with self._lock:
+            if timed_out:
+                self.timeouts += 1
+            else:
+                self.checkouts += 1
+            self.wait_total += seconds
+            self.wait_max = max(self.wait_max, seconds)
+
+    def snapshot(self) -> dict:
+        with self._lock:
+            calls = self.checkouts + self.timeouts
+            return {
+                "checkouts": self.checkouts,
+                "timeouts": self.timeouts,
+                "wait_total_ms": round(self.wait_total * 1000, 3),
+                "wait_avg_ms": round(self.wait_total * 1000 / calls, 3) if calls else 0.0,
+                "wait_max_ms": round(self.wait_max * 1000, 3),
+            }
+
+
+class _InstrumentedMixin:
+    def __init__(self, *args, **kwargs):
+        super().__init__(*args, **kwargs)
+        self.stats = PoolStats()
+
+    def connect(self):
+        start = time.perf_counter()
+        try:
+            conn = super().connect()
+        except exc.TimeoutError:
+            self.stats.record(time.perf_counter() - start, timed_out=True)
+            raise
+        elapsed = time.perf_counter() - start
+        self.stats.record(elapsed)
+        record_pool_wait(elapsed)
+        return conn
+
+
+class InstrumentedQueuePool(_InstrumentedMixin, QueuePool):
+    pass
+
+
+class InstrumentedAsyncQueuePool(_InstrumentedMixin, AsyncAdaptedQueuePool):
+    pass
+
+
+def engine_options(url: str, *, is_async: bool = False) -> dict:
+    """kwargs для create_engine/create_async_engine по настройкам пула.
+
+    Для SQLite пул и таймауты не настраиваются (свой пул по умолчанию).
+    """
+    parsed = make_url(url)
+    if parsed.get_backend_name() == "sqlite":
+        return {}
+
+    options = {
+        "poolclass": InstrumentedAsyncQueuePool if is_async else InstrumentedQueuePool,
+        "pool_size": settings.db_pool_size,
+        "max_overflow": settings.db_max_overflow,
+        "pool_timeout": settings.db_pool_timeout,
+        "pool_recycle": settings.db_pool_recycle,
+        "pool_pre_ping": settings.db_pool_pre_ping,
+    }
+
+    timeout_ms = settings.db_statement_timeout_ms
+    if timeout_ms and parsed.get_backend_name() == "postgresql":
+        # таймаут на стороне сервера для всех запросов соединения
+        if parsed.get_driver_name() == "asyncpg":
+            options["connect_args"] = {"server_settings": {"statement_timeout": str(timeout_ms)}}
+        else:
+            options["connect_args"] = {"options": f"-c statement_timeout={timeout_ms}"}
+    return options
+
+
+def set_statement_timeout(db: Session, timeout_ms: int) -> None:
+    """Таймаут запросов только для текущей транзакции (SET LOCAL, Postgres).
+
+    Для запросов, которым нужен другой лимит, чем DB_STATEMENT_TIMEOUT_MS
+    (например, выгрузки). 0 — без ограничения.
+    """
+    if db.get_bind().dialect.name != "postgresql":
+        return
+    db.execute(text(f"SET LOCAL statement_timeout = {int(timeout_ms)}"))
+
+
+def pool_status(engine) -> dict:
+    """Текущее состояние пула движка + накопленная статистика выдачи."""
+    pool = engine.pool
+    status = {"class": type(pool).__name__}
+    if isinstance(pool, QueuePool):
+        status.update(
+            size=pool.size(),
+            checked_in=pool.checkedin(),
+            checked_out=pool.checkedout(),
+            overflow=max(pool.overflow(), 0),
+            max_overflow=pool._max_overflow,
+            timeout=pool.timeout(),
+        )
+    stats = getattr(pool, "stats", None)
+    if stats is not None:
+        status["checkout"] = stats.snapshot()
+    return status
@@ -0,0 +1,93 @@
+"""Маршрутизация чтения на реплики.
+
+Публичные GET-эндпоинты читают с реплик (round-robin), админка пишет и читает
+через primary. Реплика, на которой случился обрыв соединения или ошибка
+подключения, исключается из ротации на REPLICA_EJECT_SECONDS. Если здоровых
+реплик нет — чтение идёт на primary.
+
+Read-your-writes: ответ на админскую мутацию ставит клиенту cookie
+STICKY_COOKIE со временем, до которого его чтение идёт на primary
+(REPLICA_STICKY_SECONDS), чтобы он не увидел реплику без своих изменений.
+Окно своё у каждого клиента и действует на любом воркере и инстансе;
+чтение остальных клиентов продолжает идти на реплики.
+"""
+
+import itertools
+import math
+import threading
+import time
+from collections.abc import Mapping
+
+from sqlalchemy import event
+from starlette.responses import Response
+
+from app.core.config import settings
+
+# cookie с unix-временем, до которого чтение клиента идёт на primary
+STICKY_COOKIE = "read_primary_until"
+
+
+def mark_primary_write(response: Response) -> None:
+    """Отметить запись клиента в primary: открывает его окно read-your-writes."""
+    seconds = settings.replica_sticky_seconds
+    if seconds <= 0:
+        return
+    response.set_cookie(
+        STICKY_COOKIE,
+        f"{time.time() + seconds:.3f}",
+        max_age=math.ceil(seconds),
+        httponly=True,
+        samesite="lax",
+    )
+
+
+def reads_stick_to_primary(cookies: Mapping[str, str]) -> bool:
+    """Окно read-your-writes клиента (по cookie запроса) ещё открыто."""
+    try:
+        return time.time() < float(cookies.get(STICKY_COOKIE, 0))
+    except ValueError:
+        return False
+
+
+class ReplicaSet:
+    """Набор движков реплик с round-robin и исключением нездоровых."""
+
+    def __init__(self, engines: list):
+        self.engines = engines
+        self._counter = itertools.count()
+        self._lock = threading.Lock()
+        self._ejected_until: dict[int, float] = {}
+        for index, engine in enumerate(engines):
+            sync_engine = getattr(engine, "sync_engine", engine)
+            event.listen(sync_engine, "handle_error", self._error_listener(index))
+
+    def _error_listener(self, index: int):
+        def on_error(context):
+            # обрыв соединения или ошибка при подключении (connection ещё нет);
+            # ошибки самих запросов (таймауты, синтаксис) реплику не выключают
+            if context.is_disconnect or context.connection is None:
+                self.eject(index)
+
+        return on_error
+
+    def eject(self, index: int) -> None:
+        with self._lock:
+            self._ejected_until[index] = time.monotonic() + settings.replica_eject_seconds
+
+    def healthy(self) -> list[int]:
+        now = time.monotonic()
+        with self._lock:
+            return [i for i in range(len(self.engines)) if self._ejected_until.get(i, 0.0) <= now]
+
+    def pick(self):
+        """Следующая здоровая реплика или None (тогда читать с primary)."""
+        healthy = self.healthy()
+        if not healthy:
+            return None
+        return self.engines[healthy[next(self._counter) % len(healthy)]]
+
+    def read_engine(self, primary, sticky: bool = False):
+        """Движок для чтения; sticky — у клиента открыто окно read-your-writes."""
+        if sticky:
+            return primary
+        return self.pick() or primary
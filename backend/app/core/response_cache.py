@@ -0,0 +1,210 @@
+"""Общий кэш сериализованных ответов (списки фильмов).
+
+Бэкенды: "none" — кэш выключен, "memory" — в памяти процесса (тесты, один
+инстанс), "redis" — любой Redis-совместимый сервер, общий для всех реплик
+сервиса (в т.ч. app.core.fake_redis для локальной работы).
+
+Инвалидация через поколение: в ключ входит текущий номер поколения каталога,
+мутации фильмов увеличивают его (bump_generation) — старые записи просто
+перестают читаться и истекают по TTL.
+"""
+
+import abc
+import hashlib
+import json
+import logging
+import threading
+import time
+
+from starlette.concurrency import run_in_threadpool
+
+from app.core.cache import register_cache
+from app.core.config import settings
+
+logger = logging.getLogger(__name__)
+
+GENERATION_KEY = "catalog:generation"
+
+
+class CacheBackend(abc.ABC):
+    # хранит ли бэкенд значения (у "none" есть только поколение)
+    stores_values = True
+    # вызовы ждут сеть: из async-кода — только через threadpool
+    blocking = False
+
+    @abc.abstractmethod
+    def get(self, key: str) -> bytes | None: ...
+
+    @abc.abstractmethod
+    def set(self, key: str, value: bytes, ttl: int) -> None: ...
+
+    @abc.abstractmethod
+    def generation(self) -> int | None:
+        """Текущее поколение каталога; None — бэкенд недоступен."""
+
+    @abc.abstractmethod
+    def bump_generation(self) -> int | None: ...
+
+
+class NullBackend(CacheBackend):
+    """Ничего не хранит; поколение — локальный счётчик процесса."""
+
+    stores_values = False
+
+    def __init__(self):
+        self._lock = threading.Lock()
+        # старт не с 0, чтобы поколения разных запусков процесса не совпадали
+        self._generation = time.time_ns()
+
+    def get(self, key):
+        return None
+
+    def set(self, key, value, ttl):
+        pass
+
+    def generation(self):
+        return self._generation
+
+    def bump_generation(self):
+        with self._lock:
+            self._generation += 1
+            return self._generation
+
+
+class MemoryBackend(NullBackend):
+    stores_values = True
+
+    def __init__(self, maxsize: int = 4096):
+        super().__init__()
+        self._data = register_cache("responses", maxsize=maxsize, ttl=settings.response_cache_ttl)
+
+    def get(self, key):
+        return self._data.get(key)
+
+    def set(self, key, value, ttl):
+        self._data.set(key, value, ttl=ttl)
+
+
+class RedisBackend(CacheBackend):
+    """Redis-протокол. Ошибки Redis не роняют запросы: кэш просто пропускается."""
+
+    blocking = True
+
+    def __init__(self, url: str):
+        try:
+            import redis
+        except ImportError as e:  # pragma: no cover - зависит от окружения
+            raise RuntimeError("RESPONSE_CACHE_BACKEND=redis requires the 'redis' package") from e
+        self._errors = redis.RedisError
+        # RESP2: его понимают и старые Redis, и app.core.fake_redis
+        self._client = redis.Redis.from_url(url, protocol=2, socket_timeout=0.5, socket_connect_timeout=0.5)
+
+    def get(self, key):
+        try:
+            return self._client.get(key)
+        except self._errors as e:
+            logger.warning("response cache get failed: %s", e)
+            return None
+
+    def set(self, key, value, ttl):
+        try:
+            self._client.set(key, value, ex=ttl)
+        except self._errors as e:
+            logger.warning("response cache set failed: %s", e)
+
+    def generation(self):
+        try:
+            return int(self._client.get(GENERATION_KEY) or 0)
+        except self._errors as e:
+            logger.warning("response cache generation read failed: %s", e)
+            return None
+
+    def bump_generation(self):
+        try:
+            return int(self._client.incr(GENERATION_KEY))
+        except self._errors as e:
+            logger.error("response cache generation bump failed: %s", e)
+            return None
+
+
+def params_digest(params: dict) -> str:
+    """Хэш параметров запроса: без None, порядок ключей и значений списков не важен."""
+    normalized = {
+        k: sorted(v) if isinstance(v, (list, tuple, set)) else v
+        for k, v in sorted(params.items())
+        if v is not None
+    }
+    return hashlib.sha1(json.dumps(normalized, sort_keys=True, default=str).encode()).hexdigest()
+
+
+def make_backend(kind: str, url: str | None = None) -> CacheBackend:
+    if kind == "none":
+        return NullBackend()
+    if kind == "memory":
+        return MemoryBackend()
+    if kind == "redis":
+        return RedisBackend(url or settings.response_cache_url)
+    raise ValueError(f"Unknown response cache backend: {kind}")
+
+
+class ResponseCache:
+    def __init__(self, backend: CacheBackend, ttl: int):
+        self.backend = backend
+        self.ttl = ttl
+
+    @property
+    def enabled(self) -> bool:
+        return self.backend.stores_values and self.ttl > 0
+
+    def key(self, namespace: str, params: dict, version: int) -> str | None:
+        """Ключ по версии каталога и нормализованным параметрам (без None, списки отсортированы).
+
+        version — версия каталога, которую видит сессия запроса (та же, что в
+        ETag): ответ отстающей реплики ляжет под свою старую версию и не
+        достанется запросам, которые уже видят новую.
+        None — поколение неизвестно (бэкенд недоступен), кэш пропускаем.
+        """
+        generation = self.backend.generation()
+        if generation is None:
+            return None
+        return f"{namespace}:{generation}:{version}:{params_digest(params)}"
+
+    def lookup(self, namespace: str, params: dict, version: int) -> tuple[str | None, bytes | None]:
+        """Ключ и закэшированное значение (None, если нет) — одним вызовом."""
+        if not self.enabled:
+            return None, None
+        key = self.key(namespace, params, version)
+        return key, self.get(key)
+
+    def get(self, key: str | None) -> bytes | None:
+        if not self.enabled or key is None:
+            return None
+        return self.backend.get(key)
+
+    def set(self, key: str | None, value: bytes) -> None:
+        if self.enabled and key is not None:
+            self.backend.set(key, value, self.ttl)
+
+    def bump_generation(self) -> int | None:
+        return self.backend.bump_generation()
+
+    # для async-обработчиков: сетевой бэкенд (sync-клиент Redis) — в threadpool,
+    # чтобы медленный или лежащий Redis не останавливал event loop
+
+    async def lookup_async(self, namespace: str, params: dict, version: int) -> tuple[str | None, bytes | None]:
+        return await self._run(self.lookup, namespace, params, version)
+
+    async def set_async(self, key: str | None, value: bytes) -> None:
+        if key is not None:
+            await self._run(self.set, key, value)
+
+    async def _run(self, fn, *args):
+        if self.backend.blocking:
+            return await run_in_threadpool(fn, *args)
+        return fn(*args)
+
+
+response_cache = ResponseCache(
+    make_backend(settings.response_cache_backend, settings.response_cache_url),
+    ttl=settings.response_cache_ttl,
+)
@@ -0,0 +1,198 @@
+"""Журнал медленных SQL-запросов.
+
+Запросы дольше settings.slow_query_ms пишутся в лог "app.slow_queries" одной
+JSON-строкой (нормализованный SQL, отпечаток, типы параметров без значений,
+длительность, HTTP-запрос) и агрегируются по отпечатку для админки. Для доли
+slow_query_explain_rate медленных SELECT дополнительно снимается план:
+EXPLAIN (ANALYZE, BUFFERS, FORMAT JSON) в Postgres (запрос выполняется
+повторно!), EXPLAIN QUERY PLAN в SQLite.
+"""
+
+import hashlib
+import json
+import logging
+import random
+import re
+import threading
+import time
+
+from sqlalchemy import event
+from sqlalchemy.engine import Engine
+
+from app.core.config import settings
+from app.core.metrics import current_stats
+
+logger = logging.getLogger("app.slow_queries")
+
+# плейсхолдеры наших драйверов: psycopg2 (%(name)s), sqlite (?), asyncpg ($1)
+_PARAM = r"(?:%\(\w+\)s|%s|\$\d+|\?)"
+_IN_LIST_RE = re.compile(rf"\bIN\s*\(\s*{_PARAM}(?:\s*,\s*{_PARAM})*\s*\)", re.I)
+_PARAM_RE = re.compile(_PARAM)
+_LITERAL_RE = re.compile(r"'(?:[^']|'')*'|\b\d+(?:\.\d+)?\b")
+_SPACE_RE = re.compile(r"\s+")
+
+
+def normalize_sql(statement: str) -> str:
+    """SQL без значений: параметры и литералы -> ?, списки IN (...) схлопнуты."""
+    sql = _SPACE_RE.sub(" ", statement).strip()
+    sql = _IN_LIST_RE.sub("IN (...)", sql)
+    sql = _PARAM_RE.sub("?", sql)
+    return _LITERAL_RE.sub("?", sql)
+
+
+def fingerprint(normalized: str) -> str:
+    return hashlib.sha1(normalized.encode()).hexdigest()[:16]
+
+
+def _type_name(value) -> str:
+    if isinstance(value, (list, tuple)):
+        return f"{type(value).__name__}[{len(value)}]"
+    return type(value).__name__
+
+
+def parameter_shape(parameters, executemany: bool):
+    """Типы параметров без значений: {"title_1": "str"} / ["int", "str"]."""
+    if executemany:
+        rows = list(parameters or ())
+        return {"executemany": len(rows), "row": parameter_shape(rows[0], False) if rows else None}
+    if isinstance(parameters, dict):
+        return {name: _type_name(value) for name, value in parameters.items()}
+    if isinstance(parameters, (list, tuple)):
+        return [_type_name(value) for value in parameters]
+    return None
+
+
+class SlowQueryLog:
+    """Агрегаты медленных запросов по отпечатку (на процесс)."""
+
+    def __init__(self, max_fingerprints: int = 500):
+        self.max_fingerprints = max_fingerprints
+        self._lock = threading.Lock()
+        self._entries: dict[str, dict] = {}
+        self.dropped = 0
+
+    def record(self, entry: dict) -> None:
+        with self._lock:
+            agg = self._entries.get(entry["fingerprint"])
+            if agg is None:
+                if len(self._entries) >= self.max_fingerprints:
+                    self.dropped += 1
+                    return
+                agg = self._entries[entry["fingerprint"]] = {
+                    "fingerprint": entry["fingerprint"],
+                    "sql": entry["sql"],
+                    "count": 0,
+                    "total_ms": 0.0,
+                    "max_ms": 0.0,
+                    "plan": None,
+                }
+            agg["count"] += 1
+            agg["total_ms"] = round(agg["total_ms"] + entry["duration_ms"], 3)
+            agg["max_ms"] = max(agg["max_ms"], entry["duration_ms"])
+            agg["last_params"] = entry["params"]
+            agg["last_request"] = entry["request"]
+            agg["last_seen"] = entry["ts"]
+            if entry.get("plan") is not None:
+                agg["plan"] = entry["plan"]
+
+    def top(self, limit: int = 50, order_by: str = "total_ms") -> list[dict]:
+        with self._lock:
+            entries = [dict(e) for e in self._entries.values()]
+        for e in entries:
+            e["avg_ms"] = round(e["total_ms"] / e["count"], 3)
+        return sorted(entries, key=lambda e: e[order_by], reverse=True)[:limit]
+
+    def clear(self) -> int:
+        with self._lock:
+            removed = len(self._entries)
+            self._entries.clear()
+            self.dropped = 0
+            return removed
+
+
+slow_query_log = SlowQueryLog()
+
+
+_SAVEPOINT = "slow_query_explain"
+
+
+def _explain(conn, statement: str, parameters) -> object | None:
+    """План запроса отдельным курсором того же соединения (результаты исходного не трогаем).
+
+    В Postgres EXPLAIN ANALYZE выполняет запрос повторно и может упасть (чаще
+    всего по statement_timeout), а ошибка обрывает транзакцию запроса — поэтому
+    план снимается под SAVEPOINT, и при ошибке транзакция откатывается к нему.
+    """
+    dialect = conn.dialect.name
+    if dialect == "postgresql":
+        prefix = "EXPLAIN (ANALYZE, BUFFERS, FORMAT JSON) "
+    elif dialect == "sqlite":
+        prefix = "EXPLAIN QUERY PLAN "
+    else:
+        return None
+    savepoint = dialect == "postgresql" and conn.in_transaction()
+    cursor = conn.connection.cursor()
+    try:
+        if savepoint:
+            cursor.execute(f"SAVEPOINT {_SAVEPOINT}")
+        try:
+            cursor.execute(prefix + statement, parameters)
+            rows = cursor.fetchall()
+        except Exception as e:  # план — best effort, исходный запрос уже выполнен
+            if savepoint:
+                cursor.execute(f"ROLLBACK TO SAVEPOINT {_SAVEPOINT}")
+            return {"error": str(e)}
+        if savepoint:
+            cursor.execute(f"RELEASE SAVEPOINT {_SAVEPOINT}")
+    finally:
+        cursor.close()
+    if dialect == "postgresql":
+        plan = rows[0][0]
+        return json.loads(plan) if isinstance(plan, str) else plan
+    return [row[-1] for row in rows]
+
+
+def _before_cursor_execute(conn, cursor, statement, parameters, context, executemany):
+    context._slow_query_start = time.perf_counter()
+
+
+def _after_cursor_execute(conn, cursor, statement, parameters, context, executemany):
+    start = getattr(context, "_slow_query_start", None)
+    threshold = settings.slow_query_ms
+    if start is None or threshold <= 0:
+        return
+    duration_ms = (time.perf_counter() - start) * 1000
+    if duration_ms < threshold:
+        return
+
+    normalized = normalize_sql(statement)
+    stats = current_stats()
+    entry = {
+        "event": "slow_query",
+        "ts": round(time.time(), 3),
+        "fingerprint": fingerprint(normalized),
+        "duration_ms": round(duration_ms, 3),
+        "sql": normalized,
+        "params": parameter_shape(parameters, executemany),
+        "request": stats.request if stats is not None else None,
+        "plan": None,
+    }
+    is_select = normalized.upper().startswith(("SELECT", "WITH"))
+    rate = settings.slow_query_explain_rate
+    if is_select and not executemany and rate > 0 and random.random() < rate:
+        entry["plan"] = _explain(conn, statement, parameters)
+
+    logger.warning(json.dumps(entry, ensure_ascii=False, default=str))
+    slow_query_log.record(entry)
+
+
+_installed = False
+
+
+def install_slow_query_log() -> None:
+    global _installed
+    if _installed:
+        return
+    event.listen(Engine, "before_cursor_execute", _before_cursor_execute)
+    event.listen(Engine, "after_cursor_execute", _after_cursor_execute)
+    _installed = True
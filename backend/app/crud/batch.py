@@ -0,0 +1,120 @@
+"""Пакет изменений фильмов от админки (POST /api/admin/movies:batch).
+
+Операции выполняются по порядку, пачками по chunk_size: пачка — одна
+транзакция с одним поднятием версии каталога и одним сбросом кэшей на все
+затронутые фильмы. Каждая операция идёт в SAVEPOINT: ошибочная откатывается
+одна и попадает в результаты, остальные продолжаются. В режиме atomic весь
+пакет — одна транзакция, и первая ошибка откатывает его целиком.
+
+В результате операции — id и версия фильма: карточка со связями не
+перечитывается (для этого есть GET /api/movies/batch).
+"""
+
+from sqlalchemy.exc import DBAPIError
+from sqlalchemy.orm import Session
+
+from app.crud.movies import (
+    _catalog_changed,
+    _catalog_changing,
+    stage_create_movie,
+    stage_delete_movie,
+    stage_patch_movie,
+    stage_update_movie,
+)
+from app.crud.reference_ids import invalidate_reference_ids
+from app.schemas.movie import BatchCreate, BatchDelete, BatchOperation, BatchUpdate
+
+BATCH_MAX_OPERATIONS = 10_000
+
+
+class _OperationError(Exception):
+    def __init__(self, status: int, message: str):
+        super().__init__(message)
+        self.status = status
+
+
+def _execute(db: Session, op: BatchOperation) -> dict:
+    """Выполнить операцию в текущей транзакции. Ошибки — _OperationError."""
+    try:
+        if isinstance(op, BatchCreate):
+            movie = stage_create_movie(db, **op.movie.model_dump())
+            return {"status": 201, "id": movie.id, "version": movie.version}
+        if isinstance(op, BatchDelete):
+            if not stage_delete_movie(db, op.id):
+                raise _OperationError(404, "Movie not found")
+            return {"status": 204, "id": op.id}
+        if isinstance(op, BatchUpdate):
+            movie = stage_update_movie(db, op.id, **op.movie.model_dump())
+        else:
+            movie = stage_patch_movie(db, op.id, **op.movie.changes())
+        if movie is None:
+            raise _OperationError(404, "Movie not found")
+        return {"status": 200, "id": movie.id, "version": movie.version}
+    except ValueError as e:
+        raise _OperationError(400, str(e))
+    except DBAPIError as e:
+        # обычно внешний ключ: карта id справочников устарела (см. app.crud.reference_ids)
+        invalidate_reference_ids()
+        raise _OperationError(409, f"Database error: {e.orig}")
+
+
+def _commit(db: Session, movie_ids: list[int]) -> None:
+    if not movie_ids:
+        db.commit()
+        return
+    movie_ids = list(dict.fromkeys(movie_ids))
+    _catalog_changing(db, movie_ids)
+    db.commit()
+    _catalog_changed(db, movie_ids)
+
+
+def _report(results: list[dict], failed: int, committed: bool) -> dict:
+    return {
+        "processed": len(results),
+        "succeeded": len(results) - failed,
+        "failed": failed,
+        "committed": committed,
+        "results": results,
+    }
+
+
+def apply_movie_batch(
+    db: Session, operations: list[BatchOperation], *, chunk_size: int, atomic: bool = False
+) -> dict:
+    results: list[dict] = []
+    touched: list[int] = []
+    failed = 0
+    pending = 0  # операций с последнего commit, успешных и нет
+    # atomic: весь пакет под одним SAVEPOINT — откат не задевает внешнюю транзакцию сессии
+    batch = db.begin_nested() if atomic else None
+
+    for index, op in enumerate(operations):
+        result = {"index": index, "op": op.op}
+        try:
+            if atomic:
+                result.update(_execute(db, op))
+            else:
+                with db.begin_nested():
+                    result.update(_execute(db, op))
+        except _OperationError as e:
+            result.update(status=e.status, id=getattr(op, "id", None), error=str(e))
+            failed += 1
+            if atomic:
+                results.append(result)
+                batch.rollback()
+                db.commit()
+                return _report(results, failed, committed=False)
+        else:
+            touched.append(result["id"])
+        results.append(result)
+
+        pending += 1
+        if not atomic and pending == chunk_size:
+            _commit(db, touched)
+            touched = []
+            pending = 0
+
+    if batch is not None:
+        batch.commit()
+    _commit(db, touched)
+    return _report(results, failed, committed=True)
@@ -0,0 +1,167 @@
+"""Потоковый массовый импорт фильмов (NDJSON).
+
+Строки копятся пачками по chunk_size. На пачку: id справочников проверяются
+по общей карте id в памяти (app.crud.reference_ids, без запросов к БД),
+фильмы вставляются одним executemany с RETURNING id, связи — executemany
+(в Postgres через psycopg2 — COPY). Каждая пачка — своя транзакция.
+Ошибочные строки попадают в отчёт и не прерывают импорт.
+"""
+
+import csv
+import io
+import json
+
+from pydantic import ValidationError
+from sqlalchemy import insert
+from sqlalchemy.exc import DBAPIError
+from sqlalchemy.orm import Session
+
+from app.crud.movies import _catalog_changed, _catalog_changing
+from app.crud.reference_ids import missing_ids
+from app.models.association_tables import movie_country, movie_genre, movie_person
+from app.models.movie import Movie
+from app.schemas.movie import MovieCreate
+
+# поле MovieCreate -> (таблица связи, колонка id справочника)
+_REFERENCES = {
+    "genre_ids": (movie_genre, "genre_id"),
+    "country_ids": (movie_country, "country_id"),
+    "person_ids": (movie_person, "person_id"),
+}
+
+
+def _copy_rows(db: Session, table, columns: tuple[str, ...], rows: list[tuple]) -> None:
+    """Вставка строк таблицы связей: COPY для psycopg2, иначе executemany."""
+    if not rows:
+        return
+    conn = db.connection()
+    if conn.dialect.name == "postgresql" and conn.dialect.driver == "psycopg2":
+        buf = io.StringIO()
+        csv.writer(buf).writerows(rows)
+        buf.seek(0)
+        cursor = conn.connection.driver_connection.cursor()
+        try:
+            cursor.copy_expert(f"COPY {table.name} ({', '.join(columns)}) FROM STDIN WITH (FORMAT csv)", buf)
+        finally:
+            cursor.close()
+        return
+    db.execute(insert(table), [dict(zip(columns, row)) for row in rows])
+
+
+class MovieImporter:
+    """Импорт потока строк NDJSON: add() по строке, flush(db) по заполнении пачки."""
+
+    def __init__(self, chunk_size: int = 1000, max_errors: int = 1000):
+        self.chunk_size = chunk_size
+        self.max_errors = max_errors
+        self._chunk: list[tuple[int, MovieCreate]] = []
+        self.processed = 0
+        self.inserted = 0
+        self.failed = 0
+        self.errors: list[dict] = []
+
+    def _error(self, line: int, message: str) -> None:
+        self.failed += 1
+        if len(self.errors) < self.max_errors:
+            self.errors.append({"line": line, "error": message})
+
+    def add(self, line_no: int, raw: str | dict) -> bool:
+        """Разобрать строку. Возвращает True, когда пачку пора записать (flush)."""
+        self.processed += 1
+        try:
+            data = json.loads(raw) if isinstance(raw, str) else raw
+            movie = MovieCreate.model_validate(data)
+        except json.JSONDecodeError as e:
+            self._error(line_no, f"Invalid JSON: {e.msg}")
+        except ValidationError as e:
+            self._error(line_no, "; ".join(f"{'.'.join(map(str, err['loc']))}: {err['msg']}" for err in e.errors()))
+        else:
+            self._chunk.append((line_no, movie))
+        return len(self._chunk) >= self.chunk_size
+
+    def flush(self, db: Session) -> None:
+        """Записать накопленную пачку одной транзакцией."""
+        chunk, self._chunk = self._chunk, []
+        valid = self._check_references(db, chunk)
+        if not valid:
+            return
+        try:
+            movie_ids = self._insert(db, valid)
+            _catalog_changing(db, movie_ids)
+            db.commit()
+        except DBAPIError:
+            db.rollback()
+            # пачка не прошла целиком — пишем по строке, чтобы найти виноватую
+            valid = self._insert_one_by_one(db, valid)
+        else:
+            _catalog_changed(db, movie_ids)
+        self.inserted += len(valid)
+
+    def _check_references(self, db: Session, chunk: list[tuple[int, MovieCreate]]):
+        requested = {field: set() for field in _REFERENCES}
+        for _, movie in chunk:
+            for field in _REFERENCES:
+                requested[field].update(getattr(movie, field))
+        missing = {field: missing_ids(db, field, ids) for field, ids in requested.items()}
+
+        valid = []
+        for line_no, movie in chunk:
+            problems = [
+                f"Unknown {field}: {sorted(set(getattr(movie, field)) & missing[field])}"
+                for field in _REFERENCES
+                if set(getattr(movie, field)) & missing[field]
+            ]
+            if problems:
+                self._error(line_no, "; ".join(problems))
+            else:
+                valid.append((line_no, movie))
+        return valid
+
+    @staticmethod
+    def _insert(db: Session, chunk: list[tuple[int, MovieCreate]]) -> list[int]:
+        table = Movie.__table__
+        movie_ids = db.execute(
+            insert(table).returning(table.c.id, sort_by_parameter_order=True),
+            [
+                {
+                    "title": movie.title,
+                    "description": movie.description,
+                    "release_year": movie.release_year,
+                    "rating": movie.rating,
+                }
+                for _, movie in chunk
+            ],
+        ).scalars().all()
+
+        for field, (link_table, column) in _REFERENCES.items():
+            rows = [
+                (movie_id, ref_id)
+                for movie_id, (_, movie) in zip(movie_ids, chunk)
+                for ref_id in dict.fromkeys(getattr(movie, field))
+            ]
+            _copy_rows(db, link_table, ("movie_id", column), rows)
+        return movie_ids
+
+    def _insert_one_by_one(self, db: Session, chunk: list[tuple[int, MovieCreate]]):
+        inserted = []
+        for line_no, movie in chunk:
+            try:
+                movie_ids = self._insert(db, [(line_no, movie)])
+                _catalog_changing(db, movie_ids)
+                db.commit()
+            except DBAPIError as e:
+                db.rollback()
+                self._error(line_no, f"Database error: {e.orig}")
+            else:
+                _catalog_changed(db, movie_ids)
+                inserted.append((line_no, movie))
+        return inserted
+
+    def report(self) -> dict:
+        return {
+            "processed": self.processed,
+            "inserted": self.inserted,
+            "failed": self.failed,
+            "errors": self.errors,
+            "errors_truncated": self.failed > len(self.errors),
+        }
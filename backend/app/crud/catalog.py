@@ -0,0 +1,28 @@
+from sqlalchemy import select, update
+from sqlalchemy.orm import Session
+
+from app.models.catalog_state import CatalogState
+from app.models.movie import Movie
+
+_STATE_ID = 1
+
+
+def get_catalog_version(db: Session) -> int:
+    """Текущая версия каталога (0, если служебной строки ещё нет)."""
+    version = db.execute(select(CatalogState.version).where(CatalogState.id == _STATE_ID)).scalar_one_or_none()
+    return version or 0
+
+
+def bump_catalog_version(db: Session) -> None:
+    """Увеличить версию каталога в текущей транзакции (вызывать до commit мутации)."""
+    result = db.execute(
+        update(CatalogState).where(CatalogState.id == _STATE_ID).values(version=CatalogState.version + 1)
+    )
+    if result.rowcount == 0:
+        db.add(CatalogState(id=_STATE_ID, version=1))
+        db.flush()
+
+
+def get_movie_version(db: Session, movie_id: int) -> int | None:
+    """Версия фильма без загрузки ORM-объекта (для If-None-Match); None — фильма нет."""
+    return db.execute(select(Movie.version).where(Movie.id == movie_id)).scalar_one_or_none()
@@ -0,0 +1,60 @@
+"""Потоковая выгрузка каталога (NDJSON / CSV) в постоянной памяти.
+
+Фильмы читаются серверным курсором (yield_per) пачками по export_batch_size,
+id связей подтягиваются тремя IN-запросами на пачку.
+"""
+
+import csv
+import io
+import json
+from collections.abc import Iterator
+
+from sqlalchemy import select
+from sqlalchemy.orm import Session
+
+from app.core.pool import set_statement_timeout
+from app.crud.movie_search import LINKS, link_ids
+from app.models.movie import Movie
+
+EXPORT_FORMATS = ("ndjson", "csv")
+
+_COLUMNS = ("id", "title", "description", "release_year", "rating")
+CSV_HEADER = _COLUMNS + tuple(LINKS)
+
+
+def iter_movie_export(db: Session, fmt: str, batch_size: int = 1000) -> Iterator[str]:
+    """Куски выгрузки (по одному на пачку фильмов). Закрывает сессию по завершении."""
+    if fmt not in EXPORT_FORMATS:
+        raise ValueError(f"Unknown export format: {fmt}")
+    try:
+        # выгрузка миллионов строк не должна упираться в DB_STATEMENT_TIMEOUT_MS
+        set_statement_timeout(db, 0)
+        stmt = select(*(getattr(Movie, c) for c in _COLUMNS)).order_by(Movie.id).execution_options(yield_per=batch_size)
+        result = db.execute(stmt)
+
+        if fmt == "csv":
+            buf = io.StringIO()
+            writer = csv.writer(buf)
+            writer.writerow(CSV_HEADER)
+            yield buf.getvalue()
+
+        for partition in result.partitions():
+            links = link_ids(db, [row.id for row in partition])
+            if fmt == "ndjson":
+                lines = []
+                for row in partition:
+                    item = dict(zip(_COLUMNS, row))
+                    for field in LINKS:
+                        item[field] = links[field].get(row.id, [])
+                    lines.append(json.dumps(item, ensure_ascii=False))
+                yield "\n".join(lines) + "\n"
+            else:
+                buf = io.StringIO()
+                writer = csv.writer(buf)
+                for row in partition:
+                    writer.writerow(
+                        [*row, *(" ".join(map(str, links[field].get(row.id, []))) for field in LINKS)]
+                    )
+                yield buf.getvalue()
+    finally:
+        db.close()
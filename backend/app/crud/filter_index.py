@@ -0,0 +1,519 @@
+"""In-process индекс для фильтрации списка фильмов без запросов к БД.
+
+Фильм занимает позицию — номер строки в плоских массивах (array): id,
+название, год, рейтинг и связи (CSR: смещения + значения по каждому полю).
+Для каждого id жанра/страны/персоны, каждого года и рейтинга хранится
+отсортированный массив позиций (posting list, 4 байта на связь), для каждой
+сортировки — массив позиций в её порядке. Память растёт с числом связей, а не
+как справочники × фильмы.
+
+Запрос: самый короткий фильтр (объединение его posting lists) даёт
+кандидатов, остальные фильтры проверяются по массивам позиции. Страница —
+частичная сортировка кандидатов или проход по порядку сортировки до её
+заполнения, смотря что дешевле. Если любой путь дороже _SCAN_LIMIT позиций
+(широкие фильтры, глубокая страница), query возвращает None и list_movies
+идёт в SQL. Без фильтров страница — срез массива порядка.
+
+Позиции только добавляются: изменённый фильм получает новую позицию, старая
+выбывает из posting lists и порядков. Полная пересборка читает БД потоком,
+строит новый набор массивов без блокировки и подменяет им текущий.
+
+Индекс привязан к версии каталога (catalog_state): мутации этого процесса
+применяются инкрементально, а если версия в БД ушла вперёд (писал другой
+процесс), запрос, который это увидел, запускает пересборку в фоновом потоке
+по primary; до её конца запросы идут в SQL. Версия старше индексной (реплика
+отстаёт) пересборку не вызывает. Названия сортируются по кодовым точкам — SQL сортирует так же
+(COLLATE "C", см. app.crud.movies.codepoint_order).
+"""
+
+import heapq
+import logging
+import threading
+from array import array
+from bisect import bisect_left, insort
+from collections import Counter
+from collections.abc import Callable, Iterator
+from itertools import groupby
+from operator import itemgetter
+
+from sqlalchemy import select
+from sqlalchemy.orm import Session
+
+from app.core.db import SessionLocal
+from app.crud.catalog import get_catalog_version
+from app.crud.movie_search import LINKS, link_ids
+from app.models.movie import Movie
+
+logger = logging.getLogger(__name__)
+
+# ключи сортировки list_movies
+_SORT_KEYS = ("title", "year", "rating")
+
+# NULL в массивах годов и рейтингов
+_NULL_YEAR = -(2**31)
+_NULL_RATING = float("nan")
+
+# сколько позиций запрос может перебрать в Python; дороже — пусть считает SQL
+_SCAN_LIMIT = 200_000
+
+# строк за одну выборку при потоковом чтении каталога
+_SCAN_BATCH = 10_000
+
+# сколько расхождений показывать в отчёте check()
+_REPORT_LIMIT = 100
+
+# (title, release_year, rating) и поле -> отсортированный tuple id связей
+Row = tuple[str, int | None, float | None]
+Links = dict[str, tuple[int, ...]]
+
+
+def _between(value, low, high) -> bool:
+    return value is not None and (low is None or value >= low) and (high is None or value <= high)
+
+
+def _union(postings: list[array]):
+    """Отсортированные позиции из нескольких posting lists одного фильтра."""
+    if len(postings) == 1:
+        return postings[0]
+    return sorted(set().union(*postings))
+
+
+def _contains(positions, pos: int) -> bool:
+    i = bisect_left(positions, pos)
+    return i < len(positions) and positions[i] == pos
+
+
+def _scan(db: Session) -> Iterator[tuple[int, Row, Links]]:
+    """Все фильмы со связями потоком, по возрастанию id."""
+    # Core-выборки на соединении сессии: без ORM-обёртки строк
+    conn = db.connection()
+    movies = conn.execute(
+        select(Movie.id, Movie.title, Movie.release_year, Movie.rating)
+        .order_by(Movie.id)
+        .execution_options(yield_per=_SCAN_BATCH)
+    )
+    groups = {}
+    for field, (table, ref_col) in LINKS.items():
+        rows = conn.execute(
+            select(table.c.movie_id, ref_col)
+            .distinct()
+            .order_by(table.c.movie_id, ref_col)
+            .execution_options(yield_per=_SCAN_BATCH)
+        )
+        groups[field] = groupby(rows, key=itemgetter(0))
+    heads = {field: next(group, None) for field, group in groups.items()}
+
+    for movie_id, title, year, rating in movies:
+        links = {}
+        for field, group in groups.items():
+            head = heads[field]
+            while head is not None and head[0] < movie_id:  # связи без фильма
+                head = next(group, None)
+            if head is not None and head[0] == movie_id:
+                links[field] = tuple(ref_id for _, ref_id in head[1])
+                head = next(group, None)
+            else:
+                links[field] = ()
+            heads[field] = head
+        yield movie_id, (title, year, rating), links
+
+
+def _load(db: Session, movie_ids: list[int]) -> dict[int, tuple[Row, Links]]:
+    """Строки и связи пачки фильмов: {movie_id: (row, links)}."""
+    stmt = select(Movie.id, Movie.title, Movie.release_year, Movie.rating).where(Movie.id.in_(movie_ids))
+    rows = {movie_id: (title, year, rating) for movie_id, title, year, rating in db.execute(stmt)}
+    links = link_ids(db, list(rows))
+    return {
+        movie_id: (row, {field: tuple(links[field].get(movie_id, ())) for field in LINKS})
+        for movie_id, row in rows.items()
+    }
+
+
+class _Data:
+    """Массивы одной сборки индекса. Вызовы — под блокировкой FilterIndex."""
+
+    def __init__(self):
+        self.ids = array("I")  # позиция -> movie_id
+        self.alive = bytearray()  # позиция -> 1, если фильм в индексе
+        self.titles: list[str] = []
+        self.years = array("i")
+        self.ratings = array("d")
+        self.link_offsets = {field: array("I", [0]) for field in LINKS}
+        self.link_values = {field: array("I") for field in LINKS}
+        # поле ("genre_ids", ..., "year", "rating") -> значение -> позиции по возрастанию
+        self.postings: dict[str, dict] = {field: {} for field in (*LINKS, "year", "rating")}
+        # (год, рейтинг) -> число фильмов: total для фильтров только по диапазонам
+        self.value_counts: Counter = Counter()
+        self.orders = {key: array("I") for key in _SORT_KEYS}
+        # позиции [0, base) идут по возрастанию id; добавленные позже — в moved
+        self.base = 0
+        self.moved: dict[int, int] = {}
+        self.count = 0
+
+    @classmethod
+    def build(cls, entries: Iterator[tuple[int, Row, Links]]) -> "_Data":
+        data = cls()
+        for movie_id, row, links in entries:
+            data._append(movie_id, row, links)
+        data.base = len(data.ids)
+        for key in _SORT_KEYS:
+            data.orders[key] = array("I", sorted(range(data.base), key=data.sort_key(key)))
+        return data
+
+    # --- значения позиции ---
+
+    def year(self, pos: int) -> int | None:
+        year = self.years[pos]
+        return None if year == _NULL_YEAR else year
+
+    def rating(self, pos: int) -> float | None:
+        rating = self.ratings[pos]
+        return None if rating != rating else rating
+
+    def row(self, pos: int) -> Row:
+        return self.titles[pos], self.year(pos), self.rating(pos)
+
+    def links(self, pos: int, field: str) -> tuple[int, ...]:
+        offsets = self.link_offsets[field]
+        return tuple(self.link_values[field][offsets[pos] : offsets[pos + 1]])
+
+    def sort_key(self, key: str) -> Callable[[int], tuple]:
+        """Ключ позиции в порядке _order_by: NULL "больше" любого значения, затем id."""
+        ids = self.ids
+        if key == "title":
+            titles = self.titles
+            return lambda pos: (False, titles[pos], ids[pos])
+        if key == "year":
+            years = self.years
+            return lambda pos: (years[pos] == _NULL_YEAR, years[pos], ids[pos])
+        rating = self.rating
+        return lambda pos: (rating(pos) is None, rating(pos) or 0.0, ids[pos])
+
+    def position(self, movie_id: int) -> int | None:
+        pos = self.moved.get(movie_id)
+        if pos is None:
+            i = bisect_left(self.ids, movie_id, 0, self.base)
+            if i < self.base and self.ids[i] == movie_id:
+                pos = i
+        return pos if pos is not None and self.alive[pos] else None
+
+    def entries(self) -> Iterator[tuple[int, Row, Links]]:
+        """Фильмы индекса по возрастанию id — в том же виде, что _scan."""
+        base = ((self.ids[pos], pos) for pos in range(self.base) if self.alive[pos])
+        moved = sorted((movie_id, pos) for movie_id, pos in self.moved.items() if self.alive[pos])
+        for movie_id, pos in heapq.merge(base, moved):
+            yield movie_id, self.row(pos), {field: self.links(pos, field) for field in LINKS}
+
+    # --- изменения ---
+
+    def _append(self, movie_id: int, row: Row, links: Links) -> int:
+        pos = len(self.ids)
+        title, year, rating = row
+        self.ids.append(movie_id)
+        self.alive.append(1)
+        self.titles.append(title)
+        self.years.append(_NULL_YEAR if year is None else year)
+        self.ratings.append(_NULL_RATING if rating is None else rating)
+        for field in LINKS:
+            values = self.link_values[field]
+            values.extend(links[field])
+            self.link_offsets[field].append(len(values))
+            self._post(field, links[field], pos)
+        self._post("year", () if year is None else (year,), pos)
+        self._post("rating", () if rating is None else (rating,), pos)
+        self.value_counts[year, rating] += 1
+        self.count += 1
+        return pos
+
+    def _post(self, field: str, values, pos: int) -> None:
+        # позиция больше всех прежних — append сохраняет порядок
+        postings = self.postings[field]
+        for value in values:
+            posting = postings.get(value)
+            if posting is None:
+                posting = postings[value] = array("I")
+            posting.append(pos)
+
+    def _unpost(self, field: str, values, pos: int) -> None:
+        postings = self.postings[field]
+        for value in values:
+            posting = postings[value]
+            del posting[bisect_left(posting, pos)]
+            if not posting:
+                del postings[value]
+
+    def add(self, movie_id: int, row: Row, links: Links) -> None:
+        pos = self._append(movie_id, row, links)
+        self.moved[movie_id] = pos
+        for key, order in self.orders.items():
+            insort(order, pos, key=self.sort_key(key))
+
+    def remove(self, movie_id: int) -> None:
+        pos = self.position(movie_id)
+        if pos is None:
+            return
+        for key, order in self.orders.items():
+            sort_key = self.sort_key(key)
+            del order[bisect_left(order, sort_key(pos), key=sort_key)]
+        for field in LINKS:
+            self._unpost(field, self.links(pos, field), pos)
+        year, rating = self.year(pos), self.rating(pos)
+        self._unpost("year", () if year is None else (year,), pos)
+        self._unpost("rating", () if rating is None else (rating,), pos)
+        self.value_counts[year, rating] -= 1
+        if not self.value_counts[year, rating]:
+            del self.value_counts[year, rating]
+        self.alive[pos] = 0
+        self.moved.pop(movie_id, None)
+        self.count -= 1
+
+    # --- запрос ---
+
+    def query(
+        self,
+        links: dict[str, list[int] | None],
+        years: tuple[int | None, int | None],
+        ratings: tuple[float | None, float | None],
+        sort_key: str,
+        desc: bool,
+        offset: int,
+        limit: int,
+    ) -> tuple[list[int], int] | None:
+        wanted = {field: set(ids) for field, ids in links.items() if ids}
+        by_year = years != (None, None)
+        by_rating = ratings != (None, None)
+
+        def in_range(year, rating) -> bool:
+            return (not by_year or _between(year, *years)) and (not by_rating or _between(rating, *ratings))
+
+        def matches(pos: int) -> bool:
+            for field, ref_ids in wanted.items():
+                offsets = self.link_offsets[field]
+                if ref_ids.isdisjoint(self.link_values[field][offsets[pos] : offsets[pos + 1]]):
+                    return False
+            return in_range(self.year(pos), self.rating(pos))
+
+        # posting lists каждого фильтра; пустой фильтр — пустой результат
+        groups = [[p for ref_id in ref_ids if (p := self.postings[field].get(ref_id))] for field, ref_ids in wanted.items()]
+        if by_year:
+            groups.append([p for year, p in self.postings["year"].items() if _between(year, *years)])
+        if by_rating:
+            groups.append([p for rating, p in self.postings["rating"].items() if _between(rating, *ratings)])
+        if not all(groups):
+            return [], 0
+
+        order = self.orders[sort_key]
+        if not groups:
+            start, stop = (len(order) - offset - limit, len(order) - offset) if desc else (offset, offset + limit)
+            page = order[max(start, 0) : max(stop, 0)]
+            return [self.ids[pos] for pos in (reversed(page) if desc else page)], self.count
+
+        smallest = min(groups, key=lambda postings: sum(map(len, postings)))
+        candidates = None
+        if len(groups) == 1 and len(smallest) == 1:
+            candidates = smallest[0]  # один id — posting list и есть ответ
+        elif sum(map(len, smallest)) <= _SCAN_LIMIT:
+            candidates = [pos for pos in _union(smallest) if matches(pos)]
+        elif wanted:
+            return None
+        total = len(candidates) if candidates is not None else sum(
+            count for (year, rating), count in self.value_counts.items() if in_range(year, rating)
+        )
+        if total <= offset:
+            return [], total
+
+        # проход по порядку сортировки: до заполнения страницы ~ need * N / total шагов
+        need = offset + limit
+        walk = need * len(order) // total
+        if candidates is not None and len(candidates) <= walk:
+            select_top = heapq.nlargest if desc else heapq.nsmallest
+            page = select_top(need, candidates, key=self.sort_key(sort_key))[offset:]
+        elif walk <= _SCAN_LIMIT:
+            test = matches if candidates is None else (lambda pos: _contains(candidates, pos))
+            page = []
+            skipped = 0
+            for pos in reversed(order) if desc else order:
+                if not test(pos):
+                    continue
+                if skipped < offset:
+                    skipped += 1
+                    continue
+                page.append(pos)
+                if len(page) == limit:
+                    break
+        else:
+            return None
+        return [self.ids[pos] for pos in page], total
+
+
+class FilterIndex:
+    def __init__(self):
+        self._lock = threading.RLock()
+        self._rebuild_lock = threading.Lock()
+        # версия каталога, которой соответствует индекс; None — не построен или устарел
+        self.version: int | None = None
+        self._data = _Data()
+        # сессии фоновой пересборки — primary, а не реплика запроса
+        self.session_factory: Callable[[], Session] = SessionLocal
+
+    @property
+    def size(self) -> int:
+        return self._data.count
+
+    def _remove(self, movie_id: int) -> None:
+        with self._lock:
+            self._data.remove(movie_id)
+
+    def rebuild(self, db: Session) -> int:
+        """Полная пересборка из БД. Возвращает число фильмов в индексе.
+
+        Массивы строятся без блокировки: запросы и refresh в это время
+        работают со старой сборкой.
+        """
+        version = get_catalog_version(db)
+        data = _Data.build(_scan(db))
+        with self._lock:
+            # параллельная пересборка могла успеть поставить сборку новее
+            if self.version is None or version >= self.version:
+                self._data = data
+                self.version = version
+        return data.count
+
+    def start_rebuild(self) -> bool:
+        """Запустить пересборку в фоновом потоке. False — пересборка уже идёт."""
+        if not self._rebuild_lock.acquire(blocking=False):
+            return False
+        try:
+            self._spawn(self._rebuild_in_background)
+        except BaseException:
+            self._rebuild_lock.release()
+            raise
+        return True
+
+    def _rebuild_in_background(self) -> None:
+        try:
+            with self.session_factory() as db:
+                self.rebuild(db)
+        except Exception:
+            logger.exception("Filter index rebuild failed")
+        finally:
+            self._rebuild_lock.release()
+
+    @staticmethod
+    def _spawn(target: Callable[[], None]) -> None:
+        threading.Thread(target=target, name="filter-index", daemon=True).start()
+
+    def refresh(self, db: Session, movie_ids: list[int]) -> None:
+        """Применить мутацию этого процесса (вызывать после её commit).
+
+        Мутация подняла версию каталога ровно на 1; если версия ушла дальше —
+        были чужие записи, и индекс помечается устаревшим.
+        """
+        if self.version is None:
+            return
+        version = get_catalog_version(db)
+        data = _load(db, movie_ids)
+        with self._lock:
+            if self.version is None:
+                return
+            if version != self.version + 1:
+                self.version = None
+                return
+            for movie_id in movie_ids:
+                self._data.remove(movie_id)
+                if movie_id in data:
+                    self._data.add(movie_id, *data[movie_id])
+            self.version = version
+
+    def ensure_current(self, db: Session) -> bool:
+        """Можно ли отвечать из индекса при версии каталога, видимой в db.
+
+        Сам не пересобирает: если версия в db новее индекса (или индекс не
+        построен), запускает фоновую пересборку и возвращает False — запрос
+        идёт в SQL. Версия старше индексной (отстающая реплика) — индекс
+        новее её данных, он годится.
+        """
+        version = get_catalog_version(db)
+        current = self.version
+        if current is not None and version <= current:
+            return True
+        self.start_rebuild()
+        return False
+
+    # --- запросы ---
+
+    def query(
+        self,
+        *,
+        genre_ids: list[int] | None,
+        country_ids: list[int] | None,
+        person_ids: list[int] | None,
+        year_from: int | None,
+        year_to: int | None,
+        rating_from: float | None,
+        rating_to: float | None,
+        sort_key: str,
+        desc: bool,
+        offset: int,
+        limit: int,
+    ) -> tuple[list[int], int] | None:
+        """id фильмов страницы (в порядке сортировки) и total по фильтрам.
+
+        None — запрос слишком дорог для индекса (см. _SCAN_LIMIT), нужен SQL.
+        """
+        links = {"genre_ids": genre_ids, "country_ids": country_ids, "person_ids": person_ids}
+        with self._lock:
+            return self._data.query(
+                links, (year_from, year_to), (rating_from, rating_to), sort_key, desc, offset, limit
+            )
+
+    def check(self, db: Session) -> dict:
+        """Сверка индекса с БД: фильмы, которых нет в индексе, лишние и отличающиеся.
+
+        Обе стороны идут потоком по возрастанию id; блокировка берётся только
+        на снимок списка перемещённых позиций.
+        """
+        with self._lock:
+            data, version = self._data, self.version
+            indexed = data.entries()
+            size = data.count
+            # генератор снимает moved при первом next — делаем это под блокировкой
+            current = next(indexed, None)
+
+        missing, extra, mismatched = [], [], []
+
+        def report(found: list, movie_id: int) -> None:
+            if len(found) < _REPORT_LIMIT:
+                found.append(movie_id)
+
+        ok = True
+        for movie_id, row, links in _scan(db):
+            while current is not None and current[0] < movie_id:
+                ok = False
+                report(extra, current[0])
+                current = next(indexed, None)
+            if current is None or current[0] > movie_id:
+                ok = False
+                report(missing, movie_id)
+                continue
+            if current[1:] != (row, links):
+                ok = False
+                report(mismatched, movie_id)
+            current = next(indexed, None)
+        while current is not None:
+            ok = False
+            report(extra, current[0])
+            current = next(indexed, None)
+
+        return {
+            "ok": ok,
+            "version": version,
+            "catalog_version": get_catalog_version(db),
+            "size": size,
+            "missing": missing,
+            "extra": extra,
+            "mismatched": mismatched,
+        }
+
+
+filter_index = FilterIndex()
@@ -0,0 +1,110 @@
+"""Денормализованная проекция movie_search: синхронизация, пересборка, фильтры.
+
+Пока settings.movie_search_projection выключен, таблица не ведётся и
+list_movies фильтрует по таблицам связей. После включения проекцию нужно
+один раз пересобрать (POST /api/admin/movie-search:rebuild).
+"""
+
+from collections import defaultdict
+
+from sqlalchemy import Integer, delete, insert, literal, literal_column, select, func, text
+from sqlalchemy.dialects import postgresql
+from sqlalchemy.orm import Session
+
+from app.core.config import settings
+from app.core.response_cache import response_cache
+from app.crud.catalog import bump_catalog_version
+from app.models.association_tables import movie_country, movie_genre, movie_person
+from app.models.movie import Movie
+from app.models.movie_search import MovieSearch
+
+# поле проекции -> (таблица связей, колонка id справочника)
+LINKS = {
+    "genre_ids": (movie_genre, movie_genre.c.genre_id),
+    "country_ids": (movie_country, movie_country.c.country_id),
+    "person_ids": (movie_person, movie_person.c.person_id),
+}
+
+_REBUILD_BATCH = 1000
+
+# в Postgres пересборка — один INSERT ... SELECT с array_agg на стороне БД
+_PG_REBUILD_SQL = """
+INSERT INTO movie_search (movie_id, genre_ids, country_ids, person_ids)
+SELECT m.id,
+       COALESCE((SELECT array_agg(DISTINCT genre_id ORDER BY genre_id) FROM movie_genre WHERE movie_id = m.id), '{}'),
+       COALESCE((SELECT array_agg(DISTINCT country_id ORDER BY country_id) FROM movie_country WHERE movie_id = m.id), '{}'),
+       COALESCE((SELECT array_agg(DISTINCT person_id ORDER BY person_id) FROM movie_person WHERE movie_id = m.id), '{}')
+FROM movies m
+"""
+
+
+def link_ids(db: Session, movie_ids: list[int]) -> dict[str, dict[int, list[int]]]:
+    """id связей для пачки фильмов: поле -> movie_id -> отсортированные id (3 запроса)."""
+    links = {}
+    for field, (table, ref_col) in LINKS.items():
+        by_movie = defaultdict(list)
+        rows = db.execute(
+            select(table.c.movie_id, ref_col)
+            .where(table.c.movie_id.in_(movie_ids))
+            .distinct()
+            .order_by(table.c.movie_id, ref_col)
+        )
+        for movie_id, ref_id in rows:
+            by_movie[movie_id].append(ref_id)
+        links[field] = by_movie
+    return links
+
+
+def _write_rows(db: Session, movie_ids: list[int]) -> None:
+    links = link_ids(db, movie_ids)
+    rows = [
+        {"movie_id": movie_id, **{field: links[field].get(movie_id, []) for field in LINKS}}
+        for movie_id in movie_ids
+    ]
+    if rows:
+        db.execute(insert(MovieSearch), rows)
+
+
+def sync_movie_search(db: Session, movie_ids: list[int]) -> None:
+    """Пересчитать строки проекции для фильмов (в текущей транзакции, до commit).
+
+    Удалённые фильмы просто пропадают из проекции.
+    """
+    if not settings.movie_search_projection or not movie_ids:
+        return
+    db.flush()
+    db.execute(delete(MovieSearch).where(MovieSearch.movie_id.in_(movie_ids)))
+    existing = db.execute(select(Movie.id).where(Movie.id.in_(movie_ids))).scalars().all()
+    _write_rows(db, list(existing))
+
+
+def rebuild_movie_search(db: Session) -> int:
+    """Пересобрать проекцию целиком одной транзакцией. Возвращает число строк."""
+    db.execute(delete(MovieSearch))
+    if db.get_bind().dialect.name == "postgresql":
+        db.execute(text(_PG_REBUILD_SQL))
+    else:
+        last_id = 0
+        while True:
+            ids = db.execute(
+                select(Movie.id).where(Movie.id > last_id).order_by(Movie.id).limit(_REBUILD_BATCH)
+            ).scalars().all()
+            if not ids:
+                break
+            _write_rows(db, list(ids))
+            last_id = ids[-1]
+    # результаты списков могли измениться (проекция была неактуальна) — сбрасываем ETag и кэш ответов
+    bump_catalog_version(db)
+    db.commit()
+    response_cache.bump_generation()
+    return db.execute(select(func.count()).select_from(MovieSearch)).scalar_one()
+
+
+def contains_any(db: Session, field: str, ids: list[int]):
+    """Условие "в массиве field проекции есть хотя бы один из ids"."""
+    col = getattr(MovieSearch, field)
+    if db.get_bind().dialect.name == "postgresql":
+        # && по GIN-индексу; массив — одним параметром
+        return col.op("&&")(literal(list(ids), type_=postgresql.ARRAY(Integer)))
+    values = func.json_each(col).table_valued("value")
+    return select(literal_column("1")).select_from(values).where(values.c.value.in_(ids)).exists()
@@ -1,57 +1,287 @@
+import base64
+import json
+import math
+
 from app.models.genre import Genre
 from app.models.country import Country
 from app.models.person import Person
 
-from sqlalchemy import select, func
-from sqlalchemy.orm import Session, selectinload
+from sqlalchemy import Integer, String, delete, insert, select, func, tuple_, and_, cast, literal_column, union_all
+from sqlalchemy.ext.compiler import compiles
+from sqlalchemy.orm import Session, load_only, selectinload
+from sqlalchemy.sql.functions import FunctionElement
 
+from app.core.cache import register_cache
+from app.core.config import settings
+from app.core.response_cache import response_cache
+from app.crud.catalog import bump_catalog_version
+from app.crud.filter_index import filter_index
+from app.crud.movie_search import LINKS, contains_any, sync_movie_search
+from app.crud.reference_ids import validate_reference_ids
+from app.crud.search import apply_fulltext, search_tokens
+from app.models.association_tables import movie_country, movie_genre
 from app.models.movie import Movie
+from app.models.movie_search import MovieSearch
+from app.schemas.movie import MovieShort
 
 
-def _load_reference_entities(
-    db: Session,
-    *,
-    genre_ids: list[int] | None,
-    country_ids: list[int] | None,
-    person_ids: list[int] | None,
-):
-    """Загрузка справочников по id.
+class codepoint_order(FunctionElement):
+    """Строка в порядке кодовых точек: в Postgres — COLLATE "C", в SQLite — как
+    есть (BINARY). Так же сортирует названия in-process индекс (filter_index)."""
+
+    name = "codepoint_order"
+    type = String()
+    inherit_cache = True
+
+
+@compiles(codepoint_order)
+def _compile_codepoint_order(element, compiler, **kw):
+    return compiler.process(element.clauses, **kw)
+
+
+@compiles(codepoint_order, "postgresql")
+def _compile_codepoint_order_postgresql(element, compiler, **kw):
+    # индекс ix_movies_title_c_id (см. app.models.search)
+    return f'{compiler.process(element.clauses, **kw)} COLLATE "C"'
 
-    Возвращает кортеж (genres, countries, persons). Если какие-то id не найдены,
-    кидает ValueError с сообщением для ответа 400.
+
+# сортировка: ключ -> колонка; "-" перед ключом означает убывание
+# sort: "title", "-title", "rating", "-rating", "year", "-year"
+SORT_COLUMNS = {
+    "title": Movie.title,
+    "rating": Movie.rating,
+    "year": Movie.release_year,
+}
+# выражения ORDER BY и keyset-условий: название — независимо от collation БД,
+# чтобы страницы из индекса и из SQL (курсор) шли в одном порядке
+SORT_EXPRESSIONS = {**SORT_COLUMNS, "title": codepoint_order(Movie.title)}
+DEFAULT_SORT = "title"
+# сортировка по релевантности — только вместе с search_mode=fulltext и q
+RELEVANCE_SORT = "relevance"
+
+# substring — ILIKE '%q%' по названию (в Postgres идёт через pg_trgm индекс),
+# fulltext — полнотекстовый поиск по названию и описанию (см. app.crud.search)
+SEARCH_MODES = ("substring", "fulltext")
+
+
+def _parse_sort(sort: str) -> tuple[str, bool]:
+    """Разбор параметра sort в (ключ, по убыванию). Неизвестный ключ -> title."""
+    desc = sort.startswith("-")
+    key = sort[1:] if desc else sort
+    if key not in SORT_COLUMNS:
+        return DEFAULT_SORT, False
+    return key, desc
+
+
+def _order_by(key: str, desc: bool):
+    """ORDER BY для сортировки + id как tie-breaker.
+
+    NULL считаем "больше" любого значения (ASC NULLS LAST / DESC NULLS FIRST) —
+    это нативный порядок btree в Postgres, поэтому индекс (col, id)
+    обслуживает оба направления, а в SQLite порядок получается тем же.
     """
+    col = SORT_EXPRESSIONS[key]
+    if desc:
+        return col.desc().nulls_first(), Movie.id.desc()
+    return col.asc().nulls_last(), Movie.id.asc()
 
-    genres: list[Genre] = []
-    countries: list[Country] = []
-    persons: list[Person] = []
 
-    if genre_ids is not None:
-        if genre_ids:
-            genres = db.execute(select(Genre).where(Genre.id.in_(genre_ids))).scalars().all()
-            missing = sorted(set(genre_ids) - {g.id for g in genres})
-            if missing:
-                raise ValueError(f"Unknown genre_ids: {missing}")
+def encode_cursor(sort_key: str, desc: bool, value, movie_id: int) -> str:
+    """Непрозрачный курсор: ключ сортировки последней строки + её id."""
+    raw = json.dumps({"s": ("-" if desc else "") + sort_key, "v": value, "id": movie_id})
+    return base64.urlsafe_b64encode(raw.encode()).decode().rstrip("=")
 
-    if country_ids is not None:
-        if country_ids:
-            countries = db.execute(select(Country).where(Country.id.in_(country_ids))).scalars().all()
-            missing = sorted(set(country_ids) - {c.id for c in countries})
-            if missing:
-                raise ValueError(f"Unknown country_ids: {missing}")
 
-    if person_ids is not None:
-        if person_ids:
-            persons = db.execute(select(Person).where(Person.id.in_(person_ids))).scalars().all()
-            missing = sorted(set(person_ids) - {p.id for p in persons})
-            if missing:
-                raise ValueError(f"Unknown person_ids: {missing}")
+def decode_cursor(cursor: str) -> tuple[str, object, int]:
+    """Обратное к encode_cursor. Возвращает (sort, value, id) или кидает ValueError."""
+    try:
+        padded = cursor + "=" * (-len(cursor) % 4)
+        data = json.loads(base64.urlsafe_b64decode(padded.encode()))
+        sort, value, movie_id = data["s"], data["v"], data["id"]
+    except (ValueError, TypeError, KeyError):
+        raise ValueError("Invalid cursor")
+    if not isinstance(sort, str) or not isinstance(movie_id, int) or isinstance(movie_id, bool):
+        raise ValueError("Invalid cursor")
+    if not _valid_cursor_value(_parse_sort(sort)[0], value):
+        raise ValueError("Invalid cursor")
+    return sort, value, movie_id
 
-    return genres, countries, persons
 
+def _valid_cursor_value(sort_key: str, value) -> bool:
+    """Подходит ли value из курсора колонке сортировки (иначе до БД дойдёт мусор)."""
+    if value is None:
+        return _nullable(sort_key)
+    if isinstance(value, bool):
+        return False
+    if sort_key == "title":
+        return isinstance(value, str)
+    if sort_key == "year":
+        return isinstance(value, int)
+    return isinstance(value, (int, float)) and math.isfinite(value)
 
-def list_movies(
+
+def _nullable(sort_key: str) -> bool:
+    return Movie.__table__.c[SORT_COLUMNS[sort_key].key].nullable
+
+
+# колонки элемента списка (MovieShort) для as_rows: без ORM-объектов и identity map
+SHORT_COLUMNS = tuple(getattr(Movie, field) for field in MovieShort.model_fields)
+
+# связи, которые можно подгрузить в список (expand) — по одному запросу на связь
+EXPAND_RELATIONS = ("genres", "countries", "persons")
+
+# режимы подсчёта total: точный COUNT(*), оценка, без подсчёта (только has_next)
+TOTAL_MODES = ("exact", "estimate", "none")
+
+# кэш точных COUNT(*) по набору фильтров
+count_cache = register_cache("movie_counts", maxsize=1024, ttl=settings.count_cache_ttl)
+
+
+def _count_exact(db: Session, stmt) -> int:
+    # в подзапросе только id: остальные колонки (description) для подсчёта не нужны
+    subquery = stmt.with_only_columns(Movie.id, maintain_column_froms=True).subquery()
+    return db.execute(select(func.count()).select_from(subquery)).scalar_one()
+
+
+def _count_cached(db: Session, stmt, key: tuple) -> int:
+    """Точный COUNT(*), закэшированный на count_cache_ttl секунд."""
+    return count_cache.get_or_set(key, lambda: _count_exact(db, stmt))
+
+
+def _explain_sql(stmt, dialect) -> tuple[str, dict]:
+    """EXPLAIN (FORMAT JSON) для stmt: SQL драйвера и его параметры.
+
+    Значения фильтров (q и т.п.) остаются параметрами: text() с подставленными
+    литералами принял бы ":слово" внутри строки за bind-параметр.
+    """
+    compiled = stmt.compile(dialect=dialect, compile_kwargs={"render_postcompile": True})
+    return "EXPLAIN (FORMAT JSON) " + str(compiled), compiled.params
+
+
+def _count_estimate(db: Session, stmt, key: tuple) -> int:
+    """Оценка числа строк.
+
+    В Postgres берём оценку планировщика из EXPLAIN (без выполнения запроса),
+    в остальных СУБД — закэшированный точный COUNT(*).
+    """
+    dialect = db.get_bind().dialect
+    if dialect.name != "postgresql":
+        return _count_cached(db, stmt, key)
+    sql, params = _explain_sql(stmt, dialect)
+    plan = db.connection().exec_driver_sql(sql, params).scalar_one()
+    if isinstance(plan, str):
+        plan = json.loads(plan)
+    return int(plan[0]["Plan"]["Plan Rows"])
+
+
+def _keyset_conditions(key: str, desc: bool, value, last_id: int) -> list:
+    """Условие "строго после (value, last_id)" в порядке из _order_by — по частям.
+
+    Каждая часть — чистый диапазон по индексу (col, id), без OR: с OR ни
+    SQLite, ни Postgres не делают index seek, и глубокие страницы снова
+    стоят O(глубины). Части читаются по очереди, пока не наберётся страница
+    (см. _fetch_rows); NULL-ы nullable-колонок — отдельная часть.
+    """
+    col = SORT_EXPRESSIONS[key]
+    if desc:
+        if value is None:
+            # NULL-ы идут первыми: дочитываем их, затем все не-NULL
+            return [and_(col.is_(None), Movie.id < last_id), col.is_not(None)]
+        return [tuple_(col, Movie.id) < tuple_(value, last_id)]
+    if value is None:
+        # NULL-ы идут последними: остались только они
+        return [and_(col.is_(None), Movie.id > last_id)]
+    after = tuple_(col, Movie.id) > tuple_(value, last_id)
+    return [after, col.is_(None)] if _nullable(key) else [after]
+
+
+def _fetch_rows(db: Session, stmt, keyset: list, limit: int, columns=None) -> list:
+    """До limit строк stmt; keyset — части условия курсора ([None] — без курсора).
+
+    С columns — dict-ы из этих колонок, иначе ORM-объекты с полями MovieShort.
+    """
+    rows = []
+    for condition in keyset:
+        part = (stmt if condition is None else stmt.where(condition)).limit(limit - len(rows))
+        if columns is not None:
+            rows += [dict(r) for r in db.execute(part.with_only_columns(*columns)).mappings()]
+        else:
+            # description (Text) в списке не нужен — грузим только поля MovieShort
+            rows += db.execute(part.options(load_only(*SHORT_COLUMNS))).scalars().all()
+        if len(rows) >= limit:
+            break
+    return rows
+
+
+def _catalog_changing(db: Session, movie_ids: list[int]) -> None:
+    """Вызывать перед commit любой мутации фильмов (в той же транзакции).
+
+    Поднимает версию каталога и пересчитывает производные данные по фильмам.
+    """
+    sync_movie_search(db, movie_ids)
+    bump_catalog_version(db)
+
+
+def _catalog_changed(db: Session, movie_ids: list[int]) -> None:
+    """Вызывать после commit любой мутации фильмов: сбрасывает кэши списков.
+
+    Новое поколение в общем кэше ответов делает недостижимыми все
+    закэшированные списки на всех репликах сервиса; in-process индекс
+    фильтров обновляется по изменённым фильмам.
+    """
+    response_cache.bump_generation()
+    count_cache.invalidate()
+    facet_cache.invalidate()
+    if settings.filter_index:
+        filter_index.refresh(db, movie_ids)
+
+
+def _movie_link_ids(db: Session, movie_id: int, field: str) -> set[int]:
+    table, ref_col = LINKS[field]
+    return set(db.execute(select(ref_col).where(table.c.movie_id == movie_id)).scalars())
+
+
+def _write_link_changes(db: Session, movie_id: int, field: str, *, add, remove) -> None:
+    """Только нужные DELETE/INSERT в таблице связей (add/remove уже посчитаны против текущих)."""
+    table, ref_col = LINKS[field]
+    if remove:
+        db.execute(delete(table).where(table.c.movie_id == movie_id, ref_col.in_(remove)))
+    if add:
+        db.execute(insert(table), [{"movie_id": movie_id, ref_col.key: ref_id} for ref_id in add])
+
+
+def _replace_links(db: Session, movie_id: int, **fields: list[int] | None) -> None:
+    """Привести связи фильма к заданным спискам id разницей множеств.
+
+    Строки связей, которые остаются, не трогаются (ни DELETE, ни INSERT);
+    ORM-коллекции не загружаются. None — поле не передано. id должны быть проверены.
+    """
+    for field, ids in fields.items():
+        if ids is None:
+            continue
+        current = _movie_link_ids(db, movie_id, field)
+        wanted = dict.fromkeys(ids)
+        add = [ref_id for ref_id in wanted if ref_id not in current]
+        _write_link_changes(db, movie_id, field, add=add, remove=current.difference(wanted))
+
+
+def _patch_links(db: Session, movie_id: int, **changes: tuple[list[int], list[int]] | None) -> None:
+    """Добавить/убрать отдельные id связей: поле -> (add, remove); None — не трогать."""
+    for field, change in changes.items():
+        if change is None:
+            continue
+        add, remove = change
+        current = _movie_link_ids(db, movie_id, field)
+        add = [ref_id for ref_id in dict.fromkeys(add) if ref_id not in current]
+        _write_link_changes(db, movie_id, field, add=add, remove=current.intersection(remove))
+
+
+def _apply_filters(
     db: Session,
+    stmt,
+    *,
     q: str | None,
+    search_mode: str,
     genre_ids: list[int] | None,
     country_ids: list[int] | None,
     person_ids: list[int] | None,
@@ -59,23 +289,32 @@ def list_movies(
     year_to: int | None,
     rating_from: float | None,
     rating_to: float | None,
-    sort: str,
-    page: int,
-    size: int,
 ):
-    stmt = select(Movie)
-    # фильтры по связям
-    if genre_ids:
-        stmt = stmt.where(Movie.genres.any(Genre.id.in_(genre_ids)))
-    if country_ids:
-        stmt = stmt.where(Movie.countries.any(Country.id.in_(country_ids)))
-    if person_ids:
-        stmt = stmt.where(Movie.persons.any(Person.id.in_(person_ids)))
+    """Фильтры списка фильмов. Возвращает (stmt, rank_order); rank_order — только для fulltext."""
+    # фильтры по связям: по проекции movie_search, если она ведётся,
+    # иначе EXISTS по таблицам связей
+    if settings.movie_search_projection and (genre_ids or country_ids or person_ids):
+        stmt = stmt.join(MovieSearch, MovieSearch.movie_id == Movie.id)
+        for field, ids in (("genre_ids", genre_ids), ("country_ids", country_ids), ("person_ids", person_ids)):
+            if ids:
+                stmt = stmt.where(contains_any(db, field, ids))
+    else:
+        if genre_ids:
+            stmt = stmt.where(Movie.genres.any(Genre.id.in_(genre_ids)))
+        if country_ids:
+            stmt = stmt.where(Movie.countries.any(Country.id.in_(country_ids)))
+        if person_ids:
+            stmt = stmt.where(Movie.persons.any(Person.id.in_(person_ids)))
 
     # поиск и числовые фильтры
+    rank_order = None
     if q and q.strip():
-        like = f"%{q.strip()}%"
-        stmt = stmt.where(Movie.title.ilike(like))
+        tokens = search_tokens(q) if search_mode == "fulltext" else []
+        if tokens:
+            stmt, rank_order = apply_fulltext(stmt, db.get_bind().dialect.name, tokens)
+        else:
+            like = f"%{q.strip()}%"
+            stmt = stmt.where(Movie.title.ilike(like))
     if year_from is not None:
         stmt = stmt.where(Movie.release_year >= year_from)
     if year_to is not None:
@@ -84,29 +323,253 @@ def list_movies(
         stmt = stmt.where(Movie.rating >= rating_from)
     if rating_to is not None:
         stmt = stmt.where(Movie.rating <= rating_to)
+    return stmt, rank_order
 
-    # сортировка
-    # sort: "title", "-title", "rating", "-rating", "year", "-year"
-    order_map = {
-        "title": Movie.title.asc(),
-        "-title": Movie.title.desc(),
-        "rating": Movie.rating.asc(),
-        "-rating": Movie.rating.desc(),
-        "year": Movie.release_year.asc(),
-        "-year": Movie.release_year.desc(),
-    }
-    stmt = stmt.order_by(order_map.get(sort, Movie.title.asc()))
 
-    # count
-    count_stmt = select(func.count()).select_from(stmt.subquery())
-    total = db.execute(count_stmt).scalar_one()
+# фасеты: имя -> (таблица, исходная колонка, значение, колонка movie_id).
+# Для decades/ratings значение — нижняя граница интервала (1990, 8 = [8, 9)).
+# Константы — литералами, а не bind-параметрами: выражение повторяется в
+# SELECT и GROUP BY, и Postgres с серверными параметрами их не сопоставит.
+_TEN = literal_column("10")
+FACETS = {
+    "genres": (movie_genre, movie_genre.c.genre_id, movie_genre.c.genre_id, movie_genre.c.movie_id),
+    "countries": (movie_country, movie_country.c.country_id, movie_country.c.country_id, movie_country.c.movie_id),
+    "decades": (Movie.__table__, Movie.release_year, (Movie.release_year // _TEN) * _TEN, Movie.id),
+    "ratings": (Movie.__table__, Movie.rating, cast(func.floor(Movie.rating), Integer), Movie.id),
+}
+
+# фасеты по всему каталогу (без фильтров) — самые частые и самые дорогие
+facet_cache = register_cache("movie_facets", maxsize=64, ttl=settings.facet_cache_ttl)
+
+
+def _count_facets(db: Session, facets: tuple[str, ...], movie_ids) -> dict[str, list[dict]]:
+    """Все запрошенные фасеты одним UNION ALL из GROUP BY-запросов.
+
+    movie_ids — подзапрос id отфильтрованных фильмов (None — весь каталог).
+    """
+    parts = []
+    for name in facets:
+        source, column, value, movie_id = FACETS[name]
+        part = (
+            select(literal_column(f"'{name}'").label("facet"), value.label("value"), func.count().label("count"))
+            .select_from(source)
+            # NULL отсекаем по исходной колонке: floor в SQLite — Python-функция
+            # SQLAlchemy, на NULL она падает
+            .where(column.is_not(None))
+            .group_by(value)
+        )
+        if movie_ids is not None:
+            part = part.where(movie_id.in_(movie_ids))
+        parts.append(part)
+
+    result = {name: [] for name in facets}
+    for facet, value, count in db.execute(union_all(*parts)):
+        result[facet].append({"value": value, "count": count})
+    for buckets in result.values():
+        buckets.sort(key=lambda b: (-b["count"], b["value"]))
+    return result
+
+
+def _row_columns(fields: tuple[str, ...] | None, sort_key: str):
+    """Колонки для as_rows и поля ответа (None — все поля MovieShort).
+
+    Помимо запрошенных полей выбираются id и колонка сортировки (для курсора).
+    """
+    if not fields:
+        return SHORT_COLUMNS, None
+    sort_field = SORT_COLUMNS[sort_key].key
+    output = tuple(f for f in MovieShort.model_fields if f == "id" or f in fields)
+    columns = tuple(getattr(Movie, f) for f in MovieShort.model_fields if f in output or f == sort_field)
+    return columns, output
+
 
-    items = (
-        db.execute(stmt.offset((page - 1) * size).limit(size))
-        .scalars()
-        .all()
+def _hydrate(db: Session, movie_ids: list[int], expand: tuple[str, ...] | None, columns=None) -> list:
+    """Фильмы по id из индекса — в том же порядке; с columns — dict-ы из этих колонок."""
+    if not movie_ids:
+        return []
+    if columns is not None:
+        rows = db.execute(select(*columns).where(Movie.id.in_(movie_ids))).mappings()
+        by_id = {row["id"]: dict(row) for row in rows}
+    else:
+        stmt = select(Movie).where(Movie.id.in_(movie_ids)).options(load_only(*SHORT_COLUMNS))
+        if expand:
+            stmt = stmt.options(*(selectinload(getattr(Movie, rel)) for rel in expand))
+        by_id = {movie.id: movie for movie in db.execute(stmt).scalars()}
+    return [by_id[movie_id] for movie_id in movie_ids if movie_id in by_id]
+
+
+def list_movies(
+    db: Session,
+    q: str | None,
+    genre_ids: list[int] | None,
+    country_ids: list[int] | None,
+    person_ids: list[int] | None,
+    year_from: int | None,
+    year_to: int | None,
+    rating_from: float | None,
+    rating_to: float | None,
+    sort: str,
+    page: int,
+    size: int,
+    cursor: str | None = None,
+    total_mode: str = "exact",
+    search_mode: str = "substring",
+    expand: tuple[str, ...] | None = None,
+    facets: tuple[str, ...] | None = None,
+    as_rows: bool = False,
+    fields: tuple[str, ...] | None = None,
+):
+    """Список фильмов с фильтрами.
+
+    Два режима пагинации: по номеру страницы (OFFSET) и по курсору (keyset).
+    Курсор берётся из next_cursor предыдущего ответа; в этом режиме page
+    игнорируется, а стоимость запроса не зависит от глубины.
+
+    total_mode: "exact" — COUNT(*) по фильтрам, "estimate" — оценка
+    (см. _count_estimate), "none" — total не считается, есть только has_next.
+    search_mode: как искать по q; при fulltext доступна сортировка relevance
+    (только постранично, без курсора).
+    expand: связи из EXPAND_RELATIONS, которые загружаются сразу для всей
+    страницы (selectinload — один запрос на связь, а не на фильм).
+    facets: измерения из FACETS, по которым нужны счётчики с теми же
+    фильтрами (один запрос на все измерения).
+    as_rows: items — dict-ы с полями MovieShort, выбранные отдельными
+    колонками (без ORM-объектов); с expand не сочетается.
+    fields: подмножество полей MovieShort для items (id есть всегда);
+    включает as_rows, из БД выбираются только нужные колонки.
+    Возвращает dict с items, total, total_mode, has_next, next_cursor
+    и facets (None, если не запрошены).
+    """
+    if total_mode not in TOTAL_MODES:
+        raise ValueError(f"Unknown total_mode: {total_mode}")
+    if search_mode not in SEARCH_MODES:
+        raise ValueError(f"Unknown search_mode: {search_mode}")
+    unknown = sorted(set(expand or ()) - set(EXPAND_RELATIONS))
+    if unknown:
+        raise ValueError(f"Unknown expand: {unknown}")
+    unknown = sorted(set(facets or ()) - set(FACETS))
+    if unknown:
+        raise ValueError(f"Unknown facets: {unknown}")
+    unknown = sorted(set(fields or ()) - set(MovieShort.model_fields))
+    if unknown:
+        raise ValueError(f"Unknown fields: {unknown}")
+    if fields:
+        as_rows = True
+    if as_rows and expand:
+        raise ValueError("fields/as_rows are not supported with expand")
+    sort_key, desc = _parse_sort(sort)
+    columns, output_fields = _row_columns(fields, sort_key)
+
+    stmt, rank_order = _apply_filters(
+        db,
+        select(Movie),
+        q=q,
+        search_mode=search_mode,
+        genre_ids=genre_ids,
+        country_ids=country_ids,
+        person_ids=person_ids,
+        year_from=year_from,
+        year_to=year_to,
+        rating_from=rating_from,
+        rating_to=rating_to,
     )
-    return items, total
+
+    # фильтры без поиска по тексту может целиком обслужить in-process индекс;
+    # None — запрос для него слишком широкий, считает SQL
+    indexed = None
+    if settings.filter_index and not cursor and not (q and q.strip()) and filter_index.ensure_current(db):
+        indexed = filter_index.query(
+            genre_ids=genre_ids,
+            country_ids=country_ids,
+            person_ids=person_ids,
+            year_from=year_from,
+            year_to=year_to,
+            rating_from=rating_from,
+            rating_to=rating_to,
+            sort_key=sort_key,
+            desc=desc,
+            offset=(page - 1) * size,
+            limit=size + 1,
+        )
+
+    # count (по фильтрам, без курсора)
+    total = None
+    if indexed is not None:
+        total = indexed[1] if total_mode != "none" else None
+    elif total_mode == "exact":
+        total = _count_exact(db, stmt)
+    elif total_mode == "estimate":
+        filters_key = (
+            q.strip() if q else None,
+            search_mode,
+            tuple(sorted(genre_ids or ())),
+            tuple(sorted(country_ids or ())),
+            tuple(sorted(person_ids or ())),
+            year_from,
+            year_to,
+            rating_from,
+            rating_to,
+        )
+        total = _count_estimate(db, stmt, filters_key)
+
+    facet_counts = None
+    if facets:
+        facets = tuple(sorted(set(facets)))
+        filtered = stmt.with_only_columns(Movie.id)
+        if filtered.whereclause is None:
+            facet_counts = facet_cache.get_or_set(facets, lambda: _count_facets(db, facets, None))
+        else:
+            facet_counts = _count_facets(db, facets, filtered)
+
+    by_relevance = sort == RELEVANCE_SORT and rank_order is not None
+    if by_relevance:
+        if cursor:
+            raise ValueError("Cursor is not supported for relevance sort")
+        stmt = stmt.order_by(rank_order, Movie.id.asc())
+    else:
+        stmt = stmt.order_by(*_order_by(sort_key, desc))
+
+    if cursor:
+        cursor_sort, value, last_id = decode_cursor(cursor)
+        if _parse_sort(cursor_sort) != (sort_key, desc):
+            raise ValueError("Cursor does not match sort")
+        keyset = _keyset_conditions(sort_key, desc, value, last_id)
+    else:
+        keyset = [None]
+        stmt = stmt.offset((page - 1) * size)
+
+    if expand:
+        stmt = stmt.options(*(selectinload(getattr(Movie, rel)) for rel in expand))
+
+    # берём на одну строку больше, чтобы понять, есть ли следующая страница
+    if indexed is not None:
+        rows = _hydrate(db, indexed[0], expand, columns if as_rows else None)
+    else:
+        rows = _fetch_rows(db, stmt, keyset, size + 1, columns if as_rows else None)
+    items = rows[:size]
+    has_next = len(rows) > size
+
+    next_cursor = None
+    if has_next and not by_relevance:
+        last = items[-1]
+        if as_rows:
+            value, last_id = last[SORT_COLUMNS[sort_key].key], last["id"]
+        else:
+            value, last_id = getattr(last, SORT_COLUMNS[sort_key].key), last.id
+        next_cursor = encode_cursor(sort_key, desc, value, last_id)
+
+    if output_fields is not None:
+        # колонку сортировки выбирали только ради курсора
+        items = [{field: item[field] for field in output_fields} for item in items]
+
+    return {
+        "items": items,
+        "total": total,
+        "total_mode": total_mode,
+        "has_next": has_next,
+        "next_cursor": next_cursor,
+        "facets": facet_counts,
+    }
 
 
 def get_movie(db: Session, movie_id: int) -> Movie | None:
@@ -122,7 +585,33 @@ def get_movie(db: Session, movie_id: int) -> Movie | None:
     return db.execute(stmt).scalar_one_or_none()
 
 
-def create_movie(
+def get_movies_batch(db: Session, movie_ids: list[int]) -> list[Movie]:
+    """Несколько фильмов со связями за фиксированное число запросов (1 + по одному на связь).
+
+    Порядок — как в movie_ids (повторы убираются), отсутствующие id пропускаются.
+    """
+    unique_ids = list(dict.fromkeys(movie_ids))
+    if not unique_ids:
+        return []
+    stmt = (
+        select(Movie)
+        .where(Movie.id.in_(unique_ids))
+        .options(
+            selectinload(Movie.genres),
+            selectinload(Movie.countries),
+            selectinload(Movie.persons),
+        )
+    )
+    by_id = {movie.id: movie for movie in db.execute(stmt).scalars()}
+    return [by_id[movie_id] for movie_id in unique_ids if movie_id in by_id]
+
+
+# stage_* — мутация в текущей транзакции (flush без commit и без хуков
+# каталога): их используют и одиночные create/update/patch/delete_movie,
+# и пакетные операции (app.crud.batch), коммитящие по пачкам
+
+
+def stage_create_movie(
     db: Session,
     *,
     title: str,
@@ -133,12 +622,7 @@ def create_movie(
     country_ids: list[int],
     person_ids: list[int],
 ) -> Movie:
-    genres, countries, persons = _load_reference_entities(
-        db,
-        genre_ids=genre_ids,
-        country_ids=country_ids,
-        person_ids=person_ids,
-    )
+    validate_reference_ids(db, genre_ids=genre_ids, country_ids=country_ids, person_ids=person_ids)
 
     movie = Movie(
         title=title,
@@ -146,17 +630,14 @@ def create_movie(
         release_year=release_year,
         rating=rating,
     )
-    movie.genres = genres
-    movie.countries = countries
-    movie.persons = persons
-
     db.add(movie)
-    db.commit()
-    db.refresh(movie)
+    db.flush()
+    for field, ids in (("genre_ids", genre_ids), ("country_ids", country_ids), ("person_ids", person_ids)):
+        _write_link_changes(db, movie.id, field, add=list(dict.fromkeys(ids)), remove=())
     return movie
 
 
-def update_movie(
+def stage_update_movie(
     db: Session,
     movie_id: int,
     *,
@@ -168,43 +649,99 @@ def update_movie(
     country_ids: list[int] | None,
     person_ids: list[int] | None,
 ) -> Movie | None:
-    movie = get_movie(db, movie_id)
+    # связи пишутся по id, ORM-коллекции для этого не нужны
+    movie = db.get(Movie, movie_id)
     if not movie:
         return None
+    validate_reference_ids(db, genre_ids=genre_ids, country_ids=country_ids, person_ids=person_ids)
 
-    if title is not None:
-        movie.title = title
-    if description is not None:
-        movie.description = description
-    if release_year is not None:
-        movie.release_year = release_year
-    if rating is not None:
-        movie.rating = rating
-
+    _set_fields(movie, title=title, description=description, release_year=release_year, rating=rating)
     # связи заменяем только если поле передано
-    if genre_ids is not None or country_ids is not None or person_ids is not None:
-        genres, countries, persons = _load_reference_entities(
-            db,
-            genre_ids=genre_ids,
-            country_ids=country_ids,
-            person_ids=person_ids,
-        )
-        if genre_ids is not None:
-            movie.genres = genres
-        if country_ids is not None:
-            movie.countries = countries
-        if person_ids is not None:
-            movie.persons = persons
-
-    db.commit()
-    db.refresh(movie)
+    _replace_links(db, movie.id, genre_ids=genre_ids, country_ids=country_ids, person_ids=person_ids)
+    _bump_version(db, movie)
     return movie
 
 
-def delete_movie(db: Session, movie_id: int) -> bool:
+def stage_patch_movie(
+    db: Session,
+    movie_id: int,
+    *,
+    title: str | None,
+    description: str | None,
+    release_year: int | None,
+    rating: float | None,
+    genre_ids: tuple[list[int], list[int]] | None,
+    country_ids: tuple[list[int], list[int]] | None,
+    person_ids: tuple[list[int], list[int]] | None,
+) -> Movie | None:
+    """Частичное изменение: связи — (add, remove) по отдельным id, без полного списка."""
     movie = db.get(Movie, movie_id)
     if not movie:
+        return None
+    # проверяем только добавляемые id: удалить несуществующую связь — не ошибка
+    validate_reference_ids(
+        db,
+        genre_ids=genre_ids[0] if genre_ids else None,
+        country_ids=country_ids[0] if country_ids else None,
+        person_ids=person_ids[0] if person_ids else None,
+    )
+
+    _set_fields(movie, title=title, description=description, release_year=release_year, rating=rating)
+    _patch_links(db, movie.id, genre_ids=genre_ids, country_ids=country_ids, person_ids=person_ids)
+    _bump_version(db, movie)
+    return movie
+
+
+def stage_delete_movie(db: Session, movie_id: int) -> bool:
+    """Удалить фильм и его связи запросами по id, без загрузки объекта и коллекций."""
+    for table, _ in LINKS.values():
+        db.execute(delete(table).where(table.c.movie_id == movie_id))
+    result = db.execute(delete(Movie).where(Movie.id == movie_id))
+    return result.rowcount > 0
+
+
+def _set_fields(movie: Movie, **values) -> None:
+    for name, value in values.items():
+        if value is not None:
+            setattr(movie, name, value)
+
+
+def _bump_version(db: Session, movie: Movie) -> None:
+    """version + 1 в самом UPDATE, а не в Python: параллельные правки одного
+    фильма получают разные версии (иначе один ETag покрыл бы два тела)."""
+    movie.version = Movie.version + 1
+    db.flush()
+    db.refresh(movie, ["version"])
+
+
+def _commit_change(db: Session, movie_id: int) -> Movie:
+    _catalog_changing(db, [movie_id])
+    db.commit()
+    _catalog_changed(db, [movie_id])
+    # перечитываем вместе со связями: ответ MovieDetails не должен
+    # догружать их лениво уже при сериализации
+    return get_movie(db, movie_id)
+
+
+def create_movie(db: Session, **fields) -> Movie:
+    movie = stage_create_movie(db, **fields)
+    return _commit_change(db, movie.id)
+
+
+def update_movie(db: Session, movie_id: int, **changes) -> Movie | None:
+    movie = stage_update_movie(db, movie_id, **changes)
+    return _commit_change(db, movie.id) if movie else None
+
+
+def patch_movie(db: Session, movie_id: int, **changes) -> Movie | None:
+    movie = stage_patch_movie(db, movie_id, **changes)
+    return _commit_change(db, movie.id) if movie else None
+
+
+def delete_movie(db: Session, movie_id: int) -> bool:
+    if not stage_delete_movie(db, movie_id):
         return False
-    db.delete(movie)
+    _catalog_changing(db, [movie_id])
     db.commit()
+    _catalog_changed(db, [movie_id])
     return True
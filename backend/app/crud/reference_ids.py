@@ -0,0 +1,105 @@
+"""Проверка id справочников по карте в памяти процесса, без запроса к БД.
+
+Для жанров, стран и персон в кэше "reference_ids" лежит битовая карта
+существующих id (бит на id: миллион персон — 125 КБ). Карта грузится одним
+SELECT id при первом обращении и перечитывается по TTL и после
+invalidate_reference_cache. id, которых нет в карте, проверяются точечным
+IN-запросом: поток запросов с несуществующими id не гоняет полное чтение
+справочника. Если IN-запрос их нашёл (справочник пополнили в другом
+процессе), карта этого справочника перечитывается. Каждая загрузка получает
+новую версию.
+
+Обратная устарелость — id удалён в другом процессе, а карта его ещё помнит —
+проявляется ошибкой внешнего ключа при записи; тогда вызывающий сбрасывает
+карты (invalidate_reference_ids).
+
+С reference_ids_ttl=0 карта не ведётся и id проверяются IN-запросом.
+"""
+
+import itertools
+from dataclasses import dataclass
+
+from sqlalchemy import select
+from sqlalchemy.orm import Session
+
+from app.core.cache import register_cache
+from app.core.config import settings
+from app.models.country import Country
+from app.models.genre import Genre
+from app.models.person import Person
+
+# поле MovieCreate/MovieUpdate -> модель справочника
+REFERENCES = {
+    "genre_ids": Genre,
+    "country_ids": Country,
+    "person_ids": Person,
+}
+
+reference_ids_cache = register_cache("reference_ids", maxsize=len(REFERENCES), ttl=settings.reference_ids_ttl)
+_versions = itertools.count(1)
+
+
+@dataclass(frozen=True)
+class IdMap:
+    version: int
+    bits: bytes
+    count: int
+
+    def __contains__(self, ref_id: int) -> bool:
+        return 0 <= ref_id < len(self.bits) * 8 and bool(self.bits[ref_id >> 3] >> (ref_id & 7) & 1)
+
+
+def load_id_map(db: Session, field: str) -> IdMap:
+    """Прочитать id справочника из БД и положить новую версию карты в кэш."""
+    ids = db.execute(select(REFERENCES[field].id)).scalars().all()
+    buf = bytearray(max(ids, default=0) // 8 + 1)
+    for ref_id in ids:
+        buf[ref_id >> 3] |= 1 << (ref_id & 7)
+    id_map = IdMap(next(_versions), bytes(buf), len(ids))
+    reference_ids_cache.set(field, id_map)
+    return id_map
+
+
+def missing_ids(db: Session, field: str, ids) -> set[int]:
+    """Какие из ids не существуют в справочнике field."""
+    ids = set(ids)
+    if not ids:
+        return set()
+    if not reference_ids_cache.enabled:
+        return _missing_in_db(db, field, ids)
+
+    id_map = reference_ids_cache.get(field)
+    if id_map is None:
+        id_map = load_id_map(db, field)
+    missing = {ref_id for ref_id in ids if ref_id not in id_map}
+    if not missing:
+        return missing
+    # карта могла устареть — проверяем только неизвестные id
+    still_missing = _missing_in_db(db, field, missing)
+    if still_missing != missing:
+        load_id_map(db, field)
+    return still_missing
+
+
+def _missing_in_db(db: Session, field: str, ids: set[int]) -> set[int]:
+    model = REFERENCES[field]
+    return ids - set(db.execute(select(model.id).where(model.id.in_(ids))).scalars())
+
+
+def validate_reference_ids(db: Session, **fields: list[int] | None) -> None:
+    """Проверить id справочников (None — поле не передано).
+
+    Если какие-то id не найдены, кидает ValueError с сообщением для ответа 400.
+    """
+    for field, ids in fields.items():
+        if ids:
+            missing = missing_ids(db, field, ids)
+            if missing:
+                raise ValueError(f"Unknown {field}: {sorted(missing)}")
+
+
+def invalidate_reference_ids(field: str | None = None) -> int:
+    """Сбросить карту справочника field (все — без аргумента)."""
+    if field is None:
+        return reference_ids_cache.invalidate()
+    return reference_ids_cache.invalidate(lambda key: key == field)
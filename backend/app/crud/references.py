@@ -1,10 +1,37 @@
 from sqlalchemy import select, func
 from sqlalchemy.orm import Session
 
+from app.core.cache import register_cache
+from app.core.config import settings
+from app.crud.reference_ids import invalidate_reference_ids
 from app.models.genre import Genre
 from app.models.country import Country
 from app.models.person import Person
 
+# справочники меняются редко, а фронт запрашивает их на каждой странице
+# ключ: (entity, search, page, size) -> (items как dict, total)
+reference_cache = register_cache(
+    "references",
+    maxsize=settings.reference_cache_maxsize,
+    ttl=settings.reference_cache_ttl,
+)
+
+
+_ENTITY_FIELDS = {"genres": "genre_ids", "countries": "country_ids", "persons": "person_ids"}
+
+
+def invalidate_reference_cache(entity: str | None = None) -> int:
+    """Сбросить кэш справочника entity ("genres"/"countries"/"persons") или всех.
+
+    Вызывать после любых изменений справочников; заодно сбрасывает карту id
+    справочника (app.crud.reference_ids).
+    """
+    if entity is None:
+        invalidate_reference_ids()
+        return reference_cache.invalidate()
+    invalidate_reference_ids(_ENTITY_FIELDS[entity])
+    return reference_cache.invalidate(lambda key: key[0] == entity)
+
 
 def _paginate(stmt, count_stmt, db: Session, page: int, size: int):
     total = db.execute(count_stmt).scalar_one()
@@ -12,34 +39,54 @@ def _paginate(stmt, count_stmt, db: Session, page: int, size: int):
     return items, total
 
 
+def _cached(entity: str, search: str | None, page: int, size: int, fields: tuple[str, ...], load):
+    """Результат load() из кэша; ORM-объекты сохраняются как dict, чтобы не держать сессию."""
+    key = (entity, search.strip() if search else None, page, size)
+
+    def fetch():
+        items, total = load()
+        return [{f: getattr(obj, f) for f in fields} for obj in items], total
+
+    return reference_cache.get_or_set(key, fetch)
+
+
 def list_genres(db: Session, search: str | None, page: int, size: int):
-    base = select(Genre)
-    count = select(func.count(Genre.id))
-    if search:
-        like = f"%{search.strip()}%"
-        base = base.where(Genre.name.ilike(like))
-        count = count.where(Genre.name.ilike(like))
-    base = base.order_by(Genre.name.asc())
-    return _paginate(base, count, db, page, size)
+    def load():
+        base = select(Genre)
+        count = select(func.count(Genre.id))
+        if search:
+            like = f"%{search.strip()}%"
+            base = base.where(Genre.name.ilike(like))
+            count = count.where(Genre.name.ilike(like))
+        base = base.order_by(Genre.name.asc())
+        return _paginate(base, count, db, page, size)
+
+    return _cached("genres", search, page, size, ("id", "name"), load)
 
 
 def list_countries(db: Session, search: str | None, page: int, size: int):
-    base = select(Country)
-    count = select(func.count(Country.id))
-    if search:
-        like = f"%{search.strip()}%"
-        base = base.where(Country.name.ilike(like))
-        count = count.where(Country.name.ilike(like))
-    base = base.order_by(Country.name.asc())
-    return _paginate(base, count, db, page, size)
+    def load():
+        base = select(Country)
+        count = select(func.count(Country.id))
+        if search:
+            like = f"%{search.strip()}%"
+            base = base.where(Country.name.ilike(like))
+            count = count.where(Country.name.ilike(like))
+        base = base.order_by(Country.name.asc())
+        return _paginate(base, count, db, page, size)
+
+    return _cached("countries", search, page, size, ("id", "name"), load)
 
 
 def list_persons(db: Session, search: str | None, page: int, size: int):
-    base = select(Person)
-    count = select(func.count(Person.id))
-    if search:
-        like = f"%{search.strip()}%"
-        base = base.where(Person.full_name.ilike(like))
-        count = count.where(Person.full_name.ilike(like))
-    base = base.order_by(Person.full_name.asc())
-    return _paginate(base, count, db, page, size)
+    def load():
+        base = select(Person)
+        count = select(func.count(Person.id))
+        if search:
+            like = f"%{search.strip()}%"
+            base = base.where(Person.full_name.ilike(like))
+            count = count.where(Person.full_name.ilike(like))
+        base = base.order_by(Person.full_name.asc())
+        return _paginate(base, count, db, page, size)
+
+    return _cached("persons", search, page, size, ("id", "full_name"), load)
@@ -0,0 +1,47 @@
+"""Полнотекстовый поиск по фильмам.
+
+Один и тот же сценарий для двух СУБД: в Postgres — tsvector/tsquery с
+ts_rank и GIN-индексом, в SQLite — FTS5 (movies_fts) с bm25-рангом.
+Каждое слово запроса ищется как префикс, чтобы поиск работал "по мере набора".
+"""
+
+import re
+
+from sqlalchemy import column, func, literal_column, table
+
+from app.models.movie import Movie
+from app.models.search import MOVIES_TSVECTOR_SQL
+
+_TOKEN_RE = re.compile(r"\w+", re.UNICODE)
+
+_movies_fts = table("movies_fts", column("rowid"), column("rank"))
+_movies_tsvector = literal_column(MOVIES_TSVECTOR_SQL)
+# регконфиг константой, а не bind-параметром — как в выражении индекса
+_ts_config = literal_column("'simple'")
+
+
+def search_tokens(q: str | None) -> list[str]:
+    """Слова запроса без спецсимволов (операторы FTS/tsquery пользователю недоступны)."""
+    return _TOKEN_RE.findall(q or "")
+
+
+def apply_fulltext(stmt, dialect_name: str, tokens: list[str]):
+    """Добавляет к select(Movie) полнотекстовый фильтр.
+
+    Возвращает (stmt, order_clause), где order_clause — сортировка по
+    релевантности (лучшие совпадения первыми).
+    """
+    if dialect_name == "postgresql":
+        query = func.to_tsquery(_ts_config, " & ".join(f"{t}:*" for t in tokens))
+        stmt = stmt.where(_movies_tsvector.op("@@")(query))
+        return stmt, func.ts_rank(_movies_tsvector, query).desc()
+
+    if dialect_name == "sqlite":
+        match = " ".join('"{}"*'.format(t.replace('"', "")) for t in tokens)
+        stmt = stmt.join(_movies_fts, _movies_fts.c.rowid == Movie.id).where(
+            literal_column("movies_fts").op("MATCH")(match)
+        )
+        # rank в FTS5 — bm25, чем меньше, тем релевантнее
+        return stmt, _movies_fts.c.rank.asc()
+
+    raise ValueError(f"Full-text search is not supported for {dialect_name}")
@@ -0,0 +1,45 @@
+"""CLI массового импорта фильмов из NDJSON (тот же конвейер, что POST /api/admin/movies:bulk).
+
+    python -m app.import movies.ndjson --chunk-size 5000
+    cat movies.ndjson | python -m app.import -
+"""
+
+import argparse
+import json
+import sys
+
+from app.core.config import settings
+from app.core.db import SessionLocal
+from app.crud.bulk import MovieImporter
+
+
+def main(argv: list[str] | None = None) -> int:
+    parser = argparse.ArgumentParser(prog="python -m app.import", description="Bulk import movies from NDJSON")
+    parser.add_argument("path", help="NDJSON-файл или '-' для stdin")
+    parser.add_argument("--chunk-size", type=int, default=settings.bulk_import_chunk_size)
+    parser.add_argument("--max-errors", type=int, default=1000, help="Сколько ошибок выводить в отчёте")
+    args = parser.parse_args(argv)
+
+    stream = sys.stdin if args.path == "-" else open(args.path, encoding="utf-8")
+    importer = MovieImporter(chunk_size=args.chunk_size, max_errors=args.max_errors)
+    db = SessionLocal()
+    try:
+        for line_no, line in enumerate(stream, start=1):
+            if not line.strip():
+                continue
+            if importer.add(line_no, line):
+                importer.flush(db)
+                print(f"Import: {importer.inserted} inserted, {importer.failed} failed", file=sys.stderr)
+        importer.flush(db)
+    finally:
+        db.close()
+        if stream is not sys.stdin:
+            stream.close()
+
+    report = importer.report()
+    print(json.dumps(report, ensure_ascii=False, indent=2))
+    return 0 if report["failed"] == 0 else 1
+
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -1,17 +1,35 @@
+from contextlib import asynccontextmanager
+
 from fastapi import FastAPI
 from fastapi.middleware.cors import CORSMiddleware
 
+from app.core.cache import register_cache
+from app.core.compression import CompressionMiddleware
 from app.core.config import settings
+from app.core.metrics import MetricsMiddleware
+from app.crud.filter_index import filter_index
 from app.api.routers.health import router as health_router
 from app.api.routers.genres import router as genres_router
 from app.api.routers.countries import router as countries_router
 from app.api.routers.persons import router as persons_router
 from app.api.routers.movies import router as movies_router
 from app.api.routers.admin import router as admin_router
+from app.api.routers.metrics import router as metrics_router
+
+
+@asynccontextmanager
+async def lifespan(app: FastAPI):
+    # индекс строится в фоне, не задерживая старт: пока он не готов, списки
+    # обслуживает SQL (ensure_current не ждёт идущую пересборку)
+    if settings.filter_index:
+        filter_index.start_rebuild()
+    yield
+
 
 app = FastAPI(
     title=settings.project_name,
     debug=settings.debug,
+    lifespan=lifespan,
 )
 
 # CORS (чтобы фронт мог дергать API)
@@ -24,6 +42,24 @@ app.add_middleware(
     allow_headers=["*"],
 )
 
+# Сжатие ответов (gzip/brotli); добавлено последним — внешний слой
+app.add_middleware(
+    CompressionMiddleware,
+    encodings=tuple(e.strip() for e in settings.compression_encodings.split(",") if e.strip()),
+    minimum_size=settings.compression_minimum_size,
+    gzip_level=settings.compression_gzip_level,
+    brotli_quality=settings.compression_brotli_quality,
+    cache=register_cache(
+        "compressed_responses",
+        maxsize=settings.compression_cache_maxsize,
+        ttl=settings.compression_cache_ttl,
+    ),
+)
+
+# Метрики запросов (Prometheus /metrics, Server-Timing) — самый внешний слой,
+# чтобы время включало сжатие
+app.add_middleware(MetricsMiddleware, server_timing=settings.debug or settings.server_timing)
+
 # Роутеры
 app.include_router(health_router, prefix=settings.api_prefix)
 app.include_router(genres_router, prefix=settings.api_prefix)
@@ -31,3 +67,5 @@ app.include_router(countries_router, prefix=settings.api_prefix)
 app.include_router(persons_router, prefix=settings.api_prefix)
 app.include_router(movies_router, prefix=settings.api_prefix)
 app.include_router(admin_router, prefix=settings.api_prefix)
+# /metrics — без префикса API, как ожидает Prometheus
+app.include_router(metrics_router)
@@ -5,8 +5,13 @@ from .movie import Movie  # noqa: F401
 from .genre import Genre  # noqa: F401
 from .country import Country  # noqa: F401
 from .person import Person  # noqa: F401
+from .catalog_state import CatalogState  # noqa: F401
+from .movie_search import MovieSearch  # noqa: F401
 from .association_tables import (  # noqa: F401
     movie_genre,
     movie_country,
     movie_person,
 )
+
+# DDL поисковых индексов (pg_trgm/tsvector, SQLite FTS5)
+from . import search  # noqa: F401,E402
@@ -0,0 +1,17 @@
+from sqlalchemy import BigInteger, Integer
+from sqlalchemy.orm import Mapped, mapped_column
+from app.models.base import Base
+
+
+class CatalogState(Base):
+    """Служебная строка (id=1) с версией каталога.
+
+    Версия растёт в той же транзакции, что и любая мутация фильмов, поэтому
+    на реплике она всегда соответствует видимым там данным. Из неё строятся
+    ETag списков.
+    """
+
+    __tablename__ = "catalog_state"
+
+    id: Mapped[int] = mapped_column(Integer, primary_key=True)
+    version: Mapped[int] = mapped_column(BigInteger, nullable=False, default=0)
@@ -1,4 +1,4 @@
-from sqlalchemy import Integer, String, Text, Float
+from sqlalchemy import Index, Integer, String, Text, Float
 from sqlalchemy.orm import Mapped, mapped_column, relationship
 from app.models.base import Base
 from app.models.association_tables import movie_genre, movie_country, movie_person
@@ -6,6 +6,12 @@ from app.models.association_tables import movie_genre, movie_country, movie_pers
 
 class Movie(Base):
     __tablename__ = "movies"
+    # составные индексы под keyset-пагинацию: ORDER BY <col>, id
+    __table_args__ = (
+        Index("ix_movies_title_id", "title", "id"),
+        Index("ix_movies_rating_id", "rating", "id"),
+        Index("ix_movies_release_year_id", "release_year", "id"),
+    )
 
     id: Mapped[int] = mapped_column(Integer, primary_key=True)
     title: Mapped[str] = mapped_column(String(255), index=True, nullable=False)
@@ -14,6 +20,9 @@ class Movie(Base):
     release_year: Mapped[int | None] = mapped_column(Integer, index=True, nullable=True)
     rating: Mapped[float | None] = mapped_column(Float, index=True, nullable=True)
 
+    # растёт при каждом изменении фильма (включая связи); основа ETag карточки
+    version: Mapped[int] = mapped_column(Integer, nullable=False, default=1, server_default="1")
+
     genres = relationship("Genre", secondary=movie_genre, back_populates="movies")
     countries = relationship("Country", secondary=movie_country, back_populates="movies")
     persons = relationship("Person", secondary=movie_person, back_populates="movies")
@@ -0,0 +1,30 @@
+from sqlalchemy import JSON, ForeignKey, Index, Integer
+from sqlalchemy.dialects import postgresql
+from sqlalchemy.orm import Mapped, mapped_column
+
+from app.models.base import Base
+
+# массив id: int[] с GIN-индексом в Postgres, JSON-массив в остальных СУБД
+IntList = JSON().with_variant(postgresql.ARRAY(Integer), "postgresql")
+
+
+class MovieSearch(Base):
+    """Денормализованная проекция связей фильма для фильтрации списка.
+
+    Одна строка на фильм с массивами id жанров/стран/персон: фильтр по
+    нескольким связям — пересечение массивов по GIN-индексам вместо
+    коррелированных EXISTS по таблицам связей. Поддерживается CRUD-слоем
+    (app.crud.movie_search), пересобирается через админку.
+    """
+
+    __tablename__ = "movie_search"
+    __table_args__ = (
+        Index("ix_movie_search_genre_ids", "genre_ids", postgresql_using="gin").ddl_if(dialect="postgresql"),
+        Index("ix_movie_search_country_ids", "country_ids", postgresql_using="gin").ddl_if(dialect="postgresql"),
+        Index("ix_movie_search_person_ids", "person_ids", postgresql_using="gin").ddl_if(dialect="postgresql"),
+    )
+
+    movie_id: Mapped[int] = mapped_column(ForeignKey("movies.id", ondelete="CASCADE"), primary_key=True)
+    genre_ids: Mapped[list[int]] = mapped_column(IntList, nullable=False, default=list)
+    country_ids: Mapped[list[int]] = mapped_column(IntList, nullable=False, default=list)
+    person_ids: Mapped[list[int]] = mapped_column(IntList, nullable=False, default=list)
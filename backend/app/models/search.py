@@ -0,0 +1,55 @@
+"""Поисковые индексы каталога, которые не описываются через ORM.
+
+Postgres: pg_trgm GIN-индексы (ILIKE '%...%' по названиям и именам идёт
+через индекс), GIN-индекс по tsvector(title + description) для полнотекстового
+поиска и индекс (title COLLATE "C", id) под сортировку по названию. SQLite: внешняя FTS5-таблица movies_fts, синхронизируемая триггерами, —
+тот же сценарий поиска в тестах на in-memory базе.
+
+В Postgres-окружении индексы создаёт миграция; здесь же они навешиваются на
+Base.metadata.create_all (тесты, локальная SQLite).
+"""
+
+from sqlalchemy import DDL, event
+
+from app.models.base import Base
+
+# выражение должно совпадать с индексом ix_movies_search_tsv буква в букву,
+# иначе планировщик Postgres его не использует
+MOVIES_TSVECTOR_SQL = (
+    "to_tsvector('simple', coalesce(movies.title, '') || ' ' || coalesce(movies.description, ''))"
+)
+
+POSTGRES_DDL = [
+    "CREATE EXTENSION IF NOT EXISTS pg_trgm",
+    "CREATE INDEX IF NOT EXISTS ix_movies_title_trgm ON movies USING gin (title gin_trgm_ops)",
+    "CREATE INDEX IF NOT EXISTS ix_genres_name_trgm ON genres USING gin (name gin_trgm_ops)",
+    "CREATE INDEX IF NOT EXISTS ix_countries_name_trgm ON countries USING gin (name gin_trgm_ops)",
+    "CREATE INDEX IF NOT EXISTS ix_persons_full_name_trgm ON persons USING gin (full_name gin_trgm_ops)",
+    f"CREATE INDEX IF NOT EXISTS ix_movies_search_tsv ON movies USING gin (({MOVIES_TSVECTOR_SQL}))",
+    # сортировка и keyset по названию в порядке кодовых точек (app.crud.movies.codepoint_order)
+    'CREATE INDEX IF NOT EXISTS ix_movies_title_c_id ON movies (title COLLATE "C", id)',
+]
+
+SQLITE_DDL = [
+    "CREATE VIRTUAL TABLE IF NOT EXISTS movies_fts USING fts5("
+    "title, description, content='movies', content_rowid='id', tokenize='unicode61 remove_diacritics 2')",
+    "CREATE TRIGGER IF NOT EXISTS movies_fts_ai AFTER INSERT ON movies BEGIN "
+    "INSERT INTO movies_fts(rowid, title, description) VALUES (new.id, new.title, new.description); END",
+    "CREATE TRIGGER IF NOT EXISTS movies_fts_ad AFTER DELETE ON movies BEGIN "
+    "INSERT INTO movies_fts(movies_fts, rowid, title, description) "
+    "VALUES ('delete', old.id, old.title, old.description); END",
+    "CREATE TRIGGER IF NOT EXISTS movies_fts_au AFTER UPDATE ON movies BEGIN "
+    "INSERT INTO movies_fts(movies_fts, rowid, title, description) "
+    "VALUES ('delete', old.id, old.title, old.description); "
+    "INSERT INTO movies_fts(rowid, title, description) VALUES (new.id, new.title, new.description); END",
+]
+
+for _stmt in POSTGRES_DDL:
+    event.listen(Base.metadata, "after_create", DDL(_stmt).execute_if(dialect="postgresql"))
+for _stmt in SQLITE_DDL:
+    event.listen(Base.metadata, "after_create", DDL(_stmt).execute_if(dialect="sqlite"))
+event.listen(
+    Base.metadata,
+    "before_drop",
+    DDL("DROP TABLE IF EXISTS movies_fts").execute_if(dialect="sqlite"),
+)
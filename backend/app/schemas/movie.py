@@ -1,4 +1,6 @@
-from pydantic import BaseModel, Field
+from typing import Annotated, Literal
+
+from pydantic import BaseModel, Field, model_validator
 
 from app.schemas.pagination import PageMeta
 from app.schemas.genre import GenreOut
@@ -23,8 +25,40 @@ class MovieDetails(MovieShort):
     persons: list[PersonOut] = []
 
 
+class FacetBucket(BaseModel):
+    # id жанра/страны, начало десятилетия или целая часть рейтинга
+    value: int
+    count: int
+
+
 class MovieListResponse(PageMeta):
+    # None, если total не считался (total_mode=none)
+    total: int | None = Field(ge=0, default=0)
+    # каким способом получен total: точный COUNT, оценка или не считался
+    total_mode: Literal["exact", "estimate", "none"] = "exact"
+    has_next: bool | None = None
     items: list[MovieShort]
+    # курсор следующей страницы (keyset-пагинация); None — страниц больше нет
+    next_cursor: str | None = None
+    # счётчики по измерениям из facets=, с теми же фильтрами, что и items
+    facets: dict[str, list[FacetBucket]] | None = None
+
+
+class MovieExpanded(MovieShort):
+    # заполняются только связи, запрошенные через expand
+    genres: list[GenreOut] | None = None
+    countries: list[CountryOut] | None = None
+    persons: list[PersonOut] | None = None
+
+
+class MovieExpandedListResponse(MovieListResponse):
+    items: list[MovieExpanded]
+
+
+class MovieBatchResponse(BaseModel):
+    # в порядке запрошенных id
+    items: list[MovieDetails]
+    missing_ids: list[int] = []
 
 
 # --- Admin input schemas (добавление/редактирование) ---
@@ -52,3 +86,101 @@ class MovieUpdate(BaseModel):
     genre_ids: list[int] | None = None
     country_ids: list[int] | None = None
     person_ids: list[int] | None = None
+
+
+class LinkChanges(BaseModel):
+    add: list[int] = Field(default_factory=list)
+    remove: list[int] = Field(default_factory=list)
+
+    @model_validator(mode="after")
+    def _disjoint(self):
+        both = sorted(set(self.add) & set(self.remove))
+        if both:
+            raise ValueError(f"ids both added and removed: {both}")
+        return self
+
+
+class MoviePatch(BaseModel):
+    title: str | None = Field(default=None, min_length=1, max_length=255)
+    description: str | None = None
+    release_year: int | None = Field(default=None, ge=1800)
+    rating: float | None = Field(default=None, ge=0, le=10)
+
+    # Добавить/убрать отдельные id; остальные связи остаются как есть
+    genre_ids: LinkChanges | None = None
+    country_ids: LinkChanges | None = None
+    person_ids: LinkChanges | None = None
+
+    def changes(self) -> dict:
+        """Аргументы patch_movie: связи — кортежи (add, remove)."""
+        data = self.model_dump(include={"title", "description", "release_year", "rating"})
+        for field in ("genre_ids", "country_ids", "person_ids"):
+            links = getattr(self, field)
+            data[field] = (links.add, links.remove) if links is not None else None
+        return data
+
+
+# --- Пакет изменений (POST /admin/movies:batch) ---
+
+
+class BatchCreate(BaseModel):
+    op: Literal["create"]
+    movie: MovieCreate
+
+
+class BatchUpdate(BaseModel):
+    op: Literal["update"]
+    id: int
+    movie: MovieUpdate
+
+
+class BatchPatch(BaseModel):
+    op: Literal["patch"]
+    id: int
+    movie: MoviePatch
+
+
+class BatchDelete(BaseModel):
+    op: Literal["delete"]
+    id: int
+
+
+BatchOperation = Annotated[BatchCreate | BatchUpdate | BatchPatch | BatchDelete, Field(discriminator="op")]
+
+
+class MovieMutationBatch(BaseModel):
+    operations: list[BatchOperation] = Field(min_length=1)
+
+
+class MovieMutationResult(BaseModel):
+    index: int
+    op: str
+    # HTTP-статус, который вернула бы одиночная операция: 201/200/204/400/404/409
+    status: int
+    id: int | None = None
+    # версия фильма после операции (основа ETag карточки)
+    version: int | None = None
+    error: str | None = None
+
+
+class MovieMutationReport(BaseModel):
+    processed: int
+    succeeded: int
+    failed: int
+    # False — atomic-пакет откатан целиком из-за ошибки (последний результат)
+    committed: bool
+    results: list[MovieMutationResult]
+
+
+class BulkImportError(BaseModel):
+    line: int
+    error: str
+
+
+class BulkImportReport(BaseModel):
+    processed: int
+    inserted: int
+    failed: int
+    errors: list[BulkImportError]
+    # в errors попадают не все ошибки (ограничение на размер отчёта)
+    errors_truncated: bool = False
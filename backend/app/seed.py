@@ -1,164 +1,294 @@
+"""Демо-данные и синтетические каталоги любого размера.
+
+    python -m app.seed                                # 50 фильмов (при старте контейнера)
+    python -m app.seed --size 2000000 --seed 7 --force
+
+Справочники создаются один раз, их id держатся в словарях. Фильмы и связи
+пишутся пачками по chunk_size, каждая пачка — своя транзакция: в Postgres
+(psycopg2) через COPY, иначе executemany. id фильмов выделяются заранее (из
+последовательности), поэтому RETURNING не нужен. Проекция movie_search и
+версия каталога обновляются один раз в конце. Один и тот же --seed даёт один
+и тот же каталог.
+
+Распределения приближены к реальным: популярность стран и персон степенная
+(немного "звёзд" в большинстве фильмов), годы смещены к недавним, рейтинг
+около 6.5, у ~3% фильмов нет года или рейтинга.
+"""
+
+import argparse
+import itertools
+import random
+import time
+from collections.abc import Callable, Iterator
+
+from sqlalchemy import func, insert, select, text
 from sqlalchemy.orm import Session
 
+from app.core.config import settings
 from app.core.db import SessionLocal
+from app.core.response_cache import response_cache
+from app.crud.bulk import _copy_rows
+from app.crud.catalog import bump_catalog_version
+from app.crud.movie_search import rebuild_movie_search
+from app.models.association_tables import movie_country, movie_genre, movie_person
 from app.models.genre import Genre
 from app.models.country import Country
 from app.models.person import Person
 from app.models.movie import Movie
 
 
-def get_or_create(db: Session, model, **kwargs):
-    obj = db.query(model).filter_by(**kwargs).first()
-    if obj:
-        return obj
-    obj = model(**kwargs)
-    db.add(obj)
-    db.flush()
-    return obj
+GENRES = [
+    "Action",
+    "Comedy",
+    "Drama",
+    "Thriller",
+    "Sci-Fi",
+    "Fantasy",
+    "Animation",
+    "Adventure",
+    "Mystery",
+    "Crime",
+]
+COUNTRIES = ["USA", "UK", "France", "Japan", "Germany", "Canada", "South Korea", "Spain"]
+PERSONS = [
+    "Christopher Nolan",
+    "Leonardo DiCaprio",
+    "Keanu Reeves",
+    "Hayao Miyazaki",
+    "Greta Gerwig",
+    "Denis Villeneuve",
+    "Bong Joon-ho",
+    "Natalie Portman",
+    "Brad Pitt",
+    "Tilda Swinton",
+]
+
+TITLE_BASES = [
+    "Midnight Protocol",
+    "Neon Harbor",
+    "Glass Horizon",
+    "Silent Meridian",
+    "Crimson Circuit",
+    "Paper Sky",
+    "Echoes of Tomorrow",
+    "Velvet Storm",
+    "Shadow Atlas",
+    "Last Train North",
+    "The Fourth Door",
+    "Moonlit Archive",
+    "Winter Signal",
+    "City of Ash",
+    "Astra Run",
+    "Hidden Orchard",
+    "Terminal Bloom",
+    "Kite & Stone",
+    "Wild Card",
+    "The Long Detour",
+]
+
+CURATED = [
+    {
+        "title": "Inception",
+        "description": "A thief steals secrets through dream-sharing technology.",
+        "year": 2010,
+        "rating": 8.8,
+        "genres": ["Sci-Fi", "Thriller"],
+        "countries": ["USA", "UK"],
+        "persons": ["Christopher Nolan", "Leonardo DiCaprio"],
+    },
+    {
+        "title": "The Matrix",
+        "description": "A hacker discovers the world is a simulation.",
+        "year": 1999,
+        "rating": 8.7,
+        "genres": ["Action", "Sci-Fi"],
+        "countries": ["USA"],
+        "persons": ["Keanu Reeves"],
+    },
+    {
+        "title": "Spirited Away",
+        "description": "A girl navigates a mysterious spirit world.",
+        "year": 2001,
+        "rating": 8.6,
+        "genres": ["Animation", "Fantasy", "Adventure"],
+        "countries": ["Japan"],
+        "persons": ["Hayao Miyazaki"],
+    },
+]
+
+_FIRST_NAMES = sorted({p.split(" ", 1)[0] for p in PERSONS})
+_LAST_NAMES = sorted({p.split(" ", 1)[1] for p in PERSONS})
+
+_MOVIE_COLUMNS = ("title", "description", "release_year", "rating")
+# связь -> (таблица, колонка id справочника); порядок как в кортеже фильма
+_LINKS = (
+    (movie_genre, "genre_id"),
+    (movie_country, "country_id"),
+    (movie_person, "person_id"),
+)
+
+# (title, description, release_year, rating, genre_ids, country_ids, person_ids)
+MovieRow = tuple[str, str, int | None, float | None, list[int], list[int], list[int]]
+
+
+def person_names(count: int) -> list[str]:
+    """count уникальных имён: сначала PERSONS, потом "имя фамилия N" из их частей."""
+    names = list(PERSONS[:count])
+    for n in itertools.count(2):
+        if len(names) >= count:
+            return names
+        combos = itertools.product(_FIRST_NAMES, _LAST_NAMES)
+        names.extend(f"{first} {last} {n}" for first, last in itertools.islice(combos, count - len(names)))
+
+
+def ensure_references(db: Session, model, column: str, names: list[str]) -> dict[str, int]:
+    """Карта имя -> id справочника; недостающие вставляются одним executemany."""
+    col = getattr(model, column)
+    stmt = select(col, model.id)
+    if len(names) <= 1000:
+        stmt = stmt.where(col.in_(names))  # большой справочник дешевле прочитать целиком
+    ids = dict(db.execute(stmt).all())
+    missing = [name for name in names if name not in ids]
+    if missing:
+        table = model.__table__
+        created = db.execute(
+            insert(table).returning(table.c.id, sort_by_parameter_order=True),
+            [{column: name} for name in missing],
+        ).scalars().all()
+        ids.update(zip(missing, created))
+    db.commit()
+    return {name: ids[name] for name in names}
+
+
+def _cum_zipf(n: int, s: float) -> list[float]:
+    return list(itertools.accumulate(1 / rank**s for rank in range(1, n + 1)))
 
 
-def seed():
+def iter_movies(
+    size: int,
+    genres: dict[str, int],
+    countries: dict[str, int],
+    persons: dict[str, int],
+    random_seed: int = 42,
+) -> Iterator[MovieRow]:
+    """Фильмы каталога: сначала CURATED, затем сгенерированные."""
+    for item in CURATED[:size]:
+        yield (
+            item["title"],
+            item["description"],
+            item["year"],
+            item["rating"],
+            [genres[g] for g in item["genres"]],
+            [countries[c] for c in item["countries"]],
+            [persons[p] for p in item["persons"]],
+        )
+
+    rnd = random.Random(random_seed)
+    genre_ids, country_ids, person_ids = list(genres.values()), list(countries.values()), list(persons.values())
+    country_weights = _cum_zipf(len(country_ids), 1.1)
+    person_weights = _cum_zipf(len(person_ids), 0.9)
+    for n in range(len(CURATED) + 1, size + 1):
+        base = rnd.choice(TITLE_BASES)
+        year = None if rnd.random() < 0.03 else max(1900, min(2025, int(2026 - rnd.expovariate(1 / 18))))
+        rating = None if rnd.random() < 0.03 else round(min(10.0, max(1.0, rnd.gauss(6.5, 1.2))), 1)
+        yield (
+            f"{base} #{n:02d}",
+            f"{base}: a story of choices, consequences, and unexpected turns.",
+            year,
+            rating,
+            rnd.sample(genre_ids, k=rnd.choice((1, 1, 2, 2, 2, 3))),
+            list(dict.fromkeys(rnd.choices(country_ids, cum_weights=country_weights, k=rnd.choice((1, 1, 1, 2))))),
+            list(dict.fromkeys(rnd.choices(person_ids, cum_weights=person_weights, k=rnd.randint(2, 8)))),
+        )
+
+
+def _reserve_movie_ids(db: Session, count: int) -> list[int]:
+    """id для пачки фильмов заранее: вставка без RETURNING идёт executemany/COPY."""
+    if db.get_bind().dialect.name == "postgresql":
+        return db.execute(
+            text("SELECT nextval(pg_get_serial_sequence('movies', 'id')) FROM generate_series(1, :n)"),
+            {"n": count},
+        ).scalars().all()
+    # SQLite (разработка и тесты): сидер — единственный писатель
+    last_id = db.execute(select(func.max(Movie.id))).scalar() or 0
+    return list(range(last_id + 1, last_id + count + 1))
+
+
+def _insert_chunk(db: Session, chunk: list[MovieRow]) -> None:
+    movie_ids = _reserve_movie_ids(db, len(chunk))
+    columns = ("id", *_MOVIE_COLUMNS)
+    _copy_rows(db, Movie.__table__, columns, [(movie_id, *row[:4]) for movie_id, row in zip(movie_ids, chunk)])
+
+    for position, (link_table, column) in enumerate(_LINKS, start=4):
+        rows = [(movie_id, ref_id) for movie_id, row in zip(movie_ids, chunk) for ref_id in row[position]]
+        _copy_rows(db, link_table, ("movie_id", column), rows)
+    db.commit()
+
+
+def seed_movies(
+    db: Session,
+    size: int,
+    *,
+    random_seed: int = 42,
+    chunk_size: int = 10_000,
+    progress: Callable[[int], None] | None = None,
+) -> dict:
+    """Дописать в БД size фильмов (справочники — по необходимости). Возвращает сводку."""
+    started = time.perf_counter()
+    genres = ensure_references(db, Genre, "name", GENRES)
+    countries = ensure_references(db, Country, "name", COUNTRIES)
+    persons = ensure_references(db, Person, "full_name", person_names(max(len(PERSONS), size // 4)))
+
+    inserted = 0
+    rows = iter_movies(size, genres, countries, persons, random_seed)
+    while chunk := list(itertools.islice(rows, chunk_size)):
+        _insert_chunk(db, chunk)
+        inserted += len(chunk)
+        if progress:
+            progress(inserted)
+
+    # производные данные — один раз на весь каталог, а не на каждую пачку
+    if settings.movie_search_projection:
+        rebuild_movie_search(db)
+    else:
+        bump_catalog_version(db)
+        db.commit()
+        response_cache.bump_generation()
+    return {
+        "movies": inserted,
+        "genres": len(genres),
+        "countries": len(countries),
+        "persons": len(persons),
+        "seconds": round(time.perf_counter() - started, 3),
+    }
+
+
+def seed(size: int = 50, random_seed: int = 42, chunk_size: int = 10_000, force: bool = False):
     db = SessionLocal()
     try:
-        # если уже есть фильмы — не сидим повторно
-        if db.query(Movie).count() > 0:
+        # если уже есть фильмы — не сидим повторно (с force — дописываем)
+        if not force and db.execute(select(func.count()).select_from(Movie)).scalar_one() > 0:
             print("Seed: movies already exist, skip")
             return
 
-        # Reference data
-        genres = [
-            "Action",
-            "Comedy",
-            "Drama",
-            "Thriller",
-            "Sci-Fi",
-            "Fantasy",
-            "Animation",
-            "Adventure",
-            "Mystery",
-            "Crime",
-        ]
-        countries = ["USA", "UK", "France", "Japan", "Germany", "Canada", "South Korea", "Spain"]
-        persons = [
-            "Christopher Nolan",
-            "Leonardo DiCaprio",
-            "Keanu Reeves",
-            "Hayao Miyazaki",
-            "Greta Gerwig",
-            "Denis Villeneuve",
-            "Bong Joon-ho",
-            "Natalie Portman",
-            "Brad Pitt",
-            "Tilda Swinton",
-        ]
-
-        genre_objs = [get_or_create(db, Genre, name=g) for g in genres]
-        country_objs = [get_or_create(db, Country, name=c) for c in countries]
-        person_objs = [get_or_create(db, Person, full_name=p) for p in persons]
-
-        # Movies (50 items, deterministic)
-        import random
-
-        random.seed(42)
-
-        curated = [
-            {
-                "title": "Inception",
-                "description": "A thief steals secrets through dream-sharing technology.",
-                "year": 2010,
-                "rating": 8.8,
-                "genres": ["Sci-Fi", "Thriller"],
-                "countries": ["USA", "UK"],
-                "persons": ["Christopher Nolan", "Leonardo DiCaprio"],
-            },
-            {
-                "title": "The Matrix",
-                "description": "A hacker discovers the world is a simulation.",
-                "year": 1999,
-                "rating": 8.7,
-                "genres": ["Action", "Sci-Fi"],
-                "countries": ["USA"],
-                "persons": ["Keanu Reeves"],
-            },
-            {
-                "title": "Spirited Away",
-                "description": "A girl navigates a mysterious spirit world.",
-                "year": 2001,
-                "rating": 8.6,
-                "genres": ["Animation", "Fantasy", "Adventure"],
-                "countries": ["Japan"],
-                "persons": ["Hayao Miyazaki"],
-            },
-        ]
-
-        title_bases = [
-            "Midnight Protocol",
-            "Neon Harbor",
-            "Glass Horizon",
-            "Silent Meridian",
-            "Crimson Circuit",
-            "Paper Sky",
-            "Echoes of Tomorrow",
-            "Velvet Storm",
-            "Shadow Atlas",
-            "Last Train North",
-            "The Fourth Door",
-            "Moonlit Archive",
-            "Winter Signal",
-            "City of Ash",
-            "Astra Run",
-            "Hidden Orchard",
-            "Terminal Bloom",
-            "Kite & Stone",
-            "Wild Card",
-            "The Long Detour",
-        ]
-
-        movies: list[Movie] = []
-
-        # Add curated first
-        for item in curated:
-            m = Movie(
-                title=item["title"],
-                description=item["description"],
-                release_year=item["year"],
-                rating=item["rating"],
-            )
-            m.genres = [get_or_create(db, Genre, name=g) for g in item["genres"]]
-            m.countries = [get_or_create(db, Country, name=c) for c in item["countries"]]
-            m.persons = [get_or_create(db, Person, full_name=p) for p in item["persons"]]
-            movies.append(m)
-
-        # Generate the rest
-        target_total = 50
-        while len(movies) < target_total:
-            base = random.choice(title_bases)
-            suffix = f" #{len(movies)+1:02d}"
-            title = base + suffix
-            year = random.randint(1985, 2025)
-            rating = round(random.uniform(5.5, 9.1), 1)
-
-            g_count = random.randint(1, 3)
-            c_count = random.randint(1, 2)
-            p_count = random.randint(1, 3)
-
-            m = Movie(
-                title=title,
-                description=f"{base}: a story of choices, consequences, and unexpected turns.",
-                release_year=year,
-                rating=rating,
-            )
-            m.genres = [get_or_create(db, Genre, name=g) for g in random.sample(genres, k=g_count)]
-            m.countries = [get_or_create(db, Country, name=c) for c in random.sample(countries, k=c_count)]
-            m.persons = [get_or_create(db, Person, full_name=p) for p in random.sample(persons, k=p_count)]
-            movies.append(m)
-
-        db.add_all(movies)
-        db.commit()
-        print("Seed: done")
+        progress = (lambda n: print(f"\rSeed: {n}/{size}", end="", flush=True)) if size > chunk_size else None
+        report = seed_movies(db, size, random_seed=random_seed, chunk_size=chunk_size, progress=progress)
+        if progress:
+            print()
+        print(f"Seed: done {report}")
     finally:
         db.close()
 
 
+def main() -> None:
+    parser = argparse.ArgumentParser(description="Наполнить БД демо-данными")
+    parser.add_argument("--size", type=int, default=50, help="сколько фильмов добавить")
+    parser.add_argument("--seed", type=int, default=42, help="seed генератора (один seed — один каталог)")
+    parser.add_argument("--chunk-size", type=int, default=10_000, help="фильмов в пачке (и транзакции)")
+    parser.add_argument("--force", action="store_true", help="дописать, даже если фильмы уже есть")
+    args = parser.parse_args()
+    seed(args.size, args.seed, args.chunk_size, args.force)
+
+
 if __name__ == "__main__":
-    seed()
+    main()
@@ -0,0 +1 @@
+"""Микробенчмарки backend (запуск: python -m benchmarks.<имя> из каталога backend)."""
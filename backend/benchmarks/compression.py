@@ -0,0 +1,59 @@
+"""Сжатие типичных ответов /api/movies: размер против CPU для gzip и brotli.
+
+Тело строится тем же путём, что и в API (list_movies(as_rows=True) + orjson),
+для страниц разного размера и с facets.
+
+    python -m benchmarks.compression --movies 20000 --repeat 200
+"""
+
+import argparse
+import statistics
+import time
+
+from app.api.routers.movies import _list_body
+from app.core.compression import Compressor
+from benchmarks.serialization import LIST_PARAMS, make_session
+from app.crud.movies import list_movies
+
+LEVELS = [("gzip", 1), ("gzip", 6), ("gzip", 9), ("br", 1), ("br", 4), ("br", 11)]
+
+
+def payload(db, size: int, facets: tuple[str, ...] | None = None) -> bytes:
+    params = {**LIST_PARAMS, "total_mode": "exact", "facets": facets}
+    result = list_movies(db, size=size, as_rows=True, **params)
+    return _list_body({**result, "page": 1, "size": size})
+
+
+def compress(body: bytes, encoding: str, level: int) -> bytes:
+    return Compressor(encoding, gzip_level=level, brotli_quality=level).finish(body)
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument("--movies", type=int, default=20000)
+    parser.add_argument("--repeat", type=int, default=200)
+    args = parser.parse_args()
+
+    db = make_session(args.movies)
+    bodies = {
+        "size=20": payload(db, 20),
+        "size=100": payload(db, 100),
+        "size=100+facets": payload(db, 100, ("decades", "ratings")),
+    }
+    print(f"{'payload':>16} {'encoding':>9} {'bytes':>8} {'ratio':>6} {'median us':>10}")
+    for name, body in bodies.items():
+        print(f"{name:>16} {'identity':>9} {len(body):>8} {1:>6.2f} {0:>10}")
+        for encoding, level in LEVELS:
+            timings = []
+            for _ in range(args.repeat):
+                started = time.perf_counter()
+                compressed = compress(body, encoding, level)
+                timings.append((time.perf_counter() - started) * 1e6)
+            print(
+                f"{'':>16} {f'{encoding}-{level}':>9} {len(compressed):>8} "
+                f"{len(body) / len(compressed):>6.2f} {statistics.median(timings):>10.0f}"
+            )
+
+
+if __name__ == "__main__":
+    main()
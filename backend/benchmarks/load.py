@@ -0,0 +1,457 @@
+"""Нагрузочный прогон API каталога: смесь сценариев, перцентили, JSON-отчёт.
+
+Каждый из --concurrency воркеров в цикле выбирает сценарий по весам смеси
+(--mix) и делает один запрос; латентность — от отправки до последнего байта
+тела. Первые --warmup секунд не учитываются. Отчёт — JSON с p50/p95/p99,
+средним, максимумом и RPS по каждому сценарию и в целом; с --baseline к
+каждой цифре добавляется отношение к прошлому отчёту, а при росте p95 сверх
+--max-regression процесс завершается с кодом 1 (удобно в CI).
+
+    python -m app.seed --size 1000000 --force
+    python -m benchmarks.load --base-url http://localhost:8000 --mix read \\
+        --concurrency 32 --duration 60 --out load.json --baseline load-main.json
+
+Без --base-url приложение поднимается в этом же процессе (httpx.ASGITransport)
+поверх DATABASE_URL — без сети и uvicorn, для быстрых сравнений коммитов.
+"""
+
+import argparse
+import asyncio
+import datetime
+import json
+import random
+import subprocess
+import sys
+import time
+from collections.abc import Callable
+from dataclasses import dataclass, field
+
+import httpx
+
+# (метод, путь, query-параметры, JSON-тело)
+Request = tuple[str, str, dict | list | None, dict | None]
+
+
+@dataclass
+class Context:
+    """То, из чего сценарии собирают запросы: реальные id из каталога."""
+
+    genre_ids: list[int]
+    country_ids: list[int]
+    person_ids: list[int]
+    movie_ids: list[int]
+    total: int
+    title_words: list[str]
+    created_ids: list[int] = field(default_factory=list)
+
+
+def _page_count(ctx: Context, size: int) -> int:
+    return max(1, ctx.total // size)
+
+
+def list_unfiltered(ctx: Context, rnd: random.Random) -> Request:
+    return "GET", "/api/movies", {"sort": rnd.choice(("title", "-rating", "-year")), "size": 20}, None
+
+
+def list_genre(ctx: Context, rnd: random.Random) -> Request:
+    params = {"genre_id": rnd.choice(ctx.genre_ids), "sort": "-rating", "page": rnd.randint(1, 5), "size": 20}
+    return "GET", "/api/movies", params, None
+
+
+def list_multi_filter(ctx: Context, rnd: random.Random) -> Request:
+    year = rnd.randint(1960, 2020)
+    params = [
+        ("genre_id", rnd.choice(ctx.genre_ids)),
+        ("genre_id", rnd.choice(ctx.genre_ids)),
+        ("country_id", rnd.choice(ctx.country_ids)),
+        ("year_from", year),
+        ("year_to", year + 10),
+        ("rating_from", rnd.choice((5, 6, 7))),
+        ("sort", "-rating"),
+        ("facets", "genres,decades"),
+    ]
+    return "GET", "/api/movies", params, None
+
+
+def list_person(ctx: Context, rnd: random.Random) -> Request:
+    # первые персоны — "звёзды" с тысячами фильмов, хвост — с единицами
+    person_id = ctx.person_ids[min(int(rnd.paretovariate(1.2)) - 1, len(ctx.person_ids) - 1)]
+    return "GET", "/api/movies", {"person_id": person_id, "sort": "-year"}, None
+
+
+def list_deep_page(ctx: Context, rnd: random.Random) -> Request:
+    page = rnd.randint(1, min(_page_count(ctx, 100), 500))
+    return "GET", "/api/movies", {"sort": "title", "page": page, "size": 100, "total_mode": "estimate"}, None
+
+
+def list_cursor(ctx: Context, rnd: random.Random) -> Request:
+    # первая страница keyset-обхода; продолжение — в воркере по next_cursor
+    return "GET", "/api/movies", {"sort": "-rating", "size": 50, "total_mode": "none"}, None
+
+
+def list_search(ctx: Context, rnd: random.Random) -> Request:
+    return "GET", "/api/movies", {"q": rnd.choice(ctx.title_words), "size": 20}, None
+
+
+def list_fulltext(ctx: Context, rnd: random.Random) -> Request:
+    params = {"q": rnd.choice(ctx.title_words), "search_mode": "fulltext", "sort": "relevance"}
+    return "GET", "/api/movies", params, None
+
+
+def detail(ctx: Context, rnd: random.Random) -> Request:
+    return "GET", f"/api/movies/{rnd.choice(ctx.movie_ids)}", None, None
+
+
+def batch(ctx: Context, rnd: random.Random) -> Request:
+    ids = rnd.sample(ctx.movie_ids, k=min(20, len(ctx.movie_ids)))
+    return "GET", "/api/movies/batch", {"ids": ",".join(map(str, ids))}, None
+
+
+def admin_create(ctx: Context, rnd: random.Random) -> Request:
+    body = {
+        "title": f"Load test {rnd.getrandbits(48):x}",
+        "release_year": rnd.randint(1950, 2025),
+        "rating": round(rnd.uniform(1, 10), 1),
+        "genre_ids": rnd.sample(ctx.genre_ids, k=2),
+        "country_ids": [rnd.choice(ctx.country_ids)],
+        "person_ids": rnd.sample(ctx.person_ids, k=min(4, len(ctx.person_ids))),
+    }
+    return "POST", "/api/admin/movies", None, body
+
+
+def admin_update(ctx: Context, rnd: random.Random) -> Request:
+    # правим только фильмы, созданные прогоном, чтобы не портить каталог
+    if not ctx.created_ids:
+        return admin_create(ctx, rnd)
+    body = {"rating": round(rnd.uniform(1, 10), 1), "genre_ids": rnd.sample(ctx.genre_ids, k=2)}
+    return "PUT", f"/api/admin/movies/{rnd.choice(ctx.created_ids)}", None, body
+
+
+SCENARIOS: dict[str, Callable[[Context, random.Random], Request]] = {
+    fn.__name__: fn
+    for fn in (
+        list_unfiltered,
+        list_genre,
+        list_multi_filter,
+        list_person,
+        list_deep_page,
+        list_cursor,
+        list_search,
+        list_fulltext,
+        detail,
+        batch,
+        admin_create,
+        admin_update,
+    )
+}
+
+# веса сценариев; read — витрина, mixed — витрина + редкие правки админки
+MIXES: dict[str, dict[str, int]] = {
+    "read": {
+        "list_unfiltered": 15,
+        "list_genre": 20,
+        "list_multi_filter": 10,
+        "list_person": 5,
+        "list_deep_page": 5,
+        "list_cursor": 5,
+        "list_search": 5,
+        "list_fulltext": 5,
+        "detail": 25,
+        "batch": 5,
+    },
+    "mixed": {
+        "list_unfiltered": 15,
+        "list_genre": 20,
+        "list_multi_filter": 10,
+        "list_person": 5,
+        "list_deep_page": 5,
+        "list_cursor": 5,
+        "list_search": 5,
+        "detail": 25,
+        "batch": 5,
+        "admin_create": 2,
+        "admin_update": 3,
+    },
+    "write": {"admin_create": 1, "admin_update": 1},
+}
+
+
+def percentile(sorted_values: list[float], p: float) -> float:
+    """Перцентиль с линейной интерполяцией (как numpy.percentile по умолчанию)."""
+    if not sorted_values:
+        return 0.0
+    k = (len(sorted_values) - 1) * p / 100
+    lo = int(k)
+    hi = min(lo + 1, len(sorted_values) - 1)
+    return sorted_values[lo] + (sorted_values[hi] - sorted_values[lo]) * (k - lo)
+
+
+def summarize(latencies: list[float], errors: int, seconds: float) -> dict:
+    """Сводка по латентностям в секундах -> миллисекунды."""
+    values = sorted(latencies)
+    ms = lambda v: round(v * 1000, 3)  # noqa: E731
+    return {
+        "count": len(values),
+        "errors": errors,
+        "rps": round(len(values) / seconds, 2) if seconds else 0.0,
+        "p50_ms": ms(percentile(values, 50)),
+        "p95_ms": ms(percentile(values, 95)),
+        "p99_ms": ms(percentile(values, 99)),
+        "mean_ms": ms(sum(values) / len(values)) if values else 0.0,
+        "max_ms": ms(values[-1]) if values else 0.0,
+    }
+
+
+async def load_context(client: httpx.AsyncClient, sample: int = 2000) -> Context:
+    async def items(path: str, **params) -> list[dict]:
+        response = await client.get(path, params=params)
+        response.raise_for_status()
+        data = response.json()
+        return data["items"] if isinstance(data, dict) else data
+
+    genres = await items("/api/genres")
+    countries = await items("/api/countries")
+    persons = await items("/api/persons", size=100)
+    response = await client.get("/api/movies", params={"size": 1, "total_mode": "estimate"})
+    response.raise_for_status()
+    total = response.json()["total"] or 0
+
+    # выборка id фильмов: несколько случайных страниц по 100
+    movies: list[dict] = []
+    rnd = random.Random(0)
+    for _ in range(max(1, sample // 100)):
+        page = rnd.randint(1, max(1, total // 100))
+        movies.extend(await items("/api/movies", sort="title", page=page, size=100, total_mode="none"))
+    if not (genres and countries and persons and movies):
+        raise SystemExit("catalog is empty: run python -m app.seed --size N first")
+
+    words = {word for movie in movies for word in movie["title"].split() if word.isalpha() and len(word) > 3}
+    return Context(
+        genre_ids=[g["id"] for g in genres],
+        country_ids=[c["id"] for c in countries],
+        person_ids=[p["id"] for p in persons],
+        movie_ids=sorted({m["id"] for m in movies}),
+        total=total,
+        title_words=sorted(words) or ["the"],
+    )
+
+
+@dataclass
+class _Stats:
+    latencies: dict[str, list[float]] = field(default_factory=dict)
+    errors: dict[str, int] = field(default_factory=dict)
+    statuses: dict[str, dict[int, int]] = field(default_factory=dict)
+
+
+async def _send(client: httpx.AsyncClient, req: Request) -> httpx.Response:
+    method, path, params, body = req
+    return await client.request(method, path, params=params, json=body)
+
+
+async def _worker(
+    client: httpx.AsyncClient,
+    ctx: Context,
+    mix: dict[str, int],
+    rnd: random.Random,
+    stats: _Stats,
+    *,
+    measure_from: float,
+    deadline: float,
+    budget: list[int],
+) -> None:
+    names, weights = list(mix), list(mix.values())
+    while time.perf_counter() < deadline and budget[0] != 0:
+        budget[0] -= 1
+        name = rnd.choices(names, weights)[0]
+        req = SCENARIOS[name](ctx, rnd)
+        started = time.perf_counter()
+        try:
+            response = await _send(client, req)
+            ok = response.status_code < 400
+            status = response.status_code
+        except httpx.HTTPError:
+            ok, status = False, 0
+        elapsed = time.perf_counter() - started
+
+        if ok and name == "admin_create":
+            ctx.created_ids.append(response.json()["id"])
+        if ok and name == "list_cursor":
+            # дочитываем ещё пару страниц keyset-обхода — они и интересны
+            cursor = response.json().get("next_cursor")
+            for _ in range(2):
+                if not cursor:
+                    break
+                params = {"sort": "-rating", "size": 50, "total_mode": "none", "cursor": cursor}
+                page_started = time.perf_counter()
+                response = await client.get("/api/movies", params=params)
+                elapsed += time.perf_counter() - page_started
+                ok = response.status_code < 400
+                cursor = response.json().get("next_cursor") if ok else None
+
+        if started < measure_from:
+            continue
+        stats.statuses.setdefault(name, {}).setdefault(status, 0)
+        stats.statuses[name][status] += 1
+        if ok:
+            stats.latencies.setdefault(name, []).append(elapsed)
+        else:
+            stats.errors[name] = stats.errors.get(name, 0) + 1
+
+
+async def run_load(
+    client: httpx.AsyncClient,
+    *,
+    mix: str = "read",
+    concurrency: int = 8,
+    duration: float = 30.0,
+    warmup: float = 5.0,
+    requests: int | None = None,
+    seed: int = 0,
+    ctx: Context | None = None,
+) -> dict:
+    """Прогнать смесь сценариев и вернуть сводку (без meta)."""
+    ctx = ctx or await load_context(client)
+    stats = _Stats()
+    started = time.perf_counter()
+    measure_from = started + warmup
+    deadline = measure_from + duration if requests is None else float("inf")
+    # общий счётчик оставшихся запросов (-1 — без ограничения); прогрев в него не входит
+    budget = [-1 if requests is None else requests]
+    if requests is not None:
+        measure_from = started
+    await asyncio.gather(
+        *(
+            _worker(
+                client,
+                ctx,
+                MIXES[mix],
+                random.Random(seed * 1000 + i),
+                stats,
+                measure_from=measure_from,
+                deadline=deadline,
+                budget=budget,
+            )
+            for i in range(concurrency)
+        )
+    )
+    measured = time.perf_counter() - max(measure_from, started)
+
+    scenarios = {
+        name: {**summarize(stats.latencies.get(name, []), stats.errors.get(name, 0), measured), "statuses": statuses}
+        for name, statuses in sorted(stats.statuses.items())
+    }
+    overall = summarize(
+        [v for values in stats.latencies.values() for v in values], sum(stats.errors.values()), measured
+    )
+    return {"overall": overall, "scenarios": scenarios, "catalog": {"movies": ctx.total}}
+
+
+def compare(report: dict, baseline: dict) -> dict:
+    """Отношения new/baseline для латентностей и RPS (1.10 — на 10% больше)."""
+    keys = ("rps", "p50_ms", "p95_ms", "p99_ms", "mean_ms")
+
+    def ratios(new: dict, old: dict | None) -> dict:
+        if not old:
+            return {}
+        return {k: round(new[k] / old[k], 3) for k in keys if old.get(k)}
+
+    return {
+        "baseline_commit": baseline.get("meta", {}).get("git_commit"),
+        "overall": ratios(report["overall"], baseline.get("overall")),
+        "scenarios": {
+            name: ratios(stats, baseline.get("scenarios", {}).get(name))
+            for name, stats in report["scenarios"].items()
+        },
+    }
+
+
+def _git_commit() -> str | None:
+    try:
+        return subprocess.run(
+            ["git", "rev-parse", "--short", "HEAD"], capture_output=True, text=True, check=True
+        ).stdout.strip()
+    except (OSError, subprocess.CalledProcessError):
+        return None
+
+
+async def _main(args) -> dict:
+    headers = {"X-Admin-Token": args.admin_token} if args.admin_token else {}
+    limits = httpx.Limits(max_connections=args.concurrency, max_keepalive_connections=args.concurrency)
+    if args.base_url:
+        transport, base_url = httpx.AsyncHTTPTransport(limits=limits), args.base_url
+    else:
+        from app.main import app
+
+        transport, base_url = httpx.ASGITransport(app=app), "http://load"
+    async with httpx.AsyncClient(transport=transport, base_url=base_url, headers=headers, timeout=60) as client:
+        return await run_load(
+            client,
+            mix=args.mix,
+            concurrency=args.concurrency,
+            duration=args.duration,
+            warmup=args.warmup,
+            requests=args.requests,
+            seed=args.seed,
+        )
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument("--base-url", help="адрес запущенного API; без него — приложение в процессе")
+    parser.add_argument("--mix", choices=sorted(MIXES), default="read")
+    parser.add_argument("--concurrency", type=int, default=8)
+    parser.add_argument("--duration", type=float, default=30.0, help="секунд замера после прогрева")
+    parser.add_argument("--warmup", type=float, default=5.0)
+    parser.add_argument("--requests", type=int, help="вместо --duration: ровно столько запросов, без прогрева")
+    parser.add_argument("--seed", type=int, default=0)
+    parser.add_argument("--admin-token", help="X-Admin-Token для смесей с записью")
+    parser.add_argument("--out", help="куда записать JSON-отчёт (по умолчанию stdout)")
+    parser.add_argument("--baseline", help="JSON-отчёт прошлого прогона для сравнения")
+    parser.add_argument(
+        "--max-regression", type=float, default=None, help="допустимый рост p95, например 0.1 — 10%%"
+    )
+    args = parser.parse_args()
+    if args.mix != "read" and not args.admin_token:
+        parser.error(f"--mix {args.mix} needs --admin-token")
+
+    report = asyncio.run(_main(args))
+    report = {
+        "meta": {
+            "git_commit": _git_commit(),
+            "timestamp": datetime.datetime.now(datetime.timezone.utc).isoformat(timespec="seconds"),
+            "target": args.base_url or "in-process",
+            "mix": args.mix,
+            "concurrency": args.concurrency,
+            "duration": args.duration,
+            "warmup": args.warmup,
+            "requests": args.requests,
+            "seed": args.seed,
+        },
+        **report,
+    }
+
+    regressed = []
+    if args.baseline:
+        with open(args.baseline) as f:
+            report["compare"] = compare(report, json.load(f))
+        if args.max_regression is not None:
+            regressed = [
+                name
+                for name, ratios in [("overall", report["compare"]["overall"]), *report["compare"]["scenarios"].items()]
+                if ratios.get("p95_ms", 0) > 1 + args.max_regression
+            ]
+            report["compare"]["regressed"] = regressed
+
+    text = json.dumps(report, indent=2, ensure_ascii=False)
+    if args.out:
+        with open(args.out, "w") as f:
+            f.write(text + "\n")
+    else:
+        print(text)
+    if regressed:
+        print(f"p95 regression over {args.max_regression:.0%}: {', '.join(regressed)}", file=sys.stderr)
+        sys.exit(1)
+
+
+if __name__ == "__main__":
+    main()
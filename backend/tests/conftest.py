@@ -8,7 +8,8 @@ from sqlalchemy import create_engine
 from sqlalchemy.orm import Session, sessionmaker
 from sqlalchemy.pool import StaticPool, NullPool
 
-from app.core.db import get_db
+from app.core.cache import all_caches
+from app.core.db import get_db, get_read_db
 from app.main import app
 from app.models.base import Base
 
@@ -30,6 +31,14 @@ def _make_engine():
     )
 
 
+@pytest.fixture(autouse=True)
+def _clear_caches():
+    # данные откатываются после каждого теста — кэши тоже не должны переживать тест
+    for cache in all_caches().values():
+        cache.clear()
+    yield
+
+
 @pytest.fixture(scope="session")
 def db_engine():
     engine = _make_engine()
@@ -63,6 +72,7 @@ def client(db_session: Session) -> Generator[TestClient, None, None]:
 
     original_overrides = app.dependency_overrides.copy()
     app.dependency_overrides[get_db] = override_get_db
+    app.dependency_overrides[get_read_db] = override_get_db
 
     with TestClient(app) as c:
         yield c
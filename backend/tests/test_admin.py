@@ -0,0 +1,287 @@
+import json
+
+import pytest
+from sqlalchemy import event
+
+from app.core.config import settings
+
+ADMIN_HEADERS = {"X-Admin-Token": "test-token"}
+
+
+@pytest.fixture(autouse=True)
+def _admin_token(monkeypatch):
+    monkeypatch.setattr(settings, "admin_token", "test-token")
+
+
+def _ndjson(rows) -> bytes:
+    return "\n".join(r if isinstance(r, str) else json.dumps(r) for r in rows).encode()
+
+
+def test_admin_requires_token(client, seeded):
+    r = client.post("/api/admin/movies", json={"title": "Tenet"})
+    assert r.status_code == 401
+
+
+def test_bulk_import_inserts_movies_with_relations(client, seeded):
+    drama_id = seeded["genres"]["drama"].id
+    nolan_id = seeded["persons"]["nolan"].id
+    rows = [
+        {"title": f"Film {i}", "release_year": 2000 + i, "genre_ids": [drama_id], "person_ids": [nolan_id, nolan_id]}
+        for i in range(5)
+    ]
+    r = client.post(
+        "/api/admin/movies:bulk",
+        params={"chunk_size": 2},
+        content=_ndjson(rows),
+        headers={**ADMIN_HEADERS, "Content-Type": "application/x-ndjson"},
+    )
+    assert r.status_code == 200
+    assert r.json() == {"processed": 5, "inserted": 5, "failed": 0, "errors": [], "errors_truncated": False}
+
+    r = client.get("/api/movies", params={"genre_id": [drama_id], "person_id": [nolan_id]})
+    assert r.json()["total"] == 7
+
+
+def test_bulk_import_reports_bad_rows_and_keeps_good_ones(client, seeded):
+    drama_id = seeded["genres"]["drama"].id
+    rows = [
+        {"title": "Good", "genre_ids": [drama_id]},
+        "{not json",
+        {"title": ""},
+        {"title": "Unknown genre", "genre_ids": [drama_id, 999999]},
+        "",
+        {"title": "Also good"},
+    ]
+    r = client.post("/api/admin/movies:bulk", content=_ndjson(rows), headers=ADMIN_HEADERS)
+    assert r.status_code == 200
+    report = r.json()
+    assert report["processed"] == 5
+    assert report["inserted"] == 2
+    assert report["failed"] == 3
+    assert [e["line"] for e in report["errors"]] == [2, 3, 4]
+    assert "999999" in report["errors"][2]["error"]
+    assert client.get("/api/movies").json()["total"] == 4
+
+
+@pytest.mark.parametrize("batch_size", [1, 1000])
+def test_export_ndjson_streams_all_movies_with_link_ids(client, seeded, monkeypatch, batch_size):
+    monkeypatch.setattr(settings, "export_batch_size", batch_size)
+    r = client.get("/api/admin/export", params={"format": "ndjson"}, headers=ADMIN_HEADERS)
+    assert r.status_code == 200
+    assert r.headers["content-type"].startswith("application/x-ndjson")
+    rows = [json.loads(line) for line in r.text.splitlines()]
+    assert [row["title"] for row in rows] == ["Inception", "Memento"]
+    inception = rows[0]
+    assert sorted(inception["genre_ids"]) == sorted(g.id for g in seeded["genres"].values())
+    assert len(inception["person_ids"]) == 2
+    assert rows[1]["country_ids"] == [seeded["countries"]["usa"].id]
+
+
+def test_export_csv(client, seeded):
+    import csv
+    import io
+
+    r = client.get("/api/admin/export", params={"format": "csv"}, headers=ADMIN_HEADERS)
+    assert r.status_code == 200
+    rows = list(csv.DictReader(io.StringIO(r.text)))
+    assert [row["title"] for row in rows] == ["Inception", "Memento"]
+    assert rows[1]["person_ids"] == str(seeded["persons"]["nolan"].id)
+
+
+def _link_statements(db_session, fn):
+    """INSERT/DELETE по таблицам связей, выполненные внутри fn()."""
+    executed = []
+
+    def before_execute(conn, cursor, statement, parameters, context, executemany):
+        if statement.startswith(("INSERT INTO movie_", "DELETE FROM movie_")) and "movie_search" not in statement:
+            executed.append(statement.split(" (")[0].split(" WHERE")[0])
+
+    engine = db_session.get_bind().engine
+    event.listen(engine, "before_cursor_execute", before_execute)
+    try:
+        response = fn()
+    finally:
+        event.remove(engine, "before_cursor_execute", before_execute)
+    return response, executed
+
+
+def test_update_touches_only_changed_links(client, db_session, seeded):
+    inception_id = seeded["movies"]["inception"].id
+    nolan_id = seeded["persons"]["nolan"].id
+    dicaprio_id = seeded["persons"]["dicaprio"].id
+    drama_id = seeded["genres"]["drama"].id
+    action_id = seeded["genres"]["action"].id
+
+    # персоны те же (в другом порядке), из жанров уходит один
+    r, executed = _link_statements(
+        db_session,
+        lambda: client.put(
+            f"/api/admin/movies/{inception_id}",
+            json={"person_ids": [dicaprio_id, nolan_id], "genre_ids": [drama_id]},
+            headers=ADMIN_HEADERS,
+        ),
+    )
+    assert r.status_code == 200
+    assert executed == ["DELETE FROM movie_genre"]
+    assert [g["id"] for g in r.json()["genres"]] == [drama_id]
+
+    r, executed = _link_statements(
+        db_session,
+        lambda: client.put(
+            f"/api/admin/movies/{inception_id}", json={"genre_ids": [drama_id, action_id]}, headers=ADMIN_HEADERS
+        ),
+    )
+    assert executed == ["INSERT INTO movie_genre"]
+    assert sorted(g["id"] for g in r.json()["genres"]) == sorted([drama_id, action_id])
+
+
+def test_patch_adds_and_removes_links(client, seeded):
+    inception = seeded["movies"]["inception"]
+    nolan_id = seeded["persons"]["nolan"].id
+    dicaprio_id = seeded["persons"]["dicaprio"].id
+    usa_id = seeded["countries"]["usa"].id
+    version = client.get(f"/api/movies/{inception.id}").headers["ETag"]
+
+    r = client.patch(
+        f"/api/admin/movies/{inception.id}",
+        json={
+            "rating": 9.0,
+            "person_ids": {"remove": [dicaprio_id, 424242]},
+            "country_ids": {"add": [usa_id, usa_id]},
+        },
+        headers=ADMIN_HEADERS,
+    )
+    assert r.status_code == 200
+    movie = r.json()
+    assert movie["rating"] == 9.0
+    assert [p["id"] for p in movie["persons"]] == [nolan_id]
+    assert len(movie["countries"]) == 2  # usa уже была — не дублируется
+    assert len(movie["genres"]) == 2  # не переданы — не тронуты
+    assert client.get(f"/api/movies/{inception.id}").headers["ETag"] != version
+
+    r = client.patch(
+        f"/api/admin/movies/{inception.id}", json={"person_ids": {"add": [dicaprio_id]}}, headers=ADMIN_HEADERS
+    )
+    assert sorted(p["id"] for p in r.json()["persons"]) == sorted([nolan_id, dicaprio_id])
+
+
+def test_patch_rejects_unknown_and_conflicting_ids(client, seeded):
+    inception_id = seeded["movies"]["inception"].id
+    nolan_id = seeded["persons"]["nolan"].id
+
+    r = client.patch(
+        f"/api/admin/movies/{inception_id}", json={"genre_ids": {"add": [999999]}}, headers=ADMIN_HEADERS
+    )
+    assert r.status_code == 400
+    assert r.json()["detail"] == "Unknown genre_ids: [999999]"
+
+    r = client.patch(
+        f"/api/admin/movies/{inception_id}",
+        json={"person_ids": {"add": [nolan_id], "remove": [nolan_id]}},
+        headers=ADMIN_HEADERS,
+    )
+    assert r.status_code == 422
+
+    r = client.patch("/api/admin/movies/999999", json={"rating": 5}, headers=ADMIN_HEADERS)
+    assert r.status_code == 404
+
+
+def test_batch_applies_operations_and_reports_each(client, seeded):
+    drama_id = seeded["genres"]["drama"].id
+    inception_id = seeded["movies"]["inception"].id
+    memento_id = seeded["movies"]["memento"].id
+    etag = client.get("/api/movies").headers["ETag"]
+
+    operations = [
+        {"op": "create", "movie": {"title": "Tenet", "genre_ids": [drama_id]}},
+        {"op": "update", "id": inception_id, "movie": {"rating": 9.1}},
+        {"op": "create", "movie": {"title": "Bad", "genre_ids": [999999]}},
+        {"op": "patch", "id": inception_id, "movie": {"genre_ids": {"remove": [drama_id]}}},
+        {"op": "delete", "id": memento_id},
+        {"op": "delete", "id": 999999},
+    ]
+    r = client.post(
+        "/api/admin/movies:batch", params={"chunk_size": 2}, json={"operations": operations}, headers=ADMIN_HEADERS
+    )
+    assert r.status_code == 200
+    report = r.json()
+    assert (report["processed"], report["succeeded"], report["failed"], report["committed"]) == (6, 4, 2, True)
+    results = report["results"]
+    assert [res["status"] for res in results] == [201, 200, 400, 200, 204, 404]
+    assert results[1]["version"] == 2 and results[3]["version"] == 3
+    assert results[2]["error"] == "Unknown genre_ids: [999999]"
+    tenet_id = results[0]["id"]
+
+    r = client.get("/api/movies", params={"sort": "title"}, headers={"If-None-Match": etag})
+    assert r.status_code == 200
+    assert [m["title"] for m in r.json()["items"]] == ["Inception", "Tenet"]
+    inception = client.get(f"/api/movies/{inception_id}").json()
+    assert inception["rating"] == 9.1
+    assert drama_id not in [g["id"] for g in inception["genres"]]
+    assert [g["id"] for g in client.get(f"/api/movies/{tenet_id}").json()["genres"]] == [drama_id]
+
+
+def test_batch_atomic_rolls_back_everything_on_error(client, seeded):
+    inception_id = seeded["movies"]["inception"].id
+    operations = [
+        {"op": "update", "id": inception_id, "movie": {"title": "Renamed"}},
+        {"op": "delete", "id": 999999},
+        {"op": "create", "movie": {"title": "Never"}},
+    ]
+    r = client.post(
+        "/api/admin/movies:batch", params={"atomic": True}, json={"operations": operations}, headers=ADMIN_HEADERS
+    )
+    assert r.status_code == 200
+    report = r.json()
+    assert report["committed"] is False
+    assert report["processed"] == 2 and report["failed"] == 1
+    assert report["results"][-1]["status"] == 404
+
+    assert client.get(f"/api/movies/{inception_id}").json()["title"] == "Inception"
+    assert client.get("/api/movies").json()["total"] == 2
+
+
+def test_batch_commits_every_chunk_size_operations(db_session, seeded, monkeypatch):
+    from app.crud import batch
+    from app.schemas.movie import MovieMutationBatch
+
+    commits = []
+    commit = batch._commit
+    monkeypatch.setattr(batch, "_commit", lambda db, ids: (commits.append(list(ids)), commit(db, ids)))
+
+    # успешные и ошибочные вперемешку: граница пачки считается по всем операциям
+    operations = []
+    for i in range(3):
+        operations += [{"op": "create", "movie": {"title": f"Film {i}"}}, {"op": "delete", "id": 999999}]
+    ops = MovieMutationBatch.model_validate({"operations": operations}).operations
+    report = batch.apply_movie_batch(db_session, ops, chunk_size=2)
+
+    assert (report["succeeded"], report["failed"]) == (3, 3)
+    created = [res["id"] for res in report["results"] if res["status"] == 201]
+    assert commits == [[created[0]], [created[1]], [created[2]], []]
+
+
+def test_batch_validates_operations(client, seeded):
+    r = client.post("/api/admin/movies:batch", json={"operations": []}, headers=ADMIN_HEADERS)
+    assert r.status_code == 422
+    r = client.post("/api/admin/movies:batch", json={"operations": [{"op": "rename", "id": 1}]}, headers=ADMIN_HEADERS)
+    assert r.status_code == 422
+
+
+def test_version_is_incremented_in_sql(db_session, seeded):
+    from sqlalchemy import update
+
+    from app.crud.movies import patch_movie, update_movie
+    from app.models.movie import Movie
+
+    inception = seeded["movies"]["inception"]
+    assert inception.version == 1
+    # параллельная правка: версия в БД растёт мимо identity map сессии
+    db_session.connection().execute(
+        update(Movie.__table__).where(Movie.id == inception.id).values(version=Movie.version + 1)
+    )
+    fields = dict(title=None, description=None, release_year=None, rating=8.9)
+    movie = update_movie(db_session, inception.id, **fields, genre_ids=None, country_ids=None, person_ids=None)
+    assert movie.version == 3
+    movie = patch_movie(db_session, inception.id, **fields, genre_ids=None, country_ids=None, person_ids=None)
+    assert movie.version == 4
@@ -0,0 +1,93 @@
+"""Те же обработчики поверх AsyncSession (aiosqlite) — режим DB_ASYNC=true."""
+
+from collections.abc import Generator
+
+import pytest
+from fastapi.testclient import TestClient
+from sqlalchemy.ext.asyncio import async_sessionmaker, create_async_engine
+from sqlalchemy.pool import StaticPool
+
+from app.core.config import settings
+from app.core.db import async_database_url, get_db, get_read_db
+from app.main import app
+from app.models.base import Base
+from tests.test_data import seed_reference_data
+
+
+@pytest.fixture()
+def async_client(monkeypatch) -> Generator[tuple[TestClient, dict], None, None]:
+    monkeypatch.setattr(settings, "admin_token", "test-token")
+    engine = create_async_engine(
+        "sqlite+aiosqlite://",
+        connect_args={"check_same_thread": False},
+        poolclass=StaticPool,
+    )
+    AsyncTestingSession = async_sessionmaker(bind=engine, autoflush=False)
+
+    async def override_get_db():
+        async with AsyncTestingSession() as db:
+            yield db
+
+    async def setup():
+        async with engine.begin() as conn:
+            await conn.run_sync(Base.metadata.create_all)
+        async with AsyncTestingSession() as db:
+            data = await db.run_sync(seed_reference_data)
+            return {
+                "drama_id": data["genres"]["drama"].id,
+                "usa_id": data["countries"]["usa"].id,
+                "inception_id": data["movies"]["inception"].id,
+            }
+
+    original_overrides = app.dependency_overrides.copy()
+    app.dependency_overrides[get_db] = override_get_db
+    app.dependency_overrides[get_read_db] = override_get_db
+
+    with TestClient(app) as c:
+        ids = c.portal.call(setup)
+        yield c, ids
+        c.portal.call(engine.dispose)
+
+    app.dependency_overrides = original_overrides
+
+
+def test_async_database_url():
+    assert async_database_url("postgresql+psycopg2://u:p@db:5432/cinema") == "postgresql+asyncpg://u:p@db:5432/cinema"
+    assert async_database_url("sqlite+pysqlite://") == "sqlite+aiosqlite://"
+
+
+def test_async_movies_list_and_details(async_client):
+    client, ids = async_client
+    r = client.get("/api/movies", params={"genre_id": [ids["drama_id"]], "sort": "-rating"})
+    assert r.status_code == 200
+    assert [m["title"] for m in r.json()["items"]] == ["Inception", "Memento"]
+
+    r = client.get(f"/api/movies/{ids['inception_id']}")
+    assert r.status_code == 200
+    assert len(r.json()["genres"]) == 2
+
+
+def test_async_references_list(async_client):
+    client, _ = async_client
+    r = client.get("/api/genres")
+    assert r.status_code == 200
+    assert [g["name"] for g in r.json()["items"]] == ["Action", "Drama"]
+
+
+def test_async_admin_create_and_update_movie(async_client):
+    client, ids = async_client
+    headers = {"X-Admin-Token": "test-token"}
+    r = client.post(
+        "/api/admin/movies",
+        json={"title": "Tenet", "genre_ids": [ids["drama_id"]], "country_ids": [ids["usa_id"]]},
+        headers=headers,
+    )
+    assert r.status_code == 201
+    movie = r.json()
+    assert [g["id"] for g in movie["genres"]] == [ids["drama_id"]]
+
+    r = client.put(f"/api/admin/movies/{movie['id']}", json={"rating": 7.4, "genre_ids": []}, headers=headers)
+    assert r.status_code == 200
+    assert r.json()["rating"] == 7.4
+    assert r.json()["genres"] == []
+    assert len(r.json()["countries"]) == 1
@@ -0,0 +1,52 @@
+"""Дымовые тесты нагрузочного прогона (benchmarks/load.py)."""
+
+import httpx
+
+from app.core.config import settings
+from app.main import app
+from app.seed import seed_movies
+from benchmarks.load import MIXES, SCENARIOS, compare, percentile, run_load, summarize
+
+
+def test_percentile_and_summary():
+    values = [float(v) for v in range(1, 101)]
+    assert percentile(values, 50) == 50.5
+    assert percentile(values, 99) == 99.01
+    assert percentile([], 95) == 0.0
+
+    summary = summarize([0.01, 0.02, 0.03], errors=1, seconds=2)
+    assert summary["count"] == 3 and summary["errors"] == 1 and summary["rps"] == 1.5
+    assert summary["p50_ms"] == 20.0 and summary["max_ms"] == 30.0
+
+
+def test_compare_ratios():
+    old = {"meta": {"git_commit": "abc"}, "overall": {"rps": 100, "p50_ms": 10, "p95_ms": 20, "p99_ms": 40, "mean_ms": 12}}
+    new = {"overall": {"rps": 110, "p50_ms": 10, "p95_ms": 30, "p99_ms": 40, "mean_ms": 12}, "scenarios": {"detail": {}}}
+    result = compare(new, {**old, "scenarios": {}})
+    assert result["baseline_commit"] == "abc"
+    assert result["overall"]["p95_ms"] == 1.5 and result["overall"]["rps"] == 1.1
+    assert result["scenarios"] == {"detail": {}}
+
+
+def test_mixes_reference_known_scenarios():
+    for weights in MIXES.values():
+        assert set(weights) <= set(SCENARIOS)
+
+
+def test_run_load_in_process(client, db_session, monkeypatch):
+    monkeypatch.setattr(settings, "admin_token", "test-token")
+    seed_movies(db_session, 200, random_seed=3)
+
+    async def run():
+        transport = httpx.ASGITransport(app=app)
+        headers = {"X-Admin-Token": "test-token"}
+        async with httpx.AsyncClient(transport=transport, base_url="http://load", headers=headers) as http:
+            # одна сессия БД на тест — без параллельных запросов
+            return await run_load(http, mix="mixed", concurrency=1, requests=40, warmup=0)
+
+    report = client.portal.call(run)
+    assert report["overall"]["count"] + report["overall"]["errors"] == 40
+    assert report["overall"]["errors"] == 0
+    assert report["catalog"]["movies"] == 200
+    for stats in report["scenarios"].values():
+        assert stats["p50_ms"] <= stats["p95_ms"] <= stats["p99_ms"] <= stats["max_ms"]
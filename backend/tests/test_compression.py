@@ -0,0 +1,91 @@
+import gzip
+
+import brotli
+import pytest
+from fastapi import FastAPI
+from fastapi.responses import PlainTextResponse, Response, StreamingResponse
+from fastapi.testclient import TestClient
+
+from app.core.cache import TTLCache
+from app.core.compression import CompressionMiddleware, accepted_encodings
+
+BIG = b'{"items":[' + b",".join(b'{"id":%d,"title":"Movie"}' % i for i in range(200)) + b"]}"
+
+
+@pytest.fixture()
+def cache():
+    return TTLCache("test_compressed", maxsize=16, ttl=60)
+
+
+@pytest.fixture()
+def client(cache):
+    app = FastAPI()
+    app.add_middleware(CompressionMiddleware, minimum_size=500, cache=cache)
+
+    @app.get("/big")
+    def big():
+        return Response(BIG, media_type="application/json", headers={"ETag": 'W/"big-1"'})
+
+    @app.get("/small")
+    def small():
+        return Response(b'{"ok":true}', media_type="application/json")
+
+    @app.get("/binary")
+    def binary():
+        return Response(BIG, media_type="image/png")
+
+    @app.get("/stream")
+    def stream():
+        return StreamingResponse((BIG for _ in range(3)), media_type="application/x-ndjson")
+
+    @app.get("/not-modified")
+    def not_modified():
+        return PlainTextResponse(b"", status_code=304)
+
+    return TestClient(app)
+
+
+def _get(client, path, encoding):
+    # без автоматической распаковки httpx: проверяем сырые байты
+    with client.stream("GET", path, headers={"Accept-Encoding": encoding}) as r:
+        return r, b"".join(r.iter_raw())
+
+
+@pytest.mark.parametrize(
+    "accept, expected",
+    [("gzip", "gzip"), ("br, gzip", "br"), ("gzip;q=1, br;q=0", "gzip"), ("identity", None)],
+)
+def test_compresses_with_best_accepted_encoding(client, accept, expected):
+    r, raw = _get(client, "/big", accept)
+    assert r.headers.get("content-encoding") == expected
+    assert "Accept-Encoding" in r.headers["vary"]
+    decoded = {"gzip": gzip.decompress, "br": brotli.decompress, None: lambda b: b}[expected](raw)
+    assert decoded == BIG
+    if expected:
+        assert int(r.headers["content-length"]) == len(raw) < len(BIG)
+
+
+@pytest.mark.parametrize("path", ["/small", "/binary", "/not-modified"])
+def test_skips_small_and_binary_responses(client, path):
+    r, _ = _get(client, path, "gzip")
+    assert "content-encoding" not in r.headers
+
+
+def test_streaming_response_compressed_by_chunks(client):
+    r, raw = _get(client, "/stream", "gzip")
+    assert r.headers["content-encoding"] == "gzip"
+    assert "content-length" not in r.headers
+    assert gzip.decompress(raw) == BIG * 3
+
+
+def test_etag_responses_compressed_once(client, cache):
+    for _ in range(3):
+        r, raw = _get(client, "/big", "br")
+        assert brotli.decompress(raw) == BIG
+    assert cache.stats()["misses"] == 1
+    assert cache.stats()["hits"] == 2
+
+
+def test_accepted_encodings():
+    assert accepted_encodings("gzip, deflate, br;q=0") == {"gzip", "deflate"}
+    assert accepted_encodings(None) == set()
@@ -0,0 +1,211 @@
+import threading
+
+import pytest
+from sqlalchemy import update
+from sqlalchemy.orm import sessionmaker
+
+from app.core.config import settings
+from app.crud.catalog import bump_catalog_version, get_catalog_version
+from app.crud.filter_index import filter_index
+from app.crud.movies import create_movie, delete_movie, update_movie
+from app.seed import seed_movies
+
+
+@pytest.fixture(autouse=True)
+def _inline_rebuild(monkeypatch, db_session):
+    # "фоновая" пересборка — сразу и по соединению теста (без второго потока на нём)
+    monkeypatch.setattr(filter_index, "session_factory", sessionmaker(bind=db_session.get_bind()))
+    monkeypatch.setattr(filter_index, "_spawn", lambda target: target())
+
+
+@pytest.fixture()
+def catalog(db_session, seeded):
+    drama = seeded["genres"]["drama"].id
+    usa = seeded["countries"]["usa"].id
+    for title, year, rating, genres in [
+        ("Tenet", 2020, 7.3, [drama]),
+        ("Following", 1998, None, []),
+        ("Untitled", None, 6.0, [drama]),
+        ("Dunkirk", 2017, 7.8, []),
+    ]:
+        create_movie(
+            db_session, title=title, description=None, release_year=year, rating=rating,
+            genre_ids=genres, country_ids=[usa], person_ids=[],
+        )
+    return seeded
+
+
+@pytest.fixture()
+def indexed(monkeypatch, db_session, catalog):
+    monkeypatch.setattr(settings, "filter_index", True)
+    filter_index.rebuild(db_session)
+    yield catalog
+    filter_index.version = None
+
+
+def _titles(client, params):
+    r = client.get("/api/movies", params=params)
+    assert r.status_code == 200
+    data = r.json()
+    return [m["title"] for m in data["items"]], data["total"], data["has_next"]
+
+
+@pytest.mark.parametrize(
+    "params",
+    [
+        {},
+        {"sort": "-title"},
+        {"sort": "rating"},
+        {"sort": "-rating"},
+        {"sort": "year"},
+        {"sort": "-year", "size": 2, "page": 2},
+        {"year_from": 2000, "year_to": 2017},
+        {"rating_from": 7.3, "sort": "-rating"},
+        {"genre": "drama", "country": "usa"},
+        {"genre": "action", "rating_to": 9},
+    ],
+)
+def test_filter_index_matches_sql(client, indexed, monkeypatch, params):
+    params = dict(params)
+    if "genre" in params:
+        params["genre_id"] = [indexed["genres"][params.pop("genre")].id]
+    if "country" in params:
+        params["country_id"] = [indexed["countries"][params.pop("country")].id]
+
+    from_index = _titles(client, params)
+    monkeypatch.setattr(settings, "filter_index", False)
+    assert from_index == _titles(client, params)
+
+
+def test_filter_index_follows_crud(client, indexed, db_session):
+    drama = indexed["genres"]["drama"].id
+    memento = indexed["movies"]["memento"].id
+    update_movie(
+        db_session, memento, title="Memento (2000)", description=None, release_year=None, rating=None,
+        genre_ids=[], country_ids=None, person_ids=None,
+    )
+    delete_movie(db_session, indexed["movies"]["inception"].id)
+
+    assert filter_index.check(db_session)["ok"]
+    titles, total, _ = _titles(client, {"genre_id": [drama]})
+    assert titles == ["Tenet", "Untitled"]
+    assert total == 2
+
+
+def test_filter_index_rebuilds_after_foreign_write(client, indexed, db_session):
+    # запись "другого процесса": версия каталога растёт мимо refresh()
+    create_movie(
+        db_session, title="Insomnia", description=None, release_year=2002, rating=7.2,
+        genre_ids=[], country_ids=[], person_ids=[],
+    )
+    bump_catalog_version(db_session)
+    db_session.commit()
+    assert filter_index.version is not None
+
+    version = filter_index.version
+    # запрос не ждёт пересборку: отвечает SQL, индекс догоняет в фоне
+    titles, _, _ = _titles(client, {"year_from": 2002, "year_to": 2002})
+    assert titles == ["Insomnia"]
+    assert filter_index.version == version + 1
+    assert filter_index.check(db_session)["ok"]
+    assert _titles(client, {"year_from": 2002, "year_to": 2002})[0] == ["Insomnia"]
+
+
+def test_filter_index_ignores_lagging_replica(indexed, db_session, monkeypatch):
+    from app.models.catalog_state import CatalogState
+
+    spawned = []
+    monkeypatch.setattr(filter_index, "_spawn", spawned.append)
+    # реплика видит версию старше индексной: индекс новее её данных, пересборки нет
+    db_session.execute(update(CatalogState).values(version=CatalogState.version - 1))
+    assert filter_index.ensure_current(db_session)
+    assert spawned == []
+
+
+def test_filter_index_rebuild_does_not_block_requests(indexed, db_session, monkeypatch):
+    release = threading.Event()
+    factory = filter_index.session_factory
+
+    def slow_session():
+        release.wait(5)
+        return factory()
+
+    threads = []
+
+    def spawn(target):
+        threads.append(threading.Thread(target=target))
+        threads[-1].start()
+
+    monkeypatch.setattr(filter_index, "session_factory", slow_session)
+    monkeypatch.setattr(filter_index, "_spawn", spawn)
+    bump_catalog_version(db_session)
+    assert not filter_index.ensure_current(db_session)
+    assert not filter_index.ensure_current(db_session)
+    assert len(threads) == 1  # вторая пересборка не запускается, пока идёт первая
+
+    release.set()
+    threads[0].join(5)
+    assert filter_index.version == get_catalog_version(db_session)
+    assert filter_index.ensure_current(db_session)
+
+
+def test_filter_index_check_reports_drift(client, indexed, db_session, monkeypatch):
+    monkeypatch.setattr(settings, "admin_token", "test-token")
+    filter_index._remove(indexed["movies"]["memento"].id)
+    r = client.get("/api/admin/filter-index/check", headers={"X-Admin-Token": "test-token"})
+    assert r.status_code == 200
+    report = r.json()
+    assert report["ok"] is False
+    assert report["missing"] == [indexed["movies"]["memento"].id]
+
+    r = client.post("/api/admin/filter-index:rebuild", headers={"X-Admin-Token": "test-token"})
+    assert r.json() == {"size": 6}
+    assert filter_index.check(db_session)["ok"]
+
+
+@pytest.mark.parametrize("scan_limit", [0, 50, 200_000])
+def test_filter_index_query_paths_match_sql(client, db_session, monkeypatch, scan_limit):
+    # от лимита зависит путь: срез порядка, частичная сортировка кандидатов,
+    # проход по порядку или отказ в пользу SQL — ответы должны совпадать
+    seed_movies(db_session, 300, random_seed=5)
+    monkeypatch.setattr(settings, "filter_index", True)
+    monkeypatch.setattr("app.crud.filter_index._SCAN_LIMIT", scan_limit)
+    filter_index.rebuild(db_session)
+    genres = client.get("/api/genres").json()["items"]
+    persons = client.get("/api/persons", params={"size": 100}).json()["items"]
+    cases = [
+        {"sort": "-rating", "page": 3},
+        {"genre_id": [genres[0]["id"]], "sort": "year"},
+        {"genre_id": [genres[1]["id"], genres[2]["id"]], "sort": "-title", "page": 2},
+        {"person_id": [persons[-1]["id"]], "sort": "title"},
+        {"person_id": [persons[0]["id"]], "genre_id": [genres[3]["id"]], "year_from": 2000},
+        {"year_from": 2010, "rating_to": 7, "sort": "-year", "page": 2},
+        {"rating_from": 6.5, "rating_to": 6.5},
+        {"year_from": 2030},
+    ]
+    try:
+        for params in cases:
+            monkeypatch.setattr(settings, "filter_index", True)
+            from_index = _titles(client, params)
+            monkeypatch.setattr(settings, "filter_index", False)
+            assert from_index == _titles(client, params), params
+    finally:
+        filter_index.version = None
+
+
+def test_filter_index_page_continues_by_cursor(client, db_session, indexed):
+    # регистр и не-ASCII: порядок кодовых точек у индекса и у SQL-курсора один
+    for title in ("apple", "Zorro", "Ángel", "éclair", "Éclair"):
+        create_movie(
+            db_session, title=title, description=None, release_year=None, rating=None,
+            genre_ids=[], country_ids=[], person_ids=[],
+        )
+    first = client.get("/api/movies", params={"size": 4}).json()
+    titles = [m["title"] for m in first["items"]]
+    cursor = first["next_cursor"]
+    while cursor:
+        data = client.get("/api/movies", params={"size": 4, "cursor": cursor}).json()
+        titles += [m["title"] for m in data["items"]]
+        cursor = data["next_cursor"]
+    assert titles == sorted(titles)
+    assert len(titles) == filter_index.size == 11
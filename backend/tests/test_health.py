@@ -2,3 +2,41 @@ def test_health(client):
     r = client.get("/api/health")
     assert r.status_code == 200
     assert r.json() == {"status": "ok"}
+
+
+def test_health_pool_reports_primary(client):
+    r = client.get("/api/health/pool")
+    assert r.status_code == 200
+    assert "class" in r.json()["primary"]
+
+
+def test_instrumented_pool_counts_checkouts():
+    from sqlalchemy import create_engine, text
+
+    from app.core.pool import InstrumentedQueuePool, pool_status
+
+    engine = create_engine("sqlite+pysqlite://", poolclass=InstrumentedQueuePool, pool_size=2, max_overflow=0)
+    with engine.connect() as conn:
+        conn.execute(text("SELECT 1"))
+        status = pool_status(engine)
+        assert status["checked_out"] == 1
+    status = pool_status(engine)
+    assert status["checked_out"] == 0
+    assert status["checkout"]["checkouts"] == 1
+    engine.dispose()
+
+
+def test_engine_options_for_postgres(monkeypatch):
+    from app.core.config import settings
+    from app.core.pool import InstrumentedQueuePool, engine_options
+
+    monkeypatch.setattr(settings, "db_pool_size", 7)
+    monkeypatch.setattr(settings, "db_statement_timeout_ms", 1500)
+    options = engine_options("postgresql+psycopg2://u:p@db/cinema")
+    assert options["poolclass"] is InstrumentedQueuePool
+    assert options["pool_size"] == 7
+    assert options["connect_args"] == {"options": "-c statement_timeout=1500"}
+
+    options = engine_options("postgresql+asyncpg://u:p@db/cinema", is_async=True)
+    assert options["connect_args"] == {"server_settings": {"statement_timeout": "1500"}}
+    assert engine_options("sqlite+pysqlite://") == {}
@@ -0,0 +1,67 @@
+import re
+
+import pytest
+from fastapi import FastAPI
+from fastapi.testclient import TestClient
+from sqlalchemy import text
+
+from app.core.metrics import MetricsMiddleware, phase, render_metrics, reset_metrics
+
+
+@pytest.fixture(autouse=True)
+def _reset_metrics():
+    reset_metrics()
+    yield
+
+
+def _sample(body: str, name: str, **labels) -> float:
+    """Значение ряда name{labels...} из текстового формата Prometheus."""
+    for line in body.splitlines():
+        if not line.startswith(name + "{") and not line.startswith(name + " "):
+            continue
+        found = dict(re.findall(r'(\w+)="([^"]*)"', line.split(" ")[0]))
+        if all(found.get(k) == str(v) for k, v in labels.items()):
+            return float(line.rsplit(" ", 1)[1])
+    raise AssertionError(f"{name} {labels} not found")
+
+
+def test_metrics_record_route_latency_and_queries(client, seeded):
+    assert client.get("/api/movies").status_code == 200
+    assert client.get(f"/api/movies/{seeded['movies']['memento'].id}").status_code == 200
+    assert client.get("/api/genres").status_code == 200
+    assert client.get("/api/nope").status_code == 404
+
+    r = client.get("/metrics")
+    assert r.status_code == 200
+    assert r.headers["content-type"].startswith("text/plain")
+    body = r.text
+    labels = {"method": "GET", "route": "/api/movies", "status": 200}
+    assert _sample(body, "http_requests_total", **labels) == 1
+    assert _sample(body, "http_request_duration_seconds_count", **labels) == 1
+    # версия каталога + COUNT + страница
+    assert _sample(body, "http_request_db_queries_sum", **labels) >= 3
+    assert _sample(body, "http_request_db_seconds_sum", **labels) > 0
+    for route in ("/api/movies", "/api/movies/{movie_id}", "/api/genres"):
+        assert _sample(body, "http_request_phase_seconds_count", route=route, phase="serialize") == 1
+    # шаблон пути, а не конкретный id
+    assert _sample(body, "http_requests_total", route="/api/movies/{movie_id}", status=200) == 1
+    assert _sample(body, "http_requests_total", route="<unmatched>", status=404) == 1
+    assert _sample(body, "cache_size", cache="movie_counts") >= 0
+
+
+def test_server_timing_header(db_session):
+    app = FastAPI()
+    app.add_middleware(MetricsMiddleware, server_timing=True)
+
+    @app.get("/work")
+    def work():
+        db_session.execute(text("SELECT 1"))
+        db_session.execute(text("SELECT 2"))
+        with phase("serialize"):
+            return {"ok": True}
+
+    r = TestClient(app).get("/work")
+    timing = r.headers["server-timing"]
+    assert 'db;dur=' in timing and 'desc="2 queries"' in timing
+    assert "serialize;dur=" in timing and "app;dur=" in timing
+    assert _sample(render_metrics(), "http_request_db_queries_sum", route="/work") == 2
@@ -1,5 +1,7 @@
 import pytest
 
+from app.core.config import settings
+
 
 def test_movies_list_sorted_by_title(client, seeded):
     r = client.get("/api/movies", params={"page": 1, "size": 10, "sort": "title"})
@@ -81,3 +83,380 @@ def test_movies_numeric_filters(client, seeded, params, expected_titles):
     data = r.json()
     assert [m["title"] for m in data["items"]] == expected_titles
     assert data["total"] == len(expected_titles)
+
+
+def _walk_cursor(client, params):
+    titles, cursor = [], None
+    while True:
+        r = client.get("/api/movies", params={**params, "size": 1, **({"cursor": cursor} if cursor else {})})
+        assert r.status_code == 200
+        data = r.json()
+        titles += [m["title"] for m in data["items"]]
+        cursor = data["next_cursor"]
+        if not cursor:
+            return titles
+
+
+@pytest.mark.parametrize("sort", ["title", "-title", "rating", "-rating", "year", "-year"])
+def test_movies_cursor_pagination_matches_page_mode(client, db_session, seeded, sort):
+    from app.models.movie import Movie
+
+    # фильм без рейтинга и года — проверяем обработку NULL в keyset
+    db_session.add(Movie(title="Untitled"))
+    db_session.commit()
+
+    r = client.get("/api/movies", params={"sort": sort, "size": 100})
+    expected = [m["title"] for m in r.json()["items"]]
+    assert len(expected) == 3
+    assert _walk_cursor(client, {"sort": sort}) == expected
+
+
+def test_movies_cursor_invalid_returns_400(client, seeded):
+    r = client.get("/api/movies", params={"cursor": "not-a-cursor"})
+    assert r.status_code == 400
+    assert r.json()["detail"] == "Invalid cursor"
+
+
+def test_movies_cursor_sort_mismatch_returns_400(client, seeded):
+    cursor = client.get("/api/movies", params={"size": 1, "sort": "title"}).json()["next_cursor"]
+    r = client.get("/api/movies", params={"cursor": cursor, "sort": "-rating"})
+    assert r.status_code == 400
+
+
+def test_movies_total_mode_none_returns_has_next(client, seeded):
+    r = client.get("/api/movies", params={"size": 1, "total_mode": "none"})
+    assert r.status_code == 200
+    data = r.json()
+    assert data["total"] is None
+    assert data["total_mode"] == "none"
+    assert data["has_next"] is True
+
+    r = client.get("/api/movies", params={"size": 1, "page": 2, "total_mode": "none"})
+    assert r.json()["has_next"] is False
+
+
+def test_movies_total_mode_estimate_uses_cached_count(client, db_session, seeded):
+    from app.models.movie import Movie
+
+    r = client.get("/api/movies", params={"total_mode": "estimate"})
+    assert r.json()["total"] == 2
+    assert r.json()["total_mode"] == "estimate"
+
+    # новая строка не видна, пока не истёк TTL кэша
+    db_session.add(Movie(title="Tenet"))
+    db_session.commit()
+    assert client.get("/api/movies", params={"total_mode": "estimate"}).json()["total"] == 2
+    assert client.get("/api/movies").json()["total"] == 3
+
+
+def test_movies_total_mode_estimate_with_colon_in_q(client, seeded):
+    from sqlalchemy import select
+    from sqlalchemy.dialects import postgresql
+
+    from app.crud.movies import _explain_sql
+    from app.models.movie import Movie
+
+    r = client.get("/api/movies", params={"q": "a :foo", "total_mode": "estimate"})
+    assert r.status_code == 200
+    assert r.json()["total"] == 0
+
+    # в Postgres значение q уходит в EXPLAIN параметром, а не литералом в тексте SQL
+    stmt = select(Movie).where(Movie.title.ilike("%a :foo%"), Movie.id.in_([1, 2]))
+    sql, params = _explain_sql(stmt, postgresql.dialect())
+    assert sql.startswith("EXPLAIN (FORMAT JSON) SELECT")
+    assert ":foo" not in sql
+    assert "%a :foo%" in params.values()
+    assert "movies.id IN (%(id_1_1)s, %(id_1_2)s)" in sql
+
+def test_movies_fulltext_search_by_title_prefix(client, seeded):
+    r = client.get("/api/movies", params={"q": "incep", "search_mode": "fulltext"})
+    assert r.status_code == 200
+    data = r.json()
+    assert data["total"] == 1
+    assert data["items"][0]["title"] == "Inception"
+
+
+def test_movies_fulltext_search_matches_description(client, seeded):
+    r = client.get("/api/movies", params={"q": "memory fragile", "search_mode": "fulltext"})
+    assert [m["title"] for m in r.json()["items"]] == ["Memento"]
+
+
+def test_movies_fulltext_relevance_sort(client, db_session, seeded):
+    from app.models.movie import Movie
+
+    db_session.add(Movie(title="Dream Team", description="Sports comedy."))
+    db_session.add(Movie(title="Dreams", description="Dream after dream after dream."))
+    db_session.commit()
+
+    r = client.get("/api/movies", params={"q": "dream", "search_mode": "fulltext", "sort": "relevance"})
+    assert r.status_code == 200
+    data = r.json()
+    assert data["total"] == 3
+    assert data["items"][0]["title"] == "Dreams"
+    assert data["next_cursor"] is None
+
+
+def test_movies_fulltext_index_follows_updates(client, db_session, seeded):
+    movie = seeded["movies"]["memento"]
+    movie.title = "Following"
+    db_session.commit()
+
+    params = {"search_mode": "fulltext"}
+    assert client.get("/api/movies", params={**params, "q": "memento"}).json()["total"] == 0
+    assert client.get("/api/movies", params={**params, "q": "follow"}).json()["total"] == 1
+
+
+def test_movie_details_etag_and_304(client, seeded, monkeypatch):
+    from app.core.config import settings
+
+    monkeypatch.setattr(settings, "admin_token", "test-token")
+    movie_id = seeded["movies"]["inception"].id
+    r = client.get(f"/api/movies/{movie_id}")
+    etag = r.headers["etag"]
+    assert etag.startswith('W/"')
+    assert r.headers["cache-control"] == "no-cache"
+
+    r = client.get(f"/api/movies/{movie_id}", headers={"If-None-Match": etag})
+    assert r.status_code == 304
+    assert r.headers["etag"] == etag
+    monkeypatch.setattr(settings, "http_cache_max_age", 30)
+    assert client.get(f"/api/movies/{movie_id}").headers["cache-control"] == "public, max-age=30"
+
+    client.put(f"/api/admin/movies/{movie_id}", json={"genre_ids": []}, headers={"X-Admin-Token": "test-token"})
+    r = client.get(f"/api/movies/{movie_id}", headers={"If-None-Match": etag})
+    assert r.status_code == 200
+    assert r.headers["etag"] != etag
+
+
+def test_movies_list_etag_changes_with_catalog(client, seeded, monkeypatch):
+    from app.core.config import settings
+
+    monkeypatch.setattr(settings, "admin_token", "test-token")
+    params = {"sort": "-rating"}
+    etag = client.get("/api/movies", params=params).headers["etag"]
+    assert client.get("/api/movies", params={"sort": "rating"}).headers["etag"] != etag
+
+    r = client.get("/api/movies", params=params, headers={"If-None-Match": etag})
+    assert r.status_code == 304
+
+    client.post("/api/admin/movies", json={"title": "Tenet"}, headers={"X-Admin-Token": "test-token"})
+    r = client.get("/api/movies", params=params, headers={"If-None-Match": etag})
+    assert r.status_code == 200
+    assert r.json()["total"] == 3
+
+
+def test_movies_batch_returns_details_in_request_order(client, db_engine, seeded):
+    from sqlalchemy import event
+
+    inception_id = seeded["movies"]["inception"].id
+    memento_id = seeded["movies"]["memento"].id
+
+    statements = []
+    listener = lambda *args: statements.append(args[2])  # noqa: E731
+    event.listen(db_engine, "before_cursor_execute", listener)
+    try:
+        r = client.get("/api/movies/batch", params={"ids": f"{memento_id},999999,{inception_id}"})
+    finally:
+        event.remove(db_engine, "before_cursor_execute", listener)
+
+    assert r.status_code == 200
+    data = r.json()
+    assert [m["title"] for m in data["items"]] == ["Memento", "Inception"]
+    assert data["missing_ids"] == [999999]
+    assert len(data["items"][1]["persons"]) == 2
+    # фильмы + по одному запросу на каждую связь
+    assert len(statements) == 4
+
+
+def test_movies_batch_rejects_bad_ids(client, seeded):
+    assert client.get("/api/movies/batch", params={"ids": "1,abc"}).status_code == 400
+    assert client.get("/api/movies/batch", params={"ids": ",".join(map(str, range(101)))}).status_code == 400
+
+
+def test_movies_list_expand_includes_only_requested_relations(client, seeded):
+    r = client.get("/api/movies", params={"expand": "genres,countries", "sort": "title"})
+    assert r.status_code == 200
+    inception = r.json()["items"][0]
+    assert {g["name"] for g in inception["genres"]} == {"Action", "Drama"}
+    assert len(inception["countries"]) == 2
+    assert "persons" not in inception
+
+    assert client.get("/api/movies", params={"expand": "reviews"}).status_code == 400
+
+
+def test_movies_facets_unfiltered(client, seeded):
+    r = client.get("/api/movies", params={"facets": "genres,decades,ratings,countries"})
+    assert r.status_code == 200
+    facets = r.json()["facets"]
+    drama = seeded["genres"]["drama"].id
+    assert {"value": drama, "count": 2} in facets["genres"]
+    assert facets["decades"] == [{"value": 2000, "count": 1}, {"value": 2010, "count": 1}]
+    assert {b["value"] for b in facets["ratings"]} == {8}
+    assert sum(b["count"] for b in facets["countries"]) == 3
+
+
+def test_movies_facets_skip_movies_without_year_or_rating(client, seeded, db_session):
+    from app.crud.movies import create_movie
+
+    create_movie(
+        db_session, title="Untitled", description=None, release_year=None, rating=None,
+        genre_ids=[], country_ids=[], person_ids=[],
+    )
+    r = client.get("/api/movies", params={"facets": "decades,ratings"})
+    assert r.status_code == 200
+    assert sum(b["count"] for b in r.json()["facets"]["decades"]) == 2
+    assert sum(b["count"] for b in r.json()["facets"]["ratings"]) == 2
+
+
+def test_movies_facets_follow_filters(client, seeded):
+    uk = seeded["countries"]["uk"].id
+    r = client.get("/api/movies", params={"country_id": [uk], "facets": "decades"})
+    assert r.status_code == 200
+    data = r.json()
+    assert data["facets"] == {"decades": [{"value": 2010, "count": 1}]}
+
+
+def test_movies_facets_unknown_dimension(client, seeded):
+    r = client.get("/api/movies", params={"facets": "colors"})
+    assert r.status_code == 400
+
+
+def test_movies_facets_baseline_cache_invalidated_on_write(client, seeded, db_session):
+    from app.crud.movies import create_movie
+
+    client.get("/api/movies", params={"facets": "decades"})
+    create_movie(
+        db_session, title="Tenet", description=None, release_year=2020, rating=7.3,
+        genre_ids=[], country_ids=[], person_ids=[],
+    )
+    r = client.get("/api/movies", params={"facets": "decades"})
+    assert {"value": 2020, "count": 1} in r.json()["facets"]["decades"]
+
+
+@pytest.fixture()
+def projection(monkeypatch, db_session, seeded):
+    from app.crud.movie_search import rebuild_movie_search
+
+    monkeypatch.setattr(settings, "movie_search_projection", True)
+    assert rebuild_movie_search(db_session) == 2
+
+
+@pytest.mark.parametrize(
+    "key, params, expected_titles",
+    [
+        ("drama", "genre_id", ["Inception", "Memento"]),
+        ("uk", "country_id", ["Inception"]),
+        ("dicaprio", "person_id", ["Inception"]),
+    ],
+)
+def test_movies_filters_via_search_projection(client, seeded, projection, key, params, expected_titles):
+    group = {"genre_id": "genres", "country_id": "countries", "person_id": "persons"}[params]
+    r = client.get("/api/movies", params={params: [seeded[group][key].id], "sort": "title"})
+    assert r.status_code == 200
+    assert [m["title"] for m in r.json()["items"]] == expected_titles
+
+
+def test_search_projection_synced_on_update(client, seeded, projection, db_session):
+    from app.crud.movies import update_movie
+
+    uk = seeded["countries"]["uk"].id
+    memento = seeded["movies"]["memento"]
+    update_movie(
+        db_session, memento.id, title=None, description=None, release_year=None, rating=None,
+        genre_ids=None, country_ids=[uk], person_ids=None,
+    )
+    r = client.get("/api/movies", params={"country_id": [uk]})
+    assert r.json()["total"] == 2
+
+
+@pytest.mark.parametrize(
+    "params",
+    [
+        {},
+        {"sort": "-rating", "size": 1},
+        {"total_mode": "none", "facets": "genres,decades"},
+        {"q": "memen"},
+    ],
+)
+def test_movies_list_fast_json_matches_pydantic(client, seeded, monkeypatch, params):
+    fast = client.get("/api/movies", params=params)
+    monkeypatch.setattr(settings, "json_fast_path", False)
+    slow = client.get("/api/movies", params=params)
+    assert fast.status_code == slow.status_code == 200
+    assert fast.content == slow.content
+
+
+def test_movies_list_sparse_fields(client, seeded):
+    r = client.get("/api/movies", params={"fields": "title", "sort": "-rating", "size": 1})
+    assert r.status_code == 200
+    data = r.json()
+    assert data["items"] == [{"id": seeded["movies"]["inception"].id, "title": "Inception"}]
+    # курсор строится по колонке сортировки, даже если её нет в fields
+    r = client.get("/api/movies", params={"fields": "title", "sort": "-rating", "size": 1, "cursor": data["next_cursor"]})
+    assert [m["title"] for m in r.json()["items"]] == ["Memento"]
+
+
+@pytest.mark.parametrize("params", [{"fields": "title,budget"}, {"fields": "title", "expand": "genres"}])
+def test_movies_list_sparse_fields_invalid(client, seeded, params):
+    assert client.get("/api/movies", params=params).status_code == 400
+
+
+def test_movies_list_does_not_load_description(client, seeded, db_session, monkeypatch):
+    from sqlalchemy import event
+
+    statements = []
+
+    def before_execute(conn, cursor, statement, *args):
+        statements.append(statement)
+
+    event.listen(db_session.get_bind(), "before_cursor_execute", before_execute)
+    try:
+        for fast in (True, False):
+            monkeypatch.setattr(settings, "json_fast_path", fast)
+            assert client.get("/api/movies").status_code == 200
+    finally:
+        event.remove(db_session.get_bind(), "before_cursor_execute", before_execute)
+    assert statements and not any("movies.description" in s for s in statements)
+
+
+def test_title_order_uses_codepoint_collation_on_postgres():
+    from sqlalchemy import select
+    from sqlalchemy.dialects import postgresql
+
+    from app.crud.movies import _keyset_conditions, _order_by
+    from app.models.movie import Movie
+
+    # порядок названий должен совпадать с in-process индексом при любой collation БД
+    stmt = select(Movie.id).where(*_keyset_conditions("title", False, "b", 1)).order_by(*_order_by("title", False))
+    sql = str(stmt.compile(dialect=postgresql.dialect()))
+    assert 'ORDER BY movies.title COLLATE "C" ASC NULLS LAST' in sql
+    assert '(movies.title COLLATE "C", movies.id) >' in sql
+    assert "IS NULL" not in sql
+
+
+@pytest.mark.parametrize("sort", ["title", "-title", "rating", "-rating", "year", "-year"])
+def test_cursor_conditions_are_index_range_seeks(db_session, sort):
+    from sqlalchemy import select, text
+
+    from app.crud.movies import _keyset_conditions, _order_by, _parse_sort
+    from app.models.movie import Movie
+
+    key, desc = _parse_sort(sort)
+    value = "b" if key == "title" else 5
+    for condition in _keyset_conditions(key, desc, value, 1):
+        stmt = select(Movie.id).where(condition).order_by(*_order_by(key, desc)).limit(10)
+        compiled = stmt.compile(db_session.get_bind(), compile_kwargs={"literal_binds": True})
+        plan = " ".join(row[-1] for row in db_session.execute(text(f"EXPLAIN QUERY PLAN {compiled}")))
+        assert "SEARCH movies" in plan, plan
+
+
+@pytest.mark.parametrize(
+    "sort, value",
+    [("rating", {"a": 1}), ("rating", [1, 2]), ("rating", "9"), ("year", 1.5), ("title", 5), ("title", None), ("year", True)],
+)
+def test_movies_cursor_with_bad_value_returns_400(client, seeded, sort, value):
+    from app.crud.movies import encode_cursor
+
+    r = client.get("/api/movies", params={"sort": sort, "cursor": encode_cursor(sort, False, value, 1)})
+    assert r.status_code == 400
+    assert r.json()["detail"] == "Invalid cursor"
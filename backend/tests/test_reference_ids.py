@@ -0,0 +1,131 @@
+import pytest
+from sqlalchemy import event
+
+from app.core.config import settings
+from app.crud.reference_ids import load_id_map, missing_ids, reference_ids_cache, validate_reference_ids
+from app.crud.references import invalidate_reference_cache
+from app.models.genre import Genre
+
+ADMIN_HEADERS = {"X-Admin-Token": "test-token"}
+
+
+@pytest.fixture(autouse=True)
+def _admin_token(monkeypatch):
+    monkeypatch.setattr(settings, "admin_token", "test-token")
+
+
+@pytest.fixture()
+def statements(db_session):
+    executed = []
+
+    def before_execute(conn, cursor, statement, parameters, context, executemany):
+        executed.append(statement)
+
+    engine = db_session.get_bind().engine
+    event.listen(engine, "before_cursor_execute", before_execute)
+    yield executed
+    event.remove(engine, "before_cursor_execute", before_execute)
+
+
+def test_known_ids_are_checked_without_queries(db_session, seeded, statements):
+    drama_id = seeded["genres"]["drama"].id
+    nolan_id = seeded["persons"]["nolan"].id
+    validate_reference_ids(db_session, genre_ids=[drama_id], person_ids=[nolan_id])
+    assert len(statements) == 2  # по SELECT id на справочник
+
+    statements.clear()
+    validate_reference_ids(db_session, genre_ids=[drama_id, drama_id], person_ids=[nolan_id], country_ids=None)
+    assert statements == []
+
+
+def test_unknown_id_found_in_db_reloads_map(db_session, seeded):
+    drama_id = seeded["genres"]["drama"].id
+    version = load_id_map(db_session, "genre_ids").version
+
+    # жанр добавлен после загрузки карты (например, другим процессом)
+    horror = Genre(name="Horror")
+    db_session.add(horror)
+    db_session.flush()
+    assert missing_ids(db_session, "genre_ids", [drama_id, horror.id]) == set()
+    assert reference_ids_cache.get("genre_ids").version > version
+
+    with pytest.raises(ValueError, match=r"Unknown genre_ids: \[999998, 999999\]"):
+        validate_reference_ids(db_session, genre_ids=[999999, drama_id, 999998])
+
+
+def test_unknown_ids_checked_by_query_without_reload(db_session, seeded, statements):
+    drama_id = seeded["genres"]["drama"].id
+    version = load_id_map(db_session, "genre_ids").version
+    statements.clear()
+
+    # поток несуществующих id не перечитывает справочник целиком
+    for bad_id in (999997, 999998, 999999):
+        assert missing_ids(db_session, "genre_ids", [drama_id, bad_id]) == {bad_id}
+    assert len(statements) == 3
+    assert all(" IN (" in sql for sql in statements)
+    assert reference_ids_cache.get("genre_ids").version == version
+
+
+def test_invalidate_reference_cache_drops_id_map(db_session, seeded):
+    load_id_map(db_session, "person_ids")
+    load_id_map(db_session, "genre_ids")
+    invalidate_reference_cache("persons")
+    assert reference_ids_cache.get("person_ids") is None
+    assert reference_ids_cache.get("genre_ids") is not None
+
+
+def test_without_ttl_ids_are_checked_by_query(db_session, seeded, monkeypatch):
+    monkeypatch.setattr(reference_ids_cache, "ttl", 0)
+    drama_id = seeded["genres"]["drama"].id
+    assert missing_ids(db_session, "genre_ids", [drama_id, 999999]) == {999999}
+    assert reference_ids_cache.stats()["size"] == 0
+
+
+def test_create_and_update_write_links_by_id(client, seeded):
+    drama_id = seeded["genres"]["drama"].id
+    action_id = seeded["genres"]["action"].id
+    usa_id = seeded["countries"]["usa"].id
+    nolan_id = seeded["persons"]["nolan"].id
+
+    r = client.post(
+        "/api/admin/movies",
+        json={"title": "Tenet", "genre_ids": [drama_id, drama_id, action_id], "person_ids": [nolan_id]},
+        headers=ADMIN_HEADERS,
+    )
+    assert r.status_code == 201
+    movie = r.json()
+    assert sorted(g["id"] for g in movie["genres"]) == sorted([drama_id, action_id])
+    assert [p["id"] for p in movie["persons"]] == [nolan_id]
+
+    # переданные поля заменяются целиком, непереданные остаются как были
+    r = client.put(
+        f"/api/admin/movies/{movie['id']}",
+        json={"genre_ids": [action_id], "country_ids": [usa_id]},
+        headers=ADMIN_HEADERS,
+    )
+    assert r.status_code == 200
+    movie = r.json()
+    assert [g["id"] for g in movie["genres"]] == [action_id]
+    assert [c["id"] for c in movie["countries"]] == [usa_id]
+    assert [p["id"] for p in movie["persons"]] == [nolan_id]
+
+    r = client.put(f"/api/admin/movies/{movie['id']}", json={"person_ids": [424242]}, headers=ADMIN_HEADERS)
+    assert r.status_code == 400
+    assert r.json()["detail"] == "Unknown person_ids: [424242]"
+    r = client.get(f"/api/movies/{movie['id']}")
+    assert [p["id"] for p in r.json()["persons"]] == [nolan_id]
+
+
+def test_foreign_key_error_returns_409_and_drops_id_maps(client, db_session, seeded, monkeypatch):
+    from sqlalchemy.exc import IntegrityError
+
+    def stale_reference(*args, **kwargs):
+        # id жанра прошёл проверку по карте, но его уже удалили в другом процессе
+        raise IntegrityError("INSERT INTO movie_genre", {}, Exception("FOREIGN KEY constraint failed"))
+
+    monkeypatch.setattr("app.api.routers.admin.create_movie", stale_reference)
+    load_id_map(db_session, "genre_ids")
+    r = client.post("/api/admin/movies", json={"title": "Tenet"}, headers=ADMIN_HEADERS)
+    assert r.status_code == 409
+    assert r.json()["detail"] == "Database error: FOREIGN KEY constraint failed"
+    assert reference_ids_cache.get("genre_ids") is None
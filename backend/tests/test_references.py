@@ -21,6 +21,8 @@ def test_countries_list_returns_total(client, seeded):
     r = client.get("/api/countries")
     assert r.status_code == 200
     assert r.json()["total"] == 2
+    # поля пагинации списка фильмов (total_mode, has_next) сюда не относятся
+    assert set(r.json()) == {"items", "page", "size", "total"}
 
 
 @pytest.mark.parametrize(
@@ -44,3 +46,36 @@ def test_persons_search_returns_nolan(client, seeded):
     data = r.json()
     assert data["total"] == 1
     assert data["items"][0]["full_name"] == "Christopher Nolan"
+
+
+def test_references_are_cached_until_invalidated(client, db_session, seeded, monkeypatch):
+    from app.core.config import settings
+    from app.crud.references import reference_cache
+    from app.models.genre import Genre
+
+    assert client.get("/api/genres").json()["total"] == 2
+    db_session.add(Genre(name="Comedy"))
+    db_session.commit()
+
+    # данные из кэша, пока его не сбросили
+    assert client.get("/api/genres").json()["total"] == 2
+    assert reference_cache.stats()["hits"] == 1
+
+    monkeypatch.setattr(settings, "admin_token", "test-token")
+    r = client.delete("/api/admin/cache/references", params={"entity": "genres"}, headers={"X-Admin-Token": "test-token"})
+    assert r.status_code == 200
+    assert r.json()["invalidated"] == 1
+    assert client.get("/api/genres").json()["total"] == 3
+
+
+def test_ttl_cache_evicts_least_recently_used():
+    from app.core.cache import TTLCache
+
+    cache = TTLCache("test", maxsize=2, ttl=60)
+    cache.set("a", 1)
+    cache.set("b", 2)
+    assert cache.get("a") == 1
+    cache.set("c", 3)
+    assert cache.get("b") is None
+    assert cache.get("a") == 1
+    assert cache.stats()["evictions"] == 1
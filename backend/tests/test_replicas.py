@@ -0,0 +1,71 @@
+import time
+from http.cookies import SimpleCookie
+
+import pytest
+from sqlalchemy import create_engine, exc, text
+from starlette.responses import Response
+
+from app.core import replicas
+from app.core.replicas import ReplicaSet
+
+
+@pytest.fixture()
+def engines():
+    created = [create_engine("sqlite+pysqlite://") for _ in range(3)]
+    yield created
+    for e in created:
+        e.dispose()
+
+
+def test_replicas_round_robin(engines):
+    primary, *replica_engines = engines
+    rs = ReplicaSet(replica_engines)
+    picked = [rs.read_engine(primary) for _ in range(4)]
+    assert picked == replica_engines * 2
+
+
+def test_replicas_ejected_replica_is_skipped(engines):
+    primary, r1, r2 = engines
+    rs = ReplicaSet([r1, r2])
+    rs.eject(0)
+    assert {rs.read_engine(primary) for _ in range(4)} == {r2}
+    rs.eject(1)
+    assert rs.read_engine(primary) is primary
+
+
+def test_replicas_connect_error_ejects(tmp_path, engines):
+    primary = engines[0]
+    broken = create_engine(f"sqlite+pysqlite:///{tmp_path}/missing/dir/db.sqlite")
+    rs = ReplicaSet([broken])
+    with pytest.raises(exc.OperationalError):
+        with broken.connect() as conn:
+            conn.execute(text("SELECT 1"))
+    assert rs.healthy() == []
+    assert rs.read_engine(primary) is primary
+
+
+def test_replicas_sticky_window_is_per_client(engines):
+    primary, replica = engines[:2]
+    rs = ReplicaSet([replica])
+    response = Response()
+    replicas.mark_primary_write(response)
+    cookie = SimpleCookie(response.headers["set-cookie"])[replicas.STICKY_COOKIE]
+    assert int(cookie["max-age"]) == 5
+
+    writer = {replicas.STICKY_COOKIE: cookie.value}
+    assert rs.read_engine(primary, replicas.reads_stick_to_primary(writer)) is primary
+    assert rs.read_engine(primary, replicas.reads_stick_to_primary({})) is replica
+    expired = {replicas.STICKY_COOKIE: str(time.time() - 1)}
+    assert not replicas.reads_stick_to_primary(expired)
+    assert not replicas.reads_stick_to_primary({replicas.STICKY_COOKIE: "garbage"})
+
+
+def test_admin_mutation_sets_sticky_cookie(client, seeded, monkeypatch):
+    from app.core.config import settings
+
+    monkeypatch.setattr(settings, "admin_token", "test-token")
+    headers = {"X-Admin-Token": "test-token"}
+    r = client.post("/api/admin/movies", json={"title": "Tenet"}, headers=headers)
+    assert r.status_code == 201
+    assert replicas.STICKY_COOKIE in r.cookies
+    assert replicas.STICKY_COOKIE not in client.get("/api/admin/slow-queries", headers=headers).cookies
@@ -0,0 +1,85 @@
+import asyncio
+import threading
+
+import pytest
+
+from app.core.config import settings
+from app.core.fake_redis import FakeRedisServer
+from app.core.response_cache import MemoryBackend, RedisBackend, ResponseCache, response_cache
+from app.models.movie import Movie
+
+
+@pytest.fixture()
+def fake_redis():
+    server = FakeRedisServer(port=0)
+    server.start_in_thread()
+    yield server
+    server.shutdown()
+    server.server_close()
+
+
+@pytest.fixture(params=["memory", "redis"])
+def cache_backend(request, monkeypatch):
+    if request.param == "memory":
+        backend = MemoryBackend()
+    else:
+        backend = RedisBackend(request.getfixturevalue("fake_redis").url)
+    monkeypatch.setattr(response_cache, "backend", backend)
+    monkeypatch.setattr(response_cache, "ttl", 60)
+    monkeypatch.setattr(settings, "admin_token", "test-token")
+    return backend
+
+
+def test_movies_list_served_from_cache_until_catalog_changes(client, db_session, seeded, cache_backend):
+    assert client.get("/api/movies").json()["total"] == 2
+
+    # запись мимо CRUD не меняет поколение — ответ из кэша
+    db_session.add(Movie(title="Tenet"))
+    db_session.commit()
+    r = client.get("/api/movies")
+    assert r.status_code == 200
+    assert r.json()["total"] == 2
+
+    # мутация через админку увеличивает поколение
+    r = client.post("/api/admin/movies", json={"title": "Dunkirk"}, headers={"X-Admin-Token": "test-token"})
+    assert r.status_code == 201
+    assert client.get("/api/movies").json()["total"] == 4
+
+
+def test_response_cache_key_normalizes_params():
+    cache = ResponseCache(MemoryBackend(), ttl=60)
+    a = cache.key("movies:list", {"genre_ids": [3, 1], "q": None, "page": 1}, 7)
+    b = cache.key("movies:list", {"page": 1, "genre_ids": [1, 3]}, 7)
+    assert a == b
+    # ответ, посчитанный на другой версии каталога (отстающая реплика), — другой ключ
+    assert cache.key("movies:list", {"page": 1, "genre_ids": [1, 3]}, 6) != a
+    cache.bump_generation()
+    assert cache.key("movies:list", {"page": 1, "genre_ids": [1, 3]}, 7) != a
+
+
+def test_redis_backend_survives_unavailable_server():
+    backend = RedisBackend("redis://127.0.0.1:1/0")
+    cache = ResponseCache(backend, ttl=60)
+    assert cache.key("movies:list", {"page": 1}, 1) is None
+    assert cache.get(None) is None
+
+
+def test_blocking_backend_is_called_off_the_event_loop():
+    class RecordingBackend(MemoryBackend):
+        blocking = True
+
+        def get(self, key):
+            threads.append(threading.get_ident())
+            return super().get(key)
+
+    threads = []
+    cache = ResponseCache(RecordingBackend(), ttl=60)
+
+    async def roundtrip():
+        key, cached = await cache.lookup_async("movies:list", {"page": 1}, 1)
+        await cache.set_async(key, b"[]")
+        return cached, await cache.lookup_async("movies:list", {"page": 1}, 1)
+
+    cached, (_, again) = asyncio.run(roundtrip())
+    assert (cached, again) == (None, b"[]")
+    assert threads and threading.get_ident() not in threads
@@ -0,0 +1,54 @@
+from sqlalchemy import func, select
+
+from app.models.association_tables import movie_genre, movie_person
+from app.models.genre import Genre
+from app.models.movie import Movie
+from app.models.person import Person
+from app.seed import CURATED, GENRES, PERSONS, iter_movies, person_names, seed_movies
+
+
+def _count(db, table) -> int:
+    return db.scalar(select(func.count()).select_from(table))
+
+
+def test_person_names_unique():
+    names = person_names(3000)
+    assert names[: len(PERSONS)] == PERSONS
+    assert len(names) == len(set(names)) == 3000
+
+
+def test_iter_movies_deterministic():
+    refs = ({g: i for i, g in enumerate(GENRES)}, {"USA": 1, "UK": 2, "Japan": 3}, {p: i for i, p in enumerate(PERSONS)})
+    first = list(iter_movies(200, *refs, random_seed=7))
+    assert first == list(iter_movies(200, *refs, random_seed=7))
+    assert first != list(iter_movies(200, *refs, random_seed=8))
+    assert [row[0] for row in first[: len(CURATED)]] == [item["title"] for item in CURATED]
+    assert len(first) == 200
+
+
+def test_seed_movies(db_session):
+    report = seed_movies(db_session, 500, random_seed=1, chunk_size=128)
+    assert report["movies"] == 500
+    assert _count(db_session, Movie) == 500
+    assert _count(db_session, Genre) == len(GENRES)
+    assert _count(db_session, Person) == report["persons"] == 125
+    assert _count(db_session, movie_person) >= 2 * 500
+
+    inception = db_session.scalars(select(Movie).where(Movie.title == "Inception")).one()
+    assert {g.name for g in inception.genres} == {"Sci-Fi", "Thriller"}
+    assert inception.version == 1
+
+    # повтор дописывает фильмы, справочники не дублируются
+    genre_links = _count(db_session, movie_genre)
+    seed_movies(db_session, 100, random_seed=2)
+    assert _count(db_session, Movie) == 600
+    assert _count(db_session, Person) == 125
+    assert _count(db_session, movie_genre) > genre_links
+
+
+def test_seed_movies_bumps_catalog_version(client, db_session):
+    etag = client.get("/api/movies").headers["ETag"]
+    seed_movies(db_session, 10)
+    response = client.get("/api/movies", headers={"If-None-Match": etag})
+    assert response.status_code == 200
+    assert response.json()["total"] == 10
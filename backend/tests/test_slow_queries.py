@@ -0,0 +1,98 @@
+import pytest
+
+from app.core.config import settings
+from app.core.slow_queries import normalize_sql, parameter_shape, slow_query_log
+
+ADMIN_HEADERS = {"X-Admin-Token": "test-token"}
+
+
+@pytest.fixture(autouse=True)
+def _slow_log(monkeypatch):
+    monkeypatch.setattr(settings, "admin_token", "test-token")
+    slow_query_log.clear()
+    yield
+    slow_query_log.clear()
+
+
+def test_normalize_sql_strips_values():
+    sql = "SELECT movies.id FROM movies\n WHERE movies.id IN (?, ?, ?) AND title = 'x' LIMIT ? OFFSET 20"
+    assert normalize_sql(sql) == "SELECT movies.id FROM movies WHERE movies.id IN (...) AND title = ? LIMIT ? OFFSET ?"
+    assert normalize_sql("WHERE id IN (%(id_1_1)s, %(id_1_2)s)") == normalize_sql("WHERE id IN (%(id_1_1)s)")
+
+
+def test_parameter_shape_has_no_values():
+    assert parameter_shape({"title_1": "%secret%", "ids": [1, 2]}, False) == {"title_1": "str", "ids": "list[2]"}
+    assert parameter_shape([(1, "a"), (2, "b")], True) == {"executemany": 2, "row": ["int", "str"]}
+
+
+def test_slow_queries_aggregated_with_plans(client, seeded, monkeypatch):
+    monkeypatch.setattr(settings, "slow_query_ms", 1e-6)
+    monkeypatch.setattr(settings, "slow_query_explain_rate", 1.0)
+    genre = seeded["genres"]["drama"].id
+    for _ in range(2):
+        assert client.get("/api/movies", params={"genre_id": [genre], "q": "secret"}).status_code == 200
+
+    r = client.get("/api/admin/slow-queries", params={"order_by": "count"}, headers=ADMIN_HEADERS)
+    assert r.status_code == 200
+    items = r.json()["items"]
+    page = next(i for i in items if "LIMIT" in i["sql"] and i["sql"].startswith("SELECT movies.id"))
+    assert page["count"] == 2
+    assert page["last_request"].startswith("GET /api/movies?genre_id=")
+    assert "secret" not in page["sql"] and "secret" not in str(page["last_params"])
+    assert page["plan"]  # EXPLAIN QUERY PLAN в SQLite
+
+    r = client.delete("/api/admin/slow-queries", headers=ADMIN_HEADERS)
+    assert r.json()["removed"] >= 1
+
+
+def test_fast_queries_not_logged(client, seeded, monkeypatch):
+    monkeypatch.setattr(settings, "slow_query_ms", 10_000)
+    client.get("/api/movies")
+    assert slow_query_log.top() == []
+
+
+class _FakeCursor:
+    def __init__(self, executed, fail):
+        self.executed, self.fail = executed, fail
+
+    def execute(self, sql, parameters=None):
+        self.executed.append(sql.split(" (")[0])
+        if sql.startswith("EXPLAIN") and self.fail:
+            raise RuntimeError("canceling statement due to statement timeout")
+
+    def fetchall(self):
+        return [[[{"Plan": {"Node Type": "Seq Scan"}}]]]
+
+    def close(self):
+        pass
+
+
+class _FakeConnection:
+    class dialect:
+        name = "postgresql"
+
+    def __init__(self, fail):
+        self.executed = []
+        self.connection = self
+        self.fail = fail
+
+    def in_transaction(self):
+        return True
+
+    def cursor(self):
+        return _FakeCursor(self.executed, self.fail)
+
+
+@pytest.mark.parametrize("fail", [False, True])
+def test_postgres_explain_runs_under_savepoint(fail):
+    from app.core.slow_queries import _explain
+
+    conn = _FakeConnection(fail)
+    plan = _explain(conn, "SELECT movies.id FROM movies", {})
+    if fail:
+        # транзакция запроса не оборвана: откат к точке сохранения
+        assert plan == {"error": "canceling statement due to statement timeout"}
+        assert conn.executed == ["SAVEPOINT slow_query_explain", "EXPLAIN", "ROLLBACK TO SAVEPOINT slow_query_explain"]
+    else:
+        assert plan == [{"Plan": {"Node Type": "Seq Scan"}}]
+        assert conn.executed == ["SAVEPOINT slow_query_explain", "EXPLAIN", "RELEASE SAVEPOINT slow_query_explain"]